@@ -0,0 +1,72 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+from controllers.common.ttl_cache import TTLCache
+
+# Cache de ATAs geradas, endereçado pelo conteúdo da requisição ao modelo
+ATA_CACHE_TTL = int(os.getenv("ATA_CACHE_TTL", "86400"))
+ATA_CACHE_MAXSIZE = int(os.getenv("ATA_CACHE_MAXSIZE", "256"))
+# Diretório opcional para persistir o cache em disco (vazio = apenas memória)
+ATA_CACHE_DIR = os.getenv("ATA_CACHE_DIR", "")
+
+
+def chave_ata(**partes):
+    """Hash SHA-256 estável de todos os parâmetros que influenciam a geração"""
+    conteudo = json.dumps(partes, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+class AtaCache:
+    """Cache LRU + TTL de ATAs geradas, com backend opcional em disco"""
+
+    def __init__(self, ttl=ATA_CACHE_TTL, maxsize=ATA_CACHE_MAXSIZE, directory=ATA_CACHE_DIR):
+        self.ttl = ttl
+        self.memory = TTLCache(ttl=ttl, maxsize=maxsize)
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        ata = self.memory.get(key)
+        if ata is not None or not self.directory:
+            return ata
+
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                ata = json.load(f)["ata"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        self.memory.set(key, ata)
+        return ata
+
+    def set(self, key, ata):
+        self.memory.set(key, ata)
+        if not self.directory:
+            return
+        tmp_path = None
+        try:
+            # Escrita atômica para não deixar arquivos parciais com gerações concorrentes;
+            # o temporário tem nome único por escrita (threads do mesmo processo inclusive)
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.directory,
+                                             prefix=f"{key}.", suffix=".tmp", delete=False) as f:
+                tmp_path = f.name
+                json.dump({"ata": ata}, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Erro ao gravar cache de ATA em disco: {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+# Cache compartilhado pelo processo
+ata_cache = AtaCache()
@@ -0,0 +1,110 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Gerações de ATA executadas em segundo plano (POST /gerar_ata retorna o id do job)
+ATA_JOB_WORKERS = int(os.getenv("ATA_JOB_WORKERS", "4"))
+# Jobs aguardando ou em execução; acima disso novas requisições recebem 429
+ATA_JOB_MAX_PENDING = int(os.getenv("ATA_JOB_MAX_PENDING", "32"))
+# Tempo que o resultado de um job concluído fica disponível para consulta
+ATA_JOB_RESULT_TTL = int(os.getenv("ATA_JOB_RESULT_TTL", "3600"))
+
+
+class FilaCheiaError(Exception):
+    """A fila de jobs atingiu o limite de itens pendentes"""
+
+
+class AtaJobQueue:
+    """Fila de jobs em memória executados por um pool de threads de tamanho fixo"""
+
+    def __init__(self, max_workers=ATA_JOB_WORKERS, max_pending=ATA_JOB_MAX_PENDING, result_ttl=ATA_JOB_RESULT_TTL):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ata-job")
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Enfileira func(*args, **kwargs) e retorna o job criado (status "queued")"""
+        with self._lock:
+            self._limpar_expirados()
+            if self._pending >= self.max_pending:
+                raise FilaCheiaError(f"Fila de geração cheia ({self._pending} jobs pendentes), tente novamente em instantes")
+            job = {
+                "id": uuid.uuid4().hex,
+                "status": "queued",
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+            self._jobs[job["id"]] = job
+            self._pending += 1
+            # Cópia antes de entrar no pool: a thread de execução já pode alterar o job
+            snapshot = dict(job)
+
+        self._executor.submit(self._executar, job, func, args, kwargs)
+        return snapshot
+
+    def _executar(self, job, func, args, kwargs):
+        with self._lock:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+        try:
+            result = func(*args, **kwargs)
+            with self._lock:
+                job["result"] = result
+                job["status"] = "done"
+        except Exception as e:
+            print(f"Error in ATA job {job['id']}: {str(e)}")
+            with self._lock:
+                job["error"] = str(e)
+                job["status"] = "error"
+        finally:
+            with self._lock:
+                job["finished_at"] = time.time()
+                self._pending -= 1
+
+    def get(self, job_id):
+        """Cópia do job (com a posição na fila enquanto aguarda) ou None se não existir/expirou"""
+        with self._lock:
+            self._limpar_expirados()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+            if job["status"] == "queued":
+                job["position"] = sum(
+                    1 for other in self._jobs.values()
+                    if other["status"] == "queued" and other["created_at"] < job["created_at"]
+                ) + 1
+            return job
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job["status"] == "running")
+            return {
+                "pending": self._pending,
+                "running": running,
+                "queued": self._pending - running,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending
+            }
+
+    def _limpar_expirados(self):
+        limite = time.time() - self.result_ttl
+        expirados = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < limite
+        ]
+        for job_id in expirados:
+            del self._jobs[job_id]
+
+
+# Fila compartilhada pelo processo
+ata_jobs = AtaJobQueue()
@@ -0,0 +1,62 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Cards do topo da lista cujos detalhes são pré-carregados após /api/boards/my-work-items (0 desativa)
+ATA_PREFETCH_COUNT = int(os.getenv("ATA_PREFETCH_COUNT", "20"))
+# Requisições de pré-carregamento simultâneas ao Azure DevOps
+ATA_PREFETCH_WORKERS = int(os.getenv("ATA_PREFETCH_WORKERS", "2"))
+# Work items por requisição ao endpoint em lote (máximo 200)
+ATA_PREFETCH_CHUNK_SIZE = min(200, int(os.getenv("ATA_PREFETCH_CHUNK_SIZE", "20")))
+# Chunks aguardando no pool; acima disso novos pré-carregamentos são descartados
+ATA_PREFETCH_MAX_PENDING = int(os.getenv("ATA_PREFETCH_MAX_PENDING", "16"))
+
+
+class AtaDetailPrefetcher:
+    """Pré-carrega em segundo plano o cache de detalhes das ATAs exibidas na lista.
+
+    Usa um pool de threads de tamanho fixo; ids já em pré-carregamento não são
+    enviados de novo, e com o pool cheio o pedido é descartado (é só otimização)."""
+
+    def __init__(self, count=ATA_PREFETCH_COUNT, max_workers=ATA_PREFETCH_WORKERS,
+                 chunk_size=ATA_PREFETCH_CHUNK_SIZE, max_pending=ATA_PREFETCH_MAX_PENDING):
+        self.count = count
+        self.chunk_size = max(1, chunk_size)
+        self.max_pending = max(1, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ata-prefetch")
+        self._in_flight = set()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def schedule(self, controller, work_item_ids):
+        """Agenda o pré-carregamento dos primeiros `count` ids; retorna quantos foram agendados"""
+        if self.count <= 0:
+            return 0
+
+        with self._lock:
+            ids = [
+                int(work_item_id) for work_item_id in work_item_ids[:self.count]
+                if (controller.org, int(work_item_id)) not in self._in_flight
+            ]
+            chunks = [ids[i:i + self.chunk_size] for i in range(0, len(ids), self.chunk_size)]
+            chunks = chunks[:max(0, self.max_pending - self._pending)]
+            for chunk in chunks:
+                self._in_flight.update((controller.org, work_item_id) for work_item_id in chunk)
+            self._pending += len(chunks)
+
+        for chunk in chunks:
+            self._executor.submit(self._prefetch, controller, chunk)
+        return sum(len(chunk) for chunk in chunks)
+
+    def _prefetch(self, controller, chunk):
+        try:
+            controller.prefetch_ata_details(chunk)
+        except Exception as e:
+            print(f"Erro ao pré-carregar detalhes das ATAs {chunk}: {str(e)}")
+        finally:
+            with self._lock:
+                self._in_flight.difference_update((controller.org, work_item_id) for work_item_id in chunk)
+                self._pending -= 1
+
+
+ata_prefetcher = AtaDetailPrefetcher()
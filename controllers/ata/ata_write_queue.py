@@ -0,0 +1,245 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from controllers.common.ttl_cache import TTLCache
+
+# Diário local (SQLite) das edições de ATA ainda não enviadas ao Azure DevOps
+ATA_WRITE_JOURNAL_PATH = os.getenv("ATA_WRITE_JOURNAL_PATH", os.path.join("data", "ata_write_journal.db"))
+# Edições de um work item são enviadas após esse tempo sem novas alterações
+ATA_WRITE_FLUSH_INTERVAL = float(os.getenv("ATA_WRITE_FLUSH_INTERVAL", "3"))
+# Tentativas antes de marcar a edição como falha (erros que não são conflito)
+ATA_WRITE_MAX_ATTEMPTS = int(os.getenv("ATA_WRITE_MAX_ATTEMPTS", "5"))
+# Tempo que o resultado do último envio de cada work item fica disponível em save-status
+ATA_WRITE_RESULT_TTL = int(os.getenv("ATA_WRITE_RESULT_TTL", "3600"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_writes (
+    org TEXT NOT NULL,
+    work_item_id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    state TEXT NOT NULL,
+    queued_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    attempted_at REAL,
+    last_error TEXT,
+    PRIMARY KEY (org, work_item_id)
+);
+"""
+
+
+def _merge_edits(pending, edits):
+    """Combina edições pendentes com novas: campos novos sobrescrevem, a rev base é a da primeira edição"""
+    merged = dict(pending)
+    merged.update(edits)
+    if pending.get("rev") not in (None, ""):
+        merged["rev"] = pending["rev"]
+    return merged
+
+
+class AtaWriteQueue:
+    """Fila write-behind na frente de save_ata_details.
+
+    Edições do mesmo work item são combinadas em um único salvamento, enviado
+    após ATA_WRITE_FLUSH_INTERVAL sem novas alterações ou imediatamente com
+    commit(). As edições ficam em um diário SQLite e são reenviadas após reinício."""
+
+    def __init__(self, save, path=ATA_WRITE_JOURNAL_PATH, flush_interval=ATA_WRITE_FLUSH_INTERVAL,
+                 max_attempts=ATA_WRITE_MAX_ATTEMPTS):
+        self.save = save
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Um envio por work item por vez (flush em segundo plano x commit explícito)
+        self._item_locks = {}
+        self._results = TTLCache(ttl=ATA_WRITE_RESULT_TTL, maxsize=1024)
+        # Revisão base -> revisão gerada pelo último envio; edições ainda baseadas na
+        # revisão antiga (o editor não recarregou) passam a usar a nova
+        self._advanced = TTLCache(ttl=ATA_WRITE_RESULT_TTL, maxsize=1024)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        # Envio interrompido por reinício volta para a fila
+        self._conn.execute("UPDATE pending_writes SET state = 'pending' WHERE state = 'flushing'")
+        self._conn.commit()
+
+        self._thread = threading.Thread(target=self._run, name="ata-write-queue", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, org, work_item_id, edits):
+        """Registra edições no diário (combinando com as pendentes) e retorna o status"""
+        work_item_id = int(work_item_id)
+        now = time.time()
+        edits = self._rebase(org, work_item_id, edits)
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT data, queued_at, state FROM pending_writes WHERE org = ? AND work_item_id = ?",
+                (org, work_item_id)
+            ).fetchone()
+            if row and row[2] == "pending":
+                data, queued_at = _merge_edits(json.loads(row[0]), edits), row[1]
+            elif row and row[2] == "conflict":
+                # Edição feita após o conflito (ATA recarregada): parte só do que foi recebido
+                data, queued_at = dict(edits), now
+            else:
+                # Sem pendência (ou a anterior falhou/está em envio): nova edição parte do que foi recebido
+                data, queued_at = (_merge_edits(json.loads(row[0]), edits) if row else dict(edits)), now
+            self._conn.execute("""
+                INSERT OR REPLACE INTO pending_writes (org, work_item_id, data, state, queued_at, updated_at, attempts, last_error)
+                VALUES (?, ?, ?, 'pending', ?, ?, 0, NULL)
+            """, (org, work_item_id, json.dumps(data), queued_at, now))
+        return self.status(org, work_item_id)
+
+    def _rebase(self, org, work_item_id, data):
+        advanced = self._advanced.get((org, work_item_id))
+        if advanced and data.get("rev") not in (None, "") and str(data["rev"]) == str(advanced[0]):
+            return dict(data, rev=advanced[1])
+        return data
+
+    def commit(self, org, work_item_id):
+        """Envia agora as edições pendentes do work item e retorna o resultado de save_ata_details"""
+        result = self._flush_item(org, int(work_item_id))
+        if result is None:
+            return self._results.get((org, int(work_item_id)), {}).get("result") or {
+                "success": True, "message": "Nenhuma alteração pendente", "id": int(work_item_id)
+            }
+        return result
+
+    def discard(self, org, work_item_id):
+        """Descarta as edições ainda não enviadas do work item; retorna se havia alguma"""
+        work_item_id = int(work_item_id)
+        with self._lock, self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM pending_writes WHERE org = ? AND work_item_id = ? AND state != 'flushing'",
+                (org, work_item_id)
+            ).rowcount
+            self._results.invalidate((org, work_item_id))
+        return removed > 0
+
+    def status(self, org, work_item_id):
+        """Situação das edições do work item: pending, flushing, failed, saved, conflict ou idle"""
+        work_item_id = int(work_item_id)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, queued_at, updated_at, attempts, last_error FROM pending_writes WHERE org = ? AND work_item_id = ?",
+                (org, work_item_id)
+            ).fetchone()
+            last = self._results.get((org, work_item_id))
+        if row:
+            return {
+                "id": work_item_id,
+                "state": row[0],
+                "queuedAt": row[1],
+                "updatedAt": row[2],
+                "flushAt": row[2] + self.flush_interval if row[0] == "pending" else None,
+                "attempts": row[3],
+                "lastError": row[4],
+                "lastResult": last
+            }
+        if last:
+            return dict(last, id=work_item_id)
+        return {"id": work_item_id, "state": "idle"}
+
+    def _item_lock(self, org, work_item_id):
+        with self._lock:
+            return self._item_locks.setdefault((org, work_item_id), threading.Lock())
+
+    def _flush_item(self, org, work_item_id):
+        with self._item_lock(org, work_item_id):
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT data, updated_at, attempts FROM pending_writes WHERE org = ? AND work_item_id = ? AND state IN ('pending', 'failed')",
+                    (org, work_item_id)
+                ).fetchone()
+                if not row:
+                    return None
+                self._conn.execute(
+                    "UPDATE pending_writes SET state = 'flushing' WHERE org = ? AND work_item_id = ?",
+                    (org, work_item_id)
+                )
+            data, updated_at, attempts = json.loads(row[0]), row[1], row[2]
+
+            try:
+                result = self.save(org, work_item_id, data)
+            except Exception as e:
+                result = {"error": str(e), "id": work_item_id}
+
+            with self._lock, self._conn:
+                current = self._conn.execute(
+                    "SELECT updated_at FROM pending_writes WHERE org = ? AND work_item_id = ?",
+                    (org, work_item_id)
+                ).fetchone()
+                # Edições que chegaram durante o envio continuam pendentes
+                changed_meanwhile = current is not None and current[0] != updated_at
+                if result.get("conflict"):
+                    # As edições ficam no diário até serem descartadas ou refeitas sobre a ATA recarregada
+                    self._results.set((org, work_item_id), {"state": "conflict", "savedAt": time.time(), "result": result})
+                    self._conn.execute(
+                        "UPDATE pending_writes SET state = 'conflict', last_error = ? WHERE org = ? AND work_item_id = ?",
+                        (result.get("error"), org, work_item_id)
+                    )
+                elif result.get("success"):
+                    self._results.set((org, work_item_id), {"state": "saved", "savedAt": time.time(), "result": result})
+                    if result.get("rev") is not None and data.get("rev") not in (None, ""):
+                        self._advanced.set((org, work_item_id), (data["rev"], result["rev"]))
+                    if changed_meanwhile:
+                        pending = self._rebase(org, work_item_id, json.loads(self._conn.execute(
+                            "SELECT data FROM pending_writes WHERE org = ? AND work_item_id = ?",
+                            (org, work_item_id)
+                        ).fetchone()[0]))
+                        self._conn.execute(
+                            "UPDATE pending_writes SET state = 'pending', data = ? WHERE org = ? AND work_item_id = ?",
+                            (json.dumps(pending), org, work_item_id)
+                        )
+                    else:
+                        self._conn.execute(
+                            "DELETE FROM pending_writes WHERE org = ? AND work_item_id = ?",
+                            (org, work_item_id)
+                        )
+                else:
+                    attempts += 1
+                    state = "failed" if attempts >= self.max_attempts and not changed_meanwhile else "pending"
+                    print(f"Failed to flush ATA {work_item_id} (attempt {attempts}): {result.get('error')}")
+                    self._conn.execute("""
+                        UPDATE pending_writes SET state = ?, attempts = ?, attempted_at = ?, last_error = ?
+                        WHERE org = ? AND work_item_id = ?
+                    """, (state, attempts, time.time(), result.get("error"), org, work_item_id))
+            return result
+
+    def _run(self):
+        while True:
+            time.sleep(max(0.2, self.flush_interval / 3))
+            try:
+                limit = time.time() - self.flush_interval
+                with self._lock:
+                    rows = self._conn.execute("""
+                        SELECT org, work_item_id, attempts, attempted_at FROM pending_writes
+                        WHERE state = 'pending' AND updated_at <= ?
+                    """, (limit,)).fetchall()
+                for org, work_item_id, attempts, attempted_at in rows:
+                    # Backoff entre tentativas após falhas
+                    if attempts and attempted_at and attempted_at > time.time() - self.flush_interval * (2 ** attempts):
+                        continue
+                    self._flush_item(org, work_item_id)
+            except Exception as e:
+                print(f"Erro na fila de gravação de ATAs: {str(e)}")
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_ata_write_queue(save):
+    """Fila compartilhada pelo processo; criada ao registrar o blueprint, retomando o diário"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = AtaWriteQueue(save)
+    return _queue
@@ -1,8 +1,55 @@
 import os
-import base64
-import requests
 import re
-from datetime import datetime
+import json
+import time
+import base64
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from controllers.azure_devops.azure_devops_client import get_azure_devops_client
+from controllers.common.ttl_cache import TTLCache
+from controllers.ata.work_item_sync import WorkItemSyncEngine
+from controllers.ata.company_index import company_index
+from controllers.ata.title_parser import parse_title
+
+# Cache de iterações (sprints) compartilhado pelo processo - mudam poucas vezes por mês
+SPRINT_CACHE_TTL = int(os.getenv("SPRINT_CACHE_TTL", "900"))
+SPRINT_CACHE_MAXSIZE = int(os.getenv("SPRINT_CACHE_MAXSIZE", "64"))
+_sprint_cache = TTLCache(ttl=SPRINT_CACHE_TTL, maxsize=SPRINT_CACHE_MAXSIZE)
+
+# Última revisão conhecida (rev + campos) de cada work item, base para salvar apenas o que mudou
+WORK_ITEM_REVISION_TTL = int(os.getenv("WORK_ITEM_REVISION_TTL", "3600"))
+_revision_cache = TTLCache(ttl=WORK_ITEM_REVISION_TTL, maxsize=1024)
+
+# Detalhes de ATA já extraídos, por (org, id, rev): reabrir um card não refaz a extração
+ATA_DETAIL_CACHE_TTL = int(os.getenv("ATA_DETAIL_CACHE_TTL", "3600"))
+ATA_DETAIL_CACHE_MAXSIZE = int(os.getenv("ATA_DETAIL_CACHE_MAXSIZE", "512"))
+# Após esse tempo a revisão em cache é conferida no Azure DevOps (consulta apenas de System.Rev)
+ATA_DETAIL_REVALIDATE_AFTER = float(os.getenv("ATA_DETAIL_REVALIDATE_AFTER", "30"))
+_ata_detail_cache = TTLCache(ttl=ATA_DETAIL_CACHE_TTL, maxsize=ATA_DETAIL_CACHE_MAXSIZE)
+
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+# Número máximo de chunks de work items buscados em paralelo
+WORK_ITEMS_FETCH_CONCURRENCY = int(os.getenv("WORK_ITEMS_FETCH_CONCURRENCY", "4"))
+
+# Atualizações por requisição no endpoint $batch de work items (limite da API: 200)
+WORK_ITEMS_BATCH_UPDATE_SIZE = min(200, int(os.getenv("WORK_ITEMS_BATCH_UPDATE_SIZE", "200")))
+
+# Campos renderizados nas listas de cards (ata_workspace.js / manage_cards.js).
+# Campos pesados (HTML das ATAs, critérios de aceite...) são buscados sob demanda.
+WORK_ITEM_LIST_FIELDS = [
+    "System.Id",
+    "System.Title",
+    "System.State",
+    "System.WorkItemType",
+    "System.Description",
+    "System.AssignedTo",
+    "System.CreatedDate",
+    "System.ChangedDate",
+    "System.IterationPath",
+    "System.Tags",
+    "Microsoft.VSTS.Common.Priority"
+]
 
 class AzureBoardsController:
     def __init__(self):
@@ -27,13 +74,14 @@ class AzureBoardsController:
         if not self.token:
             raise Exception(f"Token do Azure DevOps não configurado para perfil ATA: {ata_profile}")
         
-        # Headers padrão para requisições
-        auth_string = base64.b64encode(f':{self.token}'.encode()).decode()
-        self.headers = {
-            "Authorization": f"Basic {auth_string}",
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
+        # Falhas parciais (por chunk) da última busca de work items
+        self.last_fetch_errors = []
+        
+        # Sincronização incremental de work items por (sprint, usuário)
+        self.sync_engine = WorkItemSyncEngine(self)
+        
+        # Cliente HTTP compartilhado (pool keep-alive por organização, com headers de autenticação)
+        self.client = get_azure_devops_client(self.org, self.token)
     
     def extract_company_from_title(self, title):
         """
@@ -43,72 +91,64 @@ class AzureBoardsController:
         if not title:
             return None
         
-        # Busca o padrão [ATA][EMPRESA][Nome] - empresa fica no segundo conjunto de colchetes
-        pattern = r'^\[ATA\]\[([^\]]+)\]'
-        match = re.search(pattern, title, re.IGNORECASE)
-        
-        if match:
-            company = match.group(1).strip().upper()
-            return company
-        
-        # Fallback: procura por qualquer empresa válida nos primeiros colchetes
-        pattern = r'^\[([^\]]+)\]'
-        excluded_terms = {'ATA', 'TASK', 'BUG', 'FEATURE', 'USER STORY'}
-        
-        # Buscar todos os matches de colchetes no início do título
-        title_clean = title.strip()
-        while True:
-            match = re.match(pattern, title_clean)
-            if not match:
-                break
-                
-            captured_text = match.group(1).strip().upper()
+        return parse_title(title).company
+    
+    def _sprint_cache_key(self, kind, timeframe=None):
+        """Chave do cache de iterações: (org, project, team, tipo, timeframe)"""
+        return (self.org, self.project, self.team, kind, timeframe)
+
+    def _get_iterations(self, timeframe=None):
+        """Busca as iterações do time (com cache por org/projeto/time/timeframe)"""
+        def fetch():
+            api_url = f"https://dev.azure.com/{self.org}/{self.project}/{self.team}/_apis/work/teamsettings/iterations"
+            params = {"api-version": "7.0"}
+            if timeframe:
+                params["$timeframe"] = timeframe
             
-            # Se não é um termo excluído, essa é a empresa
-            if captured_text not in excluded_terms:
-                return captured_text
+            response = self.client.get(api_url, params=params)
+            
+            if response.status_code != 200:
+                raise Exception(f"Erro ao buscar sprints: {response.status_code} - {response.text}")
             
-            # Remove o primeiro colchete e continua procurando
-            title_clean = title_clean[match.end():].strip()
+            return response.json().get("value", [])
         
-        return None
+        return _sprint_cache.get_or_set(self._sprint_cache_key("iterations", timeframe), fetch)
+    
+    def _get_sprint_index(self):
+        """Índice sprint_id -> iteração construído uma única vez a partir da lista completa"""
+        def build():
+            return {iteration.get("id"): iteration for iteration in self._get_iterations()}
+        
+        return _sprint_cache.get_or_set(self._sprint_cache_key("index"), build)
+    
+    def invalidate_sprint_cache(self):
+        """Descarta as iterações em cache deste org/projeto/time"""
+        prefix = (self.org, self.project, self.team)
+        return _sprint_cache.invalidate_where(lambda key: key[:3] == prefix)
     
     def get_current_sprint(self):
         """Busca a sprint ativa/atual do time"""
         try:
-            # URL para buscar sprints do time
-            api_url = f"https://dev.azure.com/{self.org}/{self.project}/{self.team}/_apis/work/teamsettings/iterations"
-            params = {
-                "api-version": "7.0",
-                "$timeframe": "current"  # Apenas sprints atuais
-            }
-            
-            response = requests.get(api_url, headers=self.headers, params=params)
+            # Apenas sprints atuais
+            iterations = self._get_iterations("current")
             
-            if response.status_code == 200:
-                data = response.json()
-                iterations = data.get("value", [])
-                
-                # Buscar a sprint ativa (atual)
-                for iteration in iterations:
-                    # Verificar se a sprint está ativa baseada nas datas
-                    start_date = iteration.get("attributes", {}).get("startDate")
-                    finish_date = iteration.get("attributes", {}).get("finishDate")
-                    
-                    if start_date and finish_date:
-                        start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-                        finish = datetime.fromisoformat(finish_date.replace('Z', '+00:00'))
-                        now = datetime.now(start.tzinfo)
-                        
-                        if start <= now <= finish:
-                            return iteration
+            # Buscar a sprint ativa (atual)
+            for iteration in iterations:
+                # Verificar se a sprint está ativa baseada nas datas
+                start_date = iteration.get("attributes", {}).get("startDate")
+                finish_date = iteration.get("attributes", {}).get("finishDate")
                 
-                # Se não encontrou por data, pegar a primeira disponível
-                if iterations:
-                    return iterations[0]
+                if start_date and finish_date:
+                    start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+                    finish = datetime.fromisoformat(finish_date.replace('Z', '+00:00'))
+                    now = datetime.now(start.tzinfo)
                     
-            else:
-                raise Exception(f"Erro ao buscar sprints: {response.status_code} - {response.text}")
+                    if start <= now <= finish:
+                        return iteration
+            
+            # Se não encontrou por data, pegar a primeira disponível
+            if iterations:
+                return iterations[0]
                 
         except Exception as e:
             raise Exception(f"Erro ao buscar sprint atual: {str(e)}")
@@ -118,32 +158,24 @@ class AzureBoardsController:
     def get_all_sprints(self):
         """Busca todas as sprints do time ordenadas por data"""
         try:
-            # URL para buscar todas as sprints do time
-            api_url = f"https://dev.azure.com/{self.org}/{self.project}/{self.team}/_apis/work/teamsettings/iterations"
-            params = {
-                "api-version": "7.0"
-            }
+            iterations = self._get_iterations()
             
-            response = requests.get(api_url, headers=self.headers, params=params)
+            # Ordenar por data de início (mais recente primeiro)
+            sorted_iterations = sorted(iterations, 
+                key=lambda x: x.get("attributes", {}).get("startDate", ""), 
+                reverse=True)
             
-            if response.status_code == 200:
-                data = response.json()
-                iterations = data.get("value", [])
-                
-                # Ordenar por data de início (mais recente primeiro)
-                sorted_iterations = sorted(iterations, 
-                    key=lambda x: x.get("attributes", {}).get("startDate", ""), 
-                    reverse=True)
-                
-                return sorted_iterations
-                    
-            else:
-                raise Exception(f"Erro ao buscar sprints: {response.status_code} - {response.text}")
+            return sorted_iterations
                 
         except Exception as e:
             raise Exception(f"Erro ao buscar todas as sprints: {str(e)}")
-        
-        return []
+    
+    def get_sprint_by_id(self, sprint_id):
+        """Busca uma sprint pelo ID usando o índice em cache"""
+        try:
+            return self._get_sprint_index().get(sprint_id)
+        except Exception:
+            return None
     
     def get_last_three_sprints(self):
         """Busca as últimas 3 sprints (atual + 2 anteriores)"""
@@ -216,8 +248,11 @@ class AzureBoardsController:
             print(f"Erro ao buscar últimas 3 sprints: {str(e)}")
             return []
 
-    def get_my_work_items_in_sprint(self, sprint_id=None, company_filter=None):
-        """Busca work items (cards) atribuídos ao usuário na sprint ativa usando WIQL"""
+    def get_my_work_items_in_sprint(self, sprint_id=None, company_filter=None, force_refresh=False):
+        """Busca work items (cards) atribuídos ao usuário na sprint ativa usando WIQL.
+        
+        Usa sincronização incremental (watermark de ChangedDate); force_refresh
+        descarta o snapshot local e baixa tudo novamente."""
         try:
             # Se não foi fornecido sprint_id, buscar sprint atual
             if not sprint_id:
@@ -232,8 +267,8 @@ class AzureBoardsController:
             if not sprint_path:
                 return []
             
-            # Usar WIQL para buscar apenas work items atribuídos ao usuário na sprint
-            work_items = self._get_work_items_by_query(sprint_path)
+            # Sincronizar apenas o que mudou desde a última busca (WIQL incremental)
+            work_items = self.sync_engine.sync(sprint_path, force_full=force_refresh)
             
             # Aplicar filtro por empresa se especificado
             if company_filter:
@@ -249,13 +284,94 @@ class AzureBoardsController:
         except Exception as e:
             raise Exception(f"Erro ao buscar work items: {str(e)}")
     
+    def query_my_work_items(self, sprint_id=None, filters=None, cursor=None, limit=None, fields=None, force_refresh=False):
+        """Busca paginada e filtrada dos work items do usuário na sprint (atual ou informada).
+        
+        filters aceita company, state, type, priority e q (busca no título); a
+        filtragem e a paginação por cursor rodam no store local já sincronizado.
+        fields restringe os campos retornados em cada item."""
+        try:
+            if sprint_id:
+                sprint = self.get_sprint_by_id(sprint_id)
+                sprint_path = sprint.get("path") if sprint else self._get_sprint_path(sprint_id)
+            else:
+                sprint = self.get_current_sprint()
+                sprint_path = sprint.get("path") if sprint else None
+            
+            result = {"sprint": sprint, "work_items": [], "total_items": 0, "next_cursor": None}
+            if not sprint_path:
+                return result
+            
+            self.sync_engine.refresh(sprint_path, force_full=force_refresh)
+            
+            filters = filters or {}
+            items, total, last = self.sync_engine.store.query_items(
+                self.org, self.project, sprint_path, self.user_name,
+                company=filters.get("company"),
+                state=filters.get("state"),
+                work_item_type=filters.get("type"),
+                priority=filters.get("priority"),
+                text=filters.get("q"),
+                after=self._decode_cursor(cursor),
+                limit=limit
+            )
+            
+            if fields:
+                for item in items:
+                    item["fields"] = {name: item["fields"][name] for name in fields if name in item["fields"]}
+            
+            result.update({
+                "work_items": items,
+                "total_items": total,
+                "next_cursor": self._encode_cursor(last) if limit and last and len(items) == limit else None
+            })
+            return result
+                
+        except Exception as e:
+            raise Exception(f"Erro ao buscar work items: {str(e)}")
+    
+    def _encode_cursor(self, last):
+        """Cursor opaco com (changed_date, id) do último item da página"""
+        return base64.urlsafe_b64encode(json.dumps(list(last)).encode()).decode()
+    
+    def _decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            changed_date, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            return (changed_date, int(item_id))
+        except Exception:
+            raise Exception("Cursor de paginação inválido")
+    
+    def get_companies(self, sprint_id=None):
+        """Empresas da sprint (atual ou informada) com contagem e estados, a partir do índice"""
+        try:
+            if not sprint_id:
+                current_sprint = self.get_current_sprint()
+                sprint_path = current_sprint.get("path") if current_sprint else None
+            else:
+                sprint_path = self._get_sprint_path(sprint_id)
+            
+            if not sprint_path:
+                return {}
+            
+            return self.sync_engine.companies(sprint_path)
+                
+        except Exception as e:
+            raise Exception(f"Erro ao buscar empresas: {str(e)}")
+    
     def _get_sprint_path(self, sprint_id):
         """Busca o path da sprint pelo ID"""
+        sprint = self.get_sprint_by_id(sprint_id)
+        if sprint:
+            return sprint.get("path")
+        
+        # Sprint fora da lista do time (ex.: criada depois do cache) - consultar diretamente
         try:
             api_url = f"https://dev.azure.com/{self.org}/{self.project}/{self.team}/_apis/work/teamsettings/iterations/{sprint_id}"
             params = {"api-version": "7.0"}
             
-            response = requests.get(api_url, headers=self.headers, params=params)
+            response = self.client.get(api_url, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -265,118 +381,142 @@ class AzureBoardsController:
         except Exception:
             return None
     
-    def _get_work_items_by_query(self, sprint_path):
-        """Busca work items usando WIQL (Work Item Query Language)"""
+    def _query_work_item_ids(self, sprint_path, changed_since=None):
+        """Executa a WIQL do usuário na sprint e retorna apenas os IDs (ChangedDate DESC)"""
         try:
-            # Query WIQL para buscar work items atribuídos ao usuário na sprint específica
+            # Filtro incremental: apenas itens alterados desde o watermark informado
+            changed_clause = f"AND [System.ChangedDate] > '{changed_since}'" if changed_since else ""
+            
+            # A WIQL retorna apenas referências (ids); os campos vêm do workitemsbatch
             wiql_query = {
                 "query": f"""
-                SELECT [System.Id], [System.Title], [System.State], [System.WorkItemType], 
-                       [System.AssignedTo], [System.CreatedDate], [System.ChangedDate],
-                       [Microsoft.VSTS.Common.Priority], [Microsoft.VSTS.Scheduling.Effort],
-                       [System.Description], [Microsoft.VSTS.Common.AcceptanceCriteria],
-                       [Microsoft.VSTS.CMMI.Comments], [Microsoft.VSTS.Common.Activity],
-                       [System.Tags], [System.AreaPath], [System.IterationPath]
+                SELECT [System.Id]
                 FROM WorkItems 
                 WHERE [System.TeamProject] = '{self.project}'
                 AND [System.IterationPath] = '{sprint_path}'
                 AND [System.AssignedTo] = '{self.user_name}'
+                {changed_clause}
                 ORDER BY [System.ChangedDate] DESC
                 """
             }
             
-            # URL para executar query WIQL
+            # URL para executar query WIQL (timePrecision para comparar data e hora)
             api_url = f"https://dev.azure.com/{self.org}/{self.project}/_apis/wit/wiql"
-            params = {"api-version": "7.0"}
+            params = {"api-version": "7.0", "timePrecision": "true"}
             
-            response = requests.post(api_url, headers=self.headers, params=params, json=wiql_query)
+            response = self.client.post(api_url, params=params, json=wiql_query)
             
             if response.status_code == 200:
                 data = response.json()
-                work_items = data.get("workItems", [])
-                
-                if not work_items:
-                    return []
-                
-                # Extrair IDs dos work items
-                work_item_ids = [item["id"] for item in work_items]
-                
-                # Buscar detalhes dos work items (já filtrados pela query)
-                return self._get_work_items_details_direct(work_item_ids)
-                
+                return [item["id"] for item in data.get("workItems", [])]
             else:
                 raise Exception(f"Erro na query WIQL: {response.status_code} - {response.text}")
                 
         except Exception as e:
             raise Exception(f"Erro ao executar query WIQL: {str(e)}")
     
-    def _get_work_items_details_direct(self, work_item_ids):
-        """Busca detalhes dos work items (já filtrados por usuário)"""
+    def _get_work_items_by_query(self, sprint_path, fields=WORK_ITEM_LIST_FIELDS):
+        """Busca work items usando WIQL (Work Item Query Language)"""
+        work_item_ids = self._query_work_item_ids(sprint_path)
+        
+        if not work_item_ids:
+            return []
+        
+        # Buscar detalhes dos work items (já filtrados pela query)
+        return self._get_work_items_details_direct(work_item_ids, fields)
+    
+    def _get_work_items_details_direct(self, work_item_ids, fields=WORK_ITEM_LIST_FIELDS, update_index=True):
+        """Busca detalhes dos work items (já filtrados por usuário).
+        
+        Os chunks são buscados em paralelo e o resultado mantém a ordem dos IDs
+        recebidos (ORDER BY da WIQL). Chunks que falharem são registrados em
+        self.last_fetch_errors; só é lançada exceção se todos falharem.
+        update_index=False não alimenta o índice de empresas (ids fora da WIQL)."""
+        self.last_fetch_errors = []
         try:
             if not work_item_ids:
                 return []
             
             # Dividir em chunks de 200 (limite da API)
             chunk_size = 200
-            all_work_items = []
+            chunks = [work_item_ids[i:i + chunk_size] for i in range(0, len(work_item_ids), chunk_size)]
             
-            for i in range(0, len(work_item_ids), chunk_size):
-                chunk_ids = work_item_ids[i:i + chunk_size]
-                chunk_items = self._get_work_items_chunk_direct(chunk_ids)
-                all_work_items.extend(chunk_items)
+            def fetch_chunk(chunk_ids):
+                try:
+                    return self._get_work_items_chunk_direct(chunk_ids, fields, update_index), None
+                except Exception as e:
+                    return [], str(e)
+            
+            if len(chunks) == 1:
+                results = [fetch_chunk(chunks[0])]
+            else:
+                workers = max(1, min(WORK_ITEMS_FETCH_CONCURRENCY, len(chunks)))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(fetch_chunk, chunks))
+            
+            items_by_id = {}
+            for index, (chunk_ids, (chunk_items, error)) in enumerate(zip(chunks, results)):
+                if error:
+                    print(f"Erro no chunk {index} de work items ({len(chunk_ids)} ids): {error}")
+                    self.last_fetch_errors.append({"chunk": index, "ids": chunk_ids, "error": error})
+                for item in chunk_items:
+                    items_by_id[item["id"]] = item
+            
+            if len(self.last_fetch_errors) == len(chunks):
+                raise Exception(self.last_fetch_errors[0]["error"])
             
-            return all_work_items
+            # Remontar na ordem original dos IDs
+            return [items_by_id[item_id] for item_id in work_item_ids if item_id in items_by_id]
                 
         except Exception as e:
             raise Exception(f"Erro ao buscar detalhes dos work items: {str(e)}")
     
-    def _get_work_items_chunk_direct(self, work_item_ids):
-        """Busca um chunk de work items (máximo 200) - já filtrados"""
+    def _get_work_items_chunk_direct(self, work_item_ids, fields=WORK_ITEM_LIST_FIELDS, update_index=True):
+        """Busca um chunk de work items (máximo 200) - já filtrados.
+        
+        Com fields=None todos os campos são retornados ($expand=fields)."""
         try:
-            # Converter lista de IDs para string separada por vírgulas
-            ids_string = ",".join(map(str, work_item_ids))
-            
-            # URL para buscar detalhes dos work items
-            api_url = f"https://dev.azure.com/{self.org}/{self.project}/_apis/wit/workitems"
-            params = {
-                "ids": ids_string,
-                "api-version": "7.0",
-                "$expand": "fields"
+            # URL do endpoint em lote de work items
+            api_url = f"https://dev.azure.com/{self.org}/{self.project}/_apis/wit/workitemsbatch"
+            params = {"api-version": "7.0"}
+            payload = {
+                "ids": list(work_item_ids),
+                "errorPolicy": "omit"  # Itens removidos/sem permissão voltam como null
             }
+            if fields:
+                payload["fields"] = list(fields)
+            else:
+                payload["$expand"] = "fields"
             
-            response = requests.get(api_url, headers=self.headers, params=params)
+            response = self.client.post(api_url, params=params, json=payload)
             
             if response.status_code == 200:
                 data = response.json()
-                work_items = data.get("value", [])
+                work_items = [item for item in data.get("value", []) if item]
                 
                 # Retornar work items no formato esperado pelo frontend
                 formatted_work_items = []
-                excluded_terms = {'ATA', 'TASK', 'BUG', 'FEATURE', 'USER STORY'}  # Termos que não são empresas
                 
                 for item in work_items:
-                    fields = item.get("fields", {})
-                    title = fields.get("System.Title", "")
-                    
-                    # Extrair empresa do título
-                    raw_company = self.extract_company_from_title(title)
+                    fields_data = item.get("fields", {})
+                    title = fields_data.get("System.Title", "")
                     
-                    # Normalizar e filtrar empresa
-                    company = None
-                    if raw_company:
-                        company_upper = raw_company.upper()
-                        if company_upper not in excluded_terms:
-                            company = company_upper
+                    # Extrair empresa do título (normalizada, sem termos que não são empresas)
+                    company = parse_title(title).normalized_company
                     
                     # Manter a estrutura original do item e adicionar fields + empresa
                     formatted_item = {
                         "id": item.get("id"),
                         "url": item.get("url", ""),
-                        "fields": fields,  # Manter fields para compatibilidade com o frontend
+                        "fields": fields_data,  # Manter fields para compatibilidade com o frontend
                         "company": company  # Adicionar informação de empresa normalizada
                     }
                     formatted_work_items.append(formatted_item)
                 
+                # Manter o índice de empresas atualizado a cada busca (ids vêm da WIQL do usuário)
+                if update_index:
+                    company_index.update(self.org, self.project, self.user_name, formatted_work_items)
+                
                 return formatted_work_items
                 
             else:
@@ -385,7 +525,16 @@ class AzureBoardsController:
         except Exception as e:
             raise Exception(f"Erro ao buscar chunk de work items: {str(e)}")
     
-    def get_sprint_and_work_items(self):
+    def get_work_items_fields(self, work_item_ids, fields=None):
+        """Busca sob demanda campos pesados (ou todos, com fields=None) de work items já listados"""
+        try:
+            # Ids vêm do cliente, não da WIQL: não entram no índice de empresas
+            work_items = self._get_work_items_details_direct(work_item_ids, fields, update_index=False)
+            return {item["id"]: item["fields"] for item in work_items}
+        except Exception as e:
+            raise Exception(f"Erro ao buscar campos dos work items: {str(e)}")
+    
+    def get_sprint_and_work_items(self, force_refresh=False):
         """Método principal que retorna sprint atual e work items do usuário"""
         try:
             current_sprint = self.get_current_sprint()
@@ -397,9 +546,9 @@ class AzureBoardsController:
                 }
             
             # Usar a nova implementação otimizada
-            work_items = self.get_my_work_items_in_sprint()
+            work_items = self.get_my_work_items_in_sprint(force_refresh=force_refresh)
             
-            return {
+            result = {
                 "sprint": {
                     "id": current_sprint.get("id"),
                     "name": current_sprint.get("name"),
@@ -409,8 +558,13 @@ class AzureBoardsController:
                 },
                 "work_items": work_items,
                 "total_items": len(work_items),
-                "message": f"Encontrados {len(work_items)} work items na sprint ativa"
+                "message": f"Encontrados {len(work_items)} work items na sprint ativa",
+                "sync": self.sync_engine.last_sync_stats
             }
+            if self.last_fetch_errors:
+                result["fetch_errors"] = self.last_fetch_errors
+            
+            return result
             
         except Exception as e:
             return {
@@ -420,217 +574,364 @@ class AzureBoardsController:
                 "message": f"Erro ao buscar dados: {str(e)}"
             }
     
-    def get_ata_details(self, work_item_id):
-        """Busca detalhes completos de uma ATA do Azure DevOps"""
+    def get_ata_details(self, work_item_id, include_all_fields=False, refresh=False):
+        """Busca detalhes de uma ATA do Azure DevOps.
+        
+        Os detalhes extraídos ficam em cache por revisão: enquanto System.Rev não
+        mudar, reabrir o card não baixa nem processa o work item de novo. Relações
+        e links ficam em get_ata_relations; allFields só vai com include_all_fields."""
         try:
-            # URL para buscar detalhes completos do work item
-            api_url = f"https://dev.azure.com/{self.org}/{self.project}/_apis/wit/workitems/{work_item_id}"
-            params = {
-                "api-version": "7.0",
-                "$expand": "all"  # Expandir todos os campos
-            }
+            key = (self.org, int(work_item_id))
+            revision = None if refresh else _revision_cache.get(key)
+            if revision is not None and time.time() - revision.get("checked_at", 0) > ATA_DETAIL_REVALIDATE_AFTER:
+                # Revalidação: só a revisão atual, sem os campos
+                if self._get_current_rev(work_item_id) == revision["rev"]:
+                    revision["checked_at"] = time.time()
+                else:
+                    revision = None
             
-            response = requests.get(api_url, headers=self.headers, params=params)
+            if revision is None:
+                api_url = f"https://dev.azure.com/{self.org}/{self.project}/_apis/wit/workitems/{work_item_id}"
+                response = self.client.get(api_url, params={"api-version": "7.0"})
+                if response.status_code != 200:
+                    print(f"Erro ao buscar work item {work_item_id}: {response.status_code}")
+                    return {"error": f"HTTP {response.status_code}", "id": work_item_id}
+                revision = self._remember_revision(response.json())
             
-            if response.status_code == 200:
-                data = response.json()
-                fields = data.get("fields", {})
-                
-                # Extrair informações específicas das ATAs baseado no script PowerShell
-                result = {
-                    "id": data.get("id"),
-                    "title": fields.get("System.Title", ""),
-                    "description": fields.get("System.Description", ""),
-                    "state": fields.get("System.State", ""),
-                    "workItemType": fields.get("System.WorkItemType", ""),
-                    "assignedTo": self._extract_assigned_to(fields.get("System.AssignedTo", {})),
-                    "createdDate": fields.get("System.CreatedDate", ""),
-                    "changedDate": fields.get("System.ChangedDate", ""),
-                    "tags": fields.get("System.Tags", ""),
-                    
-                    # Campos específicos das ATAs
-                    "location": self._extract_location_from_fields(fields),
-                    "startDateTime": self._extract_start_datetime_from_fields(fields),
-                    "finishDateTime": self._extract_finish_datetime_from_fields(fields),
-                    "meetingStave": self._extract_meeting_stave_from_fields(fields),
-                    "meetingSubject": self._extract_meeting_subject_from_fields(fields),
-                    "comments": self._extract_comments_from_fields(fields),
-                    "nextSteps": self._extract_next_steps_from_fields(fields),
-                    "template": fields.get("Custom.PrintingtemplatesATA", "ATA"),  # Default para ATA
-                    
-                    # Campos baseados no script PowerShell
-                    "tribe": fields.get("Custom.Tribe", ""),
-                    "originalEstimate": fields.get("Microsoft.VSTS.Scheduling.OriginalEstimate", ""),
-                    "remainingWork": fields.get("Microsoft.VSTS.Scheduling.RemainingWork", ""),
-                    "completedWork": fields.get("Microsoft.VSTS.Scheduling.CompletedWork", ""),
-                    "iterationPath": fields.get("System.IterationPath", ""),
-                    "areaPath": fields.get("System.AreaPath", ""),
-                    
-                    # Análise do título para extrair projeto e responsável
-                    "projectInfo": self._extract_project_info_from_title(fields.get("System.Title", "")),
-                    
-                    # Todos os campos para debug
-                    "allFields": fields
-                }
-                
-                return result
-            else:
-                print(f"Erro ao buscar work item {work_item_id}: {response.status_code}")
-                return {"error": f"HTTP {response.status_code}", "id": work_item_id}
+            cache_key = (self.org, int(work_item_id), revision["rev"])
+            details = _ata_detail_cache.get(cache_key)
+            if details is None:
+                details = self._build_ata_details(int(work_item_id), revision["rev"], revision["fields"])
+                _ata_detail_cache.set(cache_key, details)
+            
+            result = dict(details)
+            if include_all_fields:
+                # Todos os campos para debug
+                result["allFields"] = revision["fields"]
+            return result
                 
         except Exception as e:
             print(f"Erro ao buscar detalhes da ATA {work_item_id}: {str(e)}")
             return {"error": str(e), "id": work_item_id}
     
-    def save_ata_details(self, work_item_id, ata_data):
-        """Salva detalhes atualizados de uma ATA no Azure DevOps"""
-        try:
-            # URL para atualizar o work item
-            api_url = f"https://dev.azure.com/{self.org}/{self.project}/_apis/wit/workitems/{work_item_id}"
-            params = {
-                "api-version": "7.0"
-            }
+    def _get_current_rev(self, work_item_id):
+        """Revisão atual do work item (resposta mínima, só System.Rev)"""
+        api_url = f"https://dev.azure.com/{self.org}/{self.project}/_apis/wit/workitems/{work_item_id}"
+        response = self.client.get(api_url, params={"api-version": "7.0", "fields": "System.Rev"})
+        if response.status_code != 200:
+            raise Exception(f"Erro ao buscar revisão do work item {work_item_id}: HTTP {response.status_code}")
+        return response.json().get("rev")
+    
+    def _build_ata_details(self, work_item_id, rev, fields):
+        """Extrai as informações das ATAs (baseado no script PowerShell) a partir dos campos"""
+        return {
+            "id": work_item_id,
+            "rev": rev,
+            "title": fields.get("System.Title", ""),
+            "description": fields.get("System.Description", ""),
+            "state": fields.get("System.State", ""),
+            "workItemType": fields.get("System.WorkItemType", ""),
+            "assignedTo": self._extract_assigned_to(fields.get("System.AssignedTo", {})),
+            "createdDate": fields.get("System.CreatedDate", ""),
+            "changedDate": fields.get("System.ChangedDate", ""),
+            "tags": fields.get("System.Tags", ""),
             
-            # Preparar os campos a serem atualizados baseados nos dados recebidos
-            updates = []
-            skipped_fields = []
+            # Campos específicos das ATAs
+            "location": self._extract_location_from_fields(fields),
+            "startDateTime": self._extract_start_datetime_from_fields(fields),
+            "finishDateTime": self._extract_finish_datetime_from_fields(fields),
+            "meetingStave": self._extract_meeting_stave_from_fields(fields),
+            "meetingSubject": self._extract_meeting_subject_from_fields(fields),
+            "comments": self._extract_comments_from_fields(fields),
+            "nextSteps": self._extract_next_steps_from_fields(fields),
+            "template": fields.get("Custom.PrintingtemplatesATA", "ATA"),  # Default para ATA
             
-            # Mapear campos do frontend para campos do Azure DevOps que realmente existem
-            if "location" in ata_data and ata_data["location"]:
-                updates.append({
-                    "op": "replace",
-                    "path": "/fields/Custom.MeetingLocation",
-                    "value": ata_data["location"]
-                })
+            # Campos baseados no script PowerShell
+            "tribe": fields.get("Custom.Tribe", ""),
+            "originalEstimate": fields.get("Microsoft.VSTS.Scheduling.OriginalEstimate", ""),
+            "remainingWork": fields.get("Microsoft.VSTS.Scheduling.RemainingWork", ""),
+            "completedWork": fields.get("Microsoft.VSTS.Scheduling.CompletedWork", ""),
+            "iterationPath": fields.get("System.IterationPath", ""),
+            "areaPath": fields.get("System.AreaPath", ""),
             
-            # Agora usar os campos corretos que existem no Azure DevOps
-            if "startDateTime" in ata_data and ata_data["startDateTime"]:
-                # Converter datetime-local para formato ISO
-                start_datetime = self._convert_datetime_to_iso(ata_data["startDateTime"])
-                updates.append({
-                    "op": "replace",
-                    "path": "/fields/Custom.MeetingDateTimeStart",
-                    "value": start_datetime
-                })
+            # Análise do título para extrair projeto e responsável
+            "projectInfo": self._extract_project_info_from_title(fields.get("System.Title", ""))
+        }
+    
+    def _has_cached_details(self, work_item_id):
+        """Detalhes em cache para a revisão conhecida e ainda dentro da janela de revalidação"""
+        revision = _revision_cache.get((self.org, int(work_item_id)))
+        return (
+            revision is not None
+            and time.time() - revision.get("checked_at", 0) <= ATA_DETAIL_REVALIDATE_AFTER
+            and _ata_detail_cache.get((self.org, int(work_item_id), revision["rev"])) is not None
+        )
+    
+    def prefetch_ata_details(self, work_item_ids):
+        """Carrega no cache os detalhes de vários work items com uma requisição ao
+        endpoint em lote (máximo 200 ids). Retorna quantos foram carregados."""
+        ids = [int(work_item_id) for work_item_id in work_item_ids if not self._has_cached_details(work_item_id)]
+        if not ids:
+            return 0
+        
+        api_url = f"https://dev.azure.com/{self.org}/{self.project}/_apis/wit/workitemsbatch"
+        payload = {
+            "ids": ids[:200],
+            "$expand": "fields",
+            "errorPolicy": "omit"  # Itens removidos/sem permissão voltam como null
+        }
+        response = self.client.post(api_url, params={"api-version": "7.0"}, json=payload)
+        if response.status_code != 200:
+            raise Exception(f"Erro ao buscar detalhes dos work items: {response.status_code} - {response.text}")
+        
+        loaded = 0
+        for item in response.json().get("value", []):
+            if not item or item.get("rev") is None:
+                continue
+            revision = self._remember_revision(item)
+            cache_key = (self.org, int(item["id"]), revision["rev"])
+            if _ata_detail_cache.get(cache_key) is None:
+                _ata_detail_cache.set(cache_key, self._build_ata_details(int(item["id"]), revision["rev"], revision["fields"]))
+            loaded += 1
+        return loaded
+    
+    def get_ata_relations(self, work_item_id):
+        """Relações e links do work item, buscados só quando a tela precisa deles"""
+        api_url = f"https://dev.azure.com/{self.org}/{self.project}/_apis/wit/workitems/{work_item_id}"
+        response = self.client.get(api_url, params={"api-version": "7.0", "$expand": "relations"})
+        if response.status_code != 200:
+            raise Exception(f"Erro ao buscar relações do work item {work_item_id}: HTTP {response.status_code}")
+        data = response.json()
+        self._remember_revision(data)
+        return {
+            "id": data.get("id"),
+            "rev": data.get("rev"),
+            "relations": data.get("relations", []),
+            "links": data.get("_links", {})
+        }
+    
+    def _build_ata_updates(self, ata_data):
+        """Monta o documento JSON-patch a partir dos campos enviados pelo frontend"""
+        updates = []
+        
+        # Mapear campos do frontend para campos do Azure DevOps que realmente existem
+        if "location" in ata_data and ata_data["location"]:
+            updates.append({
+                "op": "replace",
+                "path": "/fields/Custom.MeetingLocation",
+                "value": ata_data["location"]
+            })
+        
+        # Agora usar os campos corretos que existem no Azure DevOps
+        if "startDateTime" in ata_data and ata_data["startDateTime"]:
+            # Converter datetime-local para formato ISO
+            start_datetime = self._convert_datetime_to_iso(ata_data["startDateTime"])
+            updates.append({
+                "op": "replace",
+                "path": "/fields/Custom.MeetingDateTimeStart",
+                "value": start_datetime
+            })
+        
+        if "finishDateTime" in ata_data and ata_data["finishDateTime"]:
+            # Converter datetime-local para formato ISO
+            finish_datetime = self._convert_datetime_to_iso(ata_data["finishDateTime"])
+            updates.append({
+                "op": "replace",
+                "path": "/fields/Custom.MeetingDateTimeFinish",
+                "value": finish_datetime
+            })
+        
+        if "meetingStave" in ata_data and ata_data["meetingStave"]:
+            updates.append({
+                "op": "replace",
+                "path": "/fields/Custom.MeetingStavesSubject1",
+                "value": ata_data["meetingStave"]
+            })
+        
+        if "meetingSubject" in ata_data and ata_data["meetingSubject"]:
+            updates.append({
+                "op": "replace",
+                "path": "/fields/Custom.MeetingSubject1",
+                "value": ata_data["meetingSubject"]
+            })
+        
+        if "comments" in ata_data and ata_data["comments"]:
+            # Preservar quebras de linha convertendo \n para <br>
+            comments_with_breaks = ata_data['comments'].replace('\n', '<br>\n')
+            # Converter texto em negrito **texto** para <strong>texto</strong>
+            comments_with_bold = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', comments_with_breaks)
+            comments_html = f"<div>{comments_with_bold}</div>"
+            updates.append({
+                "op": "replace",
+                "path": "/fields/Custom.MeetingComments1",
+                "value": comments_html
+            })
+        
+        # Atualizar template se fornecido
+        if "template" in ata_data and ata_data["template"]:
+            updates.append({
+                "op": "replace",
+                "path": "/fields/Custom.PrintingtemplatesATA",
+                "value": ata_data["template"]
+            })
+        
+        # Atualizar Next Steps se fornecidos
+        if "nextSteps" in ata_data and isinstance(ata_data["nextSteps"], list):
+            # Criar um dicionário para rastrear quais campos serão atualizados
+            next_steps_updates = {}
             
-            if "finishDateTime" in ata_data and ata_data["finishDateTime"]:
-                # Converter datetime-local para formato ISO
-                finish_datetime = self._convert_datetime_to_iso(ata_data["finishDateTime"])
-                updates.append({
-                    "op": "replace",
-                    "path": "/fields/Custom.MeetingDateTimeFinish",
-                    "value": finish_datetime
-                })
+            # Inicializar todos os campos como vazios
+            for step_num in range(1, 11):
+                next_steps_updates[f"Custom.MeetingAction{step_num}"] = ""
+                next_steps_updates[f"Custom.MeetingActionResponsible{step_num}"] = ""
+                next_steps_updates[f"Custom.MeetingActionDate{step_num}"] = ""
             
-            if "meetingStave" in ata_data and ata_data["meetingStave"]:
-                updates.append({
-                    "op": "replace",
-                    "path": "/fields/Custom.MeetingStavesSubject1",
-                    "value": ata_data["meetingStave"]
-                })
+            # Preencher apenas os Next Steps que têm valores
+            for step in ata_data["nextSteps"]:
+                step_num = step.get("number", 0)
+                if 1 <= step_num <= 10:  # Validar número do step
+                    # Action
+                    if "action" in step and step["action"]:
+                        next_steps_updates[f"Custom.MeetingAction{step_num}"] = step["action"]
+                    
+                    # Responsible
+                    if "responsible" in step and step["responsible"]:
+                        next_steps_updates[f"Custom.MeetingActionResponsible{step_num}"] = step["responsible"]
+                    
+                    # Date
+                    if "date" in step and step["date"]:
+                        try:
+                            # Usar a mesma função de conversão dos outros campos de datetime
+                            utc_date_formatted = self._convert_datetime_to_iso(step["date"])
+                            next_steps_updates[f"Custom.MeetingActionDate{step_num}"] = utc_date_formatted
+                        except Exception as e:
+                            print(f"Error converting date for step {step_num}: {e}")
+                            pass
             
-            if "meetingSubject" in ata_data and ata_data["meetingSubject"]:
+            # Adicionar as atualizações dos Next Steps ao updates
+            for field_path, field_value in next_steps_updates.items():
                 updates.append({
                     "op": "replace",
-                    "path": "/fields/Custom.MeetingSubject1",
-                    "value": ata_data["meetingSubject"]
+                    "path": f"/fields/{field_path}",
+                    "value": field_value
                 })
+        
+        # Status (usado pelo salvamento em lote)
+        if "status" in ata_data and ata_data["status"]:
+            updates.append({
+                "op": "replace",
+                "path": "/fields/System.State",
+                "value": ata_data["status"]
+            })
+        
+        return updates
+
+    def _remember_revision(self, data):
+        """Guarda rev e campos retornados pelo Azure DevOps (base do salvamento e do cache de detalhes)"""
+        revision = {"rev": data.get("rev"), "fields": data.get("fields", {}), "checked_at": time.time()}
+        if data.get("id") is not None and data.get("rev") is not None:
+            _revision_cache.set((self.org, int(data["id"])), revision)
+        return revision
+
+    def _get_revision(self, work_item_id, refresh=False):
+        """Última revisão conhecida do work item; busca no Azure DevOps se não houver"""
+        key = (self.org, int(work_item_id))
+        revision = None if refresh else _revision_cache.get(key)
+        if revision is None:
+            api_url = f"https://dev.azure.com/{self.org}/{self.project}/_apis/wit/workitems/{work_item_id}"
+            response = self.client.get(api_url, params={"api-version": "7.0"})
+            if response.status_code != 200:
+                raise Exception(f"Erro ao buscar revisão do work item {work_item_id}: HTTP {response.status_code}")
+            revision = self._remember_revision(response.json())
+        return revision
+
+    @staticmethod
+    def _same_field_value(current, new):
+        """Compara o valor atual do campo com o novo (vazio == ausente; datas pelo instante)"""
+        current = "" if current is None else current
+        new = "" if new is None else new
+        if isinstance(current, str) and isinstance(new, str):
+            if current.strip() == new.strip():
+                return True
+            try:
+                return datetime.fromisoformat(current.replace('Z', '+00:00')) == datetime.fromisoformat(new.replace('Z', '+00:00'))
+            except ValueError:
+                return False
+        return str(current) == str(new)
+
+    def _diff_updates(self, updates, fields):
+        """Mantém apenas as operações que alteram o valor atual do campo"""
+        changed = []
+        for update in updates:
+            field_name = update["path"][len("/fields/"):]
+            if not self._same_field_value(fields.get(field_name), update["value"]):
+                changed.append(update)
+        return changed
+
+    def save_ata_details(self, work_item_id, ata_data):
+        """Salva detalhes atualizados de uma ATA no Azure DevOps.
+        
+        Envia apenas os campos que mudaram em relação à última revisão conhecida,
+        com uma operação test em /rev (concorrência otimista). Se ata_data trouxer
+        "rev" (revisão carregada pelo usuário) e o work item tiver mudado desde
+        então, o salvamento é recusado como conflito. Sem "rev", a revisão atual é
+        buscada no Azure DevOps antes da comparação (o cache pode estar desatualizado)."""
+        try:
+            # URL para atualizar o work item
+            api_url = f"https://dev.azure.com/{self.org}/{self.project}/_apis/wit/workitems/{work_item_id}"
+            params = {
+                "api-version": "7.0"
+            }
             
-            if "comments" in ata_data and ata_data["comments"]:
-                # Preservar quebras de linha convertendo \n para <br>
-                comments_with_breaks = ata_data['comments'].replace('\n', '<br>\n')
-                # Converter texto em negrito **texto** para <strong>texto</strong>
-                comments_with_bold = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', comments_with_breaks)
-                comments_html = f"<div>{comments_with_bold}</div>"
-                updates.append({
-                    "op": "replace",
-                    "path": "/fields/Custom.MeetingComments1",
-                    "value": comments_html
-                })
+            # Preparar os campos a serem atualizados baseados nos dados recebidos
+            all_updates = self._build_ata_updates(ata_data)
+            client_rev = int(ata_data["rev"]) if ata_data.get("rev") not in (None, "") else None
             
-            # Atualizar template se fornecido
-            if "template" in ata_data and ata_data["template"]:
-                updates.append({
-                    "op": "replace",
-                    "path": "/fields/Custom.PrintingtemplatesATA",
-                    "value": ata_data["template"]
-                })
+            # Headers para a requisição PATCH
+            headers = {"Content-Type": "application/json-patch+json"}
             
-            # Atualizar Next Steps se fornecidos
-            if "nextSteps" in ata_data and isinstance(ata_data["nextSteps"], list):
-                # Criar um dicionário para rastrear quais campos serão atualizados
-                next_steps_updates = {}
+            for attempt in range(2):
+                revision = self._get_revision(work_item_id, refresh=attempt > 0 or client_rev is None)
+                if client_rev is not None and revision["rev"] != client_rev:
+                    # Cache pode estar atrás da revisão que o usuário carregou
+                    revision = self._get_revision(work_item_id, refresh=True)
+                    if revision["rev"] != client_rev:
+                        return self._conflict_result(work_item_id, revision["rev"])
                 
-                # Inicializar todos os campos como vazios
-                for step_num in range(1, 11):
-                    next_steps_updates[f"Custom.MeetingAction{step_num}"] = ""
-                    next_steps_updates[f"Custom.MeetingActionResponsible{step_num}"] = ""
-                    next_steps_updates[f"Custom.MeetingActionDate{step_num}"] = ""
+                updates = self._diff_updates(all_updates, revision["fields"])
                 
-                # Preencher apenas os Next Steps que têm valores
-                for step in ata_data["nextSteps"]:
-                    step_num = step.get("number", 0)
-                    if 1 <= step_num <= 10:  # Validar número do step
-                        # Action
-                        if "action" in step and step["action"]:
-                            next_steps_updates[f"Custom.MeetingAction{step_num}"] = step["action"]
-                        
-                        # Responsible
-                        if "responsible" in step and step["responsible"]:
-                            next_steps_updates[f"Custom.MeetingActionResponsible{step_num}"] = step["responsible"]
-                        
-                        # Date
-                        if "date" in step and step["date"]:
-                            try:
-                                # Usar a mesma função de conversão dos outros campos de datetime
-                                utc_date_formatted = self._convert_datetime_to_iso(step["date"])
-                                next_steps_updates[f"Custom.MeetingActionDate{step_num}"] = utc_date_formatted
-                            except Exception as e:
-                                print(f"Error converting date for step {step_num}: {e}")
-                                pass
+                # Se não há atualizações, nada a enviar
+                if not updates:
+                    return {"success": True, "message": "Nenhuma alteração para salvar", "id": work_item_id, "rev": revision["rev"], "updatedFields": 0}
                 
-                # Adicionar as atualizações dos Next Steps ao updates
-                for field_path, field_value in next_steps_updates.items():
-                    updates.append({
-                        "op": "replace",
-                        "path": f"/fields/{field_path}",
-                        "value": field_value
-                    })
-            
-            # Se não há atualizações, retornar informação sobre campos ignorados
-            if not updates:
-                message = "Nenhuma alteração para salvar"
-                if skipped_fields:
-                    message += f". Campos ignorados: {', '.join(skipped_fields)}"
-                return {"success": True, "message": message, "id": work_item_id}
-            
-            # Headers para a requisição PATCH
-            headers = self.headers.copy()
-            headers["Content-Type"] = "application/json-patch+json"
-            
-            print(f"Updating work item {work_item_id} with {len(updates)} field(s)")
-            for update in updates:
-                print(f"  - {update['path']}: {str(update['value'])[:50]}...")
-            
-            if skipped_fields:
-                print(f"Skipped fields: {', '.join(skipped_fields)}")
-            
-            response = requests.patch(api_url, json=updates, headers=headers, params=params)
-            
-            if response.status_code == 200:
-                print(f"Successfully updated work item {work_item_id}")
-                message = "ATA salva com sucesso!"
-                if skipped_fields:
-                    message += f" (Campos de data/hora não foram salvos - campos não existem no Azure DevOps)"
+                print(f"Updating work item {work_item_id} with {len(updates)} of {len(all_updates)} field(s) (rev {revision['rev']})")
+                for update in updates:
+                    print(f"  - {update['path']}: {str(update['value'])[:50]}...")
+                
+                patch = [{"op": "test", "path": "/rev", "value": revision["rev"]}] + updates
+                response = self.client.patch(api_url, json=patch, headers=headers, params=params)
+                
+                if response.status_code == 200:
+                    print(f"Successfully updated work item {work_item_id}")
+                    data = response.json()
+                    self._remember_revision(data)
+                    self.sync_engine.mark_stale()
+                    return {
+                        "success": True, 
+                        "message": "ATA salva com sucesso!",
+                        "id": work_item_id,
+                        "rev": data.get("rev"),
+                        "updatedFields": len(updates),
+                        "skippedFields": []
+                    }
+                
+                # Falha do test em /rev: o work item mudou depois da revisão usada como base
+                if response.status_code in (409, 412):
+                    if client_rev is not None:
+                        return self._conflict_result(work_item_id, None)
+                    print(f"Revision conflict on work item {work_item_id}, retrying with latest revision")
+                    continue
                 
-                return {
-                    "success": True, 
-                    "message": message,
-                    "id": work_item_id,
-                    "updatedFields": len(updates),
-                    "skippedFields": skipped_fields
-                }
-            else:
                 error_msg = f"HTTP {response.status_code}"
                 try:
                     error_detail = response.json()
@@ -640,10 +941,21 @@ class AzureBoardsController:
                 
                 print(f"Failed to update work item {work_item_id}: {error_msg}")
                 return {"error": error_msg, "id": work_item_id}
+            
+            return self._conflict_result(work_item_id, None)
                 
         except Exception as e:
             print(f"Exception while saving ATA {work_item_id}: {str(e)}")
             return {"error": str(e), "id": work_item_id}
+
+    def _conflict_result(self, work_item_id, current_rev):
+        print(f"Conflict saving work item {work_item_id}: changed by someone else")
+        return {
+            "error": "A ATA foi alterada por outra pessoa desde que foi carregada. Recarregue para ver a versão atual.",
+            "conflict": True,
+            "id": work_item_id,
+            "rev": current_rev
+        }
     
     def update_work_item_status(self, work_item_id, new_status):
         """Atualiza apenas o status de um work item no Azure DevOps"""
@@ -653,8 +965,7 @@ class AzureBoardsController:
             params = {"api-version": "7.0"}
             
             # Headers para PATCH (JSON Patch)
-            headers = self.headers.copy()
-            headers["Content-Type"] = "application/json-patch+json"
+            headers = {"Content-Type": "application/json-patch+json"}
             
             # Preparar a atualização do status
             updates = [
@@ -667,15 +978,19 @@ class AzureBoardsController:
             
             print(f"Updating work item {work_item_id} status to: {new_status}")
             
-            response = requests.patch(api_url, json=updates, headers=headers, params=params)
+            response = self.client.patch(api_url, json=updates, headers=headers, params=params)
             
             if response.status_code == 200:
                 print(f"Successfully updated work item {work_item_id} status to {new_status}")
+                data = response.json()
+                self._remember_revision(data)
+                self.sync_engine.mark_stale()
                 return {
                     "success": True, 
                     "message": f"Status atualizado para {new_status}",
                     "id": work_item_id,
-                    "new_status": new_status
+                    "new_status": new_status,
+                    "rev": data.get("rev")
                 }
             else:
                 error_msg = f"HTTP {response.status_code}"
@@ -692,10 +1007,159 @@ class AzureBoardsController:
             print(f"Exception while updating status for work item {work_item_id}: {str(e)}")
             return {"error": str(e), "id": work_item_id}
 
+    def _fetch_revisions(self, work_item_ids):
+        """Busca a revisão atual de vários work items pelo endpoint em lote (200 por requisição)"""
+        revisions = {}
+        api_url = f"https://dev.azure.com/{self.org}/{self.project}/_apis/wit/workitemsbatch"
+        for start in range(0, len(work_item_ids), 200):
+            payload = {
+                "ids": work_item_ids[start:start + 200],
+                "$expand": "fields",
+                "errorPolicy": "omit"  # Itens removidos/sem permissão voltam como null
+            }
+            response = self.client.post(api_url, params={"api-version": "7.0"}, json=payload)
+            if response.status_code != 200:
+                raise Exception(f"Erro ao buscar revisões dos work items: {response.status_code} - {response.text}")
+            for item in response.json().get("value", []):
+                if item and item.get("rev") is not None:
+                    revisions[int(item["id"])] = self._remember_revision(item)
+        return revisions
+
+    def save_ata_details_bulk(self, items):
+        """Salva várias ATAs com o endpoint $batch de work items.
+        
+        items é uma lista de {"id": ..., "rev": ..., "changes": {...}} com os mesmos
+        campos de save_ata_details (e "status" para System.State). Como no salvamento
+        individual, cada item envia só os campos alterados em relação à revisão atual,
+        com test em /rev; "rev" (opcional) é a revisão carregada pelo usuário.
+        Retorna o resultado por item, na ordem recebida."""
+        results = [None] * len(items)
+        parsed = []
+        
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = {"id": None, "error": "Item inválido: esperado {id, changes}"}
+                continue
+            work_item_id = item.get("id")
+            try:
+                work_item_id = int(work_item_id)
+                changes = item.get("changes") or {}
+                if not isinstance(changes, dict):
+                    raise ValueError("changes deve ser um objeto")
+                client_rev = item.get("rev", changes.get("rev"))
+                client_rev = int(client_rev) if client_rev not in (None, "") else None
+                all_updates = self._build_ata_updates(changes)
+            except (TypeError, ValueError, AttributeError) as e:
+                results[index] = {"id": work_item_id, "error": f"Item inválido: {str(e)}"}
+                continue
+            
+            if not all_updates:
+                results[index] = {"id": work_item_id, "success": True, "message": "Nenhuma alteração para salvar", "updatedFields": 0}
+                continue
+            
+            parsed.append((index, work_item_id, client_rev, all_updates))
+        
+        # Revisão atual de todos os itens em poucas requisições (base do diff e do test em /rev)
+        try:
+            revisions = self._fetch_revisions(sorted({work_item_id for _, work_item_id, _, _ in parsed}))
+        except Exception as e:
+            print(f"Failed to fetch revisions for $batch update: {str(e)}")
+            for index, work_item_id, _, _ in parsed:
+                results[index] = {"id": work_item_id, "error": str(e)}
+            parsed = []
+        
+        requests_batch = []
+        for index, work_item_id, client_rev, all_updates in parsed:
+            revision = revisions.get(work_item_id)
+            if revision is None:
+                results[index] = {"id": work_item_id, "error": "Work item não encontrado"}
+                continue
+            if client_rev is not None and revision["rev"] != client_rev:
+                results[index] = self._conflict_result(work_item_id, revision["rev"])
+                continue
+            
+            updates = self._diff_updates(all_updates, revision["fields"])
+            if not updates:
+                results[index] = {"id": work_item_id, "success": True, "message": "Nenhuma alteração para salvar", "rev": revision["rev"], "updatedFields": 0}
+                continue
+            
+            patch = [{"op": "test", "path": "/rev", "value": revision["rev"]}] + updates
+            requests_batch.append((index, work_item_id, patch))
+        
+        api_url = f"https://dev.azure.com/{self.org}/_apis/wit/$batch"
+        params = {"api-version": "5.0"}
+        
+        for start in range(0, len(requests_batch), WORK_ITEMS_BATCH_UPDATE_SIZE):
+            group = requests_batch[start:start + WORK_ITEMS_BATCH_UPDATE_SIZE]
+            payload = [
+                {
+                    "method": "PATCH",
+                    "uri": f"/_apis/wit/workitems/{work_item_id}?api-version=5.0",
+                    "headers": {"Content-Type": "application/json-patch+json"},
+                    "body": patch
+                }
+                for _, work_item_id, patch in group
+            ]
+            
+            print(f"Updating {len(group)} work item(s) via $batch")
+            
+            try:
+                response = self.client.post(api_url, json=payload, params=params)
+                if response.status_code != 200:
+                    raise Exception(f"HTTP {response.status_code}: {response.text}")
+                responses = response.json().get("value", [])
+            except Exception as e:
+                print(f"Failed to send $batch update: {str(e)}")
+                for index, work_item_id, _ in group:
+                    results[index] = {"id": work_item_id, "error": str(e)}
+                continue
+            
+            # As respostas do $batch vêm na mesma ordem das requisições
+            for (index, work_item_id, patch), item_response in zip(group, responses):
+                code = item_response.get("code")
+                try:
+                    body = json.loads(item_response.get("body") or "{}")
+                except (TypeError, ValueError):
+                    body = None
+                if not isinstance(body, dict):
+                    body = {"message": item_response.get("body")}
+                
+                if code == 200:
+                    # Revisão nova: base do próximo salvamento e do cache de detalhes
+                    revision = self._remember_revision(body) if body.get("rev") is not None else None
+                    if revision is None:
+                        _revision_cache.invalidate((self.org, int(work_item_id)))
+                    results[index] = {
+                        "id": work_item_id,
+                        "success": True,
+                        "message": "ATA salva com sucesso!",
+                        "rev": body.get("rev"),
+                        "updatedFields": len(patch) - 1
+                    }
+                elif code in (409, 412):
+                    # Falha do test em /rev: alterado entre a leitura da revisão e o envio
+                    _revision_cache.invalidate((self.org, int(work_item_id)))
+                    results[index] = self._conflict_result(work_item_id, None)
+                else:
+                    results[index] = {"id": work_item_id, "error": f"HTTP {code}: {body.get('message', item_response.get('body'))}"}
+            
+            for index, work_item_id, _ in group[len(responses):]:
+                results[index] = {"id": work_item_id, "error": "Sem resposta do $batch para este item"}
+        
+        succeeded = sum(1 for result in results if result.get("success"))
+        if any(result.get("success") and result.get("updatedFields") for result in results):
+            self.sync_engine.mark_stale()
+        
+        return {
+            "results": results,
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        }
+
     def _convert_datetime_to_iso(self, datetime_local):
         """Converte datetime-local para formato ISO do Azure DevOps (adiciona 3h para UTC)"""
         try:
-            from datetime import datetime, timedelta
             # datetime_local está no formato: "2025-09-30T14:30" (horário local Brasil)
             dt = datetime.fromisoformat(datetime_local)
             # Adicionar 3 horas para converter para UTC (Azure DevOps armazena em UTC)
@@ -708,6 +1172,12 @@ class AzureBoardsController:
             print(f"Error converting datetime {datetime_local}: {e}")
             return datetime_local
     
+    def _utc_to_local(self, value):
+        """Converte data UTC do Azure DevOps para datetime-local no horário do Brasil (UTC-3)"""
+        if value.endswith('Z'):
+            value = value[:-1]
+        return (datetime.fromisoformat(value) - timedelta(hours=3)).strftime("%Y-%m-%dT%H:%M")
+    
     def _extract_location_from_fields(self, fields):
         """Extrai informação de local dos campos disponíveis"""
         # Primeiro tentar campos específicos de localização
@@ -744,18 +1214,7 @@ class AzureBoardsController:
         start_datetime = fields.get("Custom.MeetingDateTimeStart", "")
         if start_datetime:
             try:
-                # Azure DevOps armazena em UTC, mas precisamos converter de volta para horário local BR (UTC-3)
-                from datetime import datetime, timedelta
-                
-                # Parse do datetime UTC
-                if start_datetime.endswith('Z'):
-                    start_datetime = start_datetime[:-1]  # Remove 'Z'
-                
-                date_obj = datetime.fromisoformat(start_datetime)
-                # Subtrair 3 horas para voltar ao horário local do Brasil
-                local_date_obj = date_obj - timedelta(hours=3)
-                result = local_date_obj.strftime("%Y-%m-%dT%H:%M")
-                
+                result = self._utc_to_local(start_datetime)
                 print(f"DEBUG: Start datetime UTC->Local: {fields.get('Custom.MeetingDateTimeStart')} -> {result}")
                 return result
             except Exception as e:
@@ -769,7 +1228,6 @@ class AzureBoardsController:
         if project_info.get("activityDate"):
             # Converter formato DD/MM/AAAA para AAAA-MM-DD
             try:
-                from datetime import datetime
                 activity_date = project_info["activityDate"]
                 date_obj = datetime.strptime(activity_date, "%d/%m/%Y")
                 # Adicionar horário padrão de 09:00 para início
@@ -782,7 +1240,6 @@ class AzureBoardsController:
         if created_date:
             try:
                 # Converter formato ISO para datetime-local
-                from datetime import datetime
                 date_obj = datetime.fromisoformat(created_date.replace('Z', '+00:00'))
                 return date_obj.strftime("%Y-%m-%dT%H:%M")
             except:
@@ -796,18 +1253,7 @@ class AzureBoardsController:
         finish_datetime = fields.get("Custom.MeetingDateTimeFinish", "")
         if finish_datetime:
             try:
-                # Azure DevOps armazena em UTC, mas precisamos converter de volta para horário local BR (UTC-3)
-                from datetime import datetime, timedelta
-                
-                # Parse do datetime UTC
-                if finish_datetime.endswith('Z'):
-                    finish_datetime = finish_datetime[:-1]  # Remove 'Z'
-                
-                date_obj = datetime.fromisoformat(finish_datetime)
-                # Subtrair 3 horas para voltar ao horário local do Brasil
-                local_date_obj = date_obj - timedelta(hours=3)
-                result = local_date_obj.strftime("%Y-%m-%dT%H:%M")
-                
+                result = self._utc_to_local(finish_datetime)
                 print(f"DEBUG: Finish datetime UTC->Local: {fields.get('Custom.MeetingDateTimeFinish')} -> {result}")
                 return result
             except Exception as e:
@@ -818,7 +1264,6 @@ class AzureBoardsController:
         start_datetime = self._extract_start_datetime_from_fields(fields)
         if start_datetime:
             try:
-                from datetime import datetime, timedelta
                 start_obj = datetime.fromisoformat(start_datetime)
                 finish_obj = start_obj + timedelta(hours=2)
                 return finish_obj.strftime("%Y-%m-%dT%H:%M")
@@ -887,14 +1332,7 @@ class AzureBoardsController:
                 date_formatted = ""
                 if date_raw:
                     try:
-                        from datetime import datetime, timedelta
-                        if date_raw.endswith('Z'):
-                            date_raw = date_raw[:-1]
-                        date_obj = datetime.fromisoformat(date_raw)
-                        # Subtrair 3 horas para converter UTC para horário local
-                        local_date_obj = date_obj - timedelta(hours=3)
-                        # Usar formato datetime-local (YYYY-MM-DDTHH:MM)
-                        date_formatted = local_date_obj.strftime("%Y-%m-%dT%H:%M")
+                        date_formatted = self._utc_to_local(date_raw)
                         print(f"DEBUG: Next Step {i} date UTC->Local: {date_raw} -> {date_formatted}")
                     except Exception as e:
                         print(f"Error converting Next Step {i} date: {e}")
@@ -921,10 +1359,8 @@ class AzureBoardsController:
         comment_value = fields.get("Custom.MeetingComments1", "")
         
         if comment_value and isinstance(comment_value, str):
-            # Remover apenas as tags HTML, mantendo todo o conteúdo e espaçamento
-            import re
             # Remove tags HTML mas preserva todo o texto e espaçamento interno
-            clean_comments = re.sub(r'<[^>]+>', '', comment_value)
+            clean_comments = _HTML_TAG_RE.sub('', comment_value)
             return self._fix_encoding(clean_comments)
         
         # Fallback para outros campos se o principal não existir
@@ -937,24 +1373,12 @@ class AzureBoardsController:
         for field_name in fallback_fields:
             field_value = fields.get(field_name, "")
             if field_value and isinstance(field_value, str):
-                import re
-                clean_comments = re.sub(r'<[^>]+>', '', field_value)
+                clean_comments = _HTML_TAG_RE.sub('', field_value)
                 return self._fix_encoding(clean_comments)
         
         return ""
     
     def _extract_project_info_from_title(self, title):
         """Extrai informações do projeto baseado no padrão do título"""
-        import re
-        
         # Padrão: [PROJETO][RESPONSAVEL] Descrição - Atividade do dia DD/MM/AAAA
-        project_match = re.search(r'\[([^\]]+)\]', title)
-        responsible_match = re.search(r'\]\[([^\]]+)\]', title)
-        date_match = re.search(r'Atividade do dia (\d{2}/\d{2}/\d{4})', title)
-        
-        return {
-            "project": project_match.group(1) if project_match else "",
-            "responsible": responsible_match.group(1) if responsible_match else "",
-            "activityDate": date_match.group(1) if date_match else "",
-            "isTOTVS": "TOTVS" in title.upper()
-        }
\ No newline at end of file
+        return parse_title(title).project_info()
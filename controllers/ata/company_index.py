@@ -0,0 +1,75 @@
+import threading
+from collections import Counter
+
+
+class CompanyIndex:
+    """Índice em memória empresa -> work items, mantido a cada busca de work items.
+
+    O escopo é (org, projeto, iteration path, usuário), onde usuário é aquele cuja
+    WIQL trouxe o item (não o nome exibido em System.AssignedTo, que pode divergir
+    do configurado). Permite responder /api/companies sem refazer a busca."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = {}    # (org, project, id) -> (scope, company, state)
+        self._scopes = {}   # scope -> {company: {id: state}}
+        self._loaded = set()
+
+    def update(self, org, project, user, items):
+        """Registra/atualiza work items (formato do controller: id, fields, company) do usuário"""
+        with self._lock:
+            for item in items:
+                fields = item.get("fields", {})
+                if "System.IterationPath" not in fields:
+                    continue  # Projeção sem os campos de escopo (ex.: busca de campos pesados)
+
+                scope = (org, project, fields.get("System.IterationPath", ""), user)
+                self._discard((org, project, item["id"]))
+
+                company = item.get("company")
+                state = fields.get("System.State", "")
+                self._items[(org, project, item["id"])] = (scope, company, state)
+                if company:
+                    self._scopes.setdefault(scope, {}).setdefault(company, {})[item["id"]] = state
+
+    def remove(self, org, project, ids):
+        """Remove work items que saíram do escopo"""
+        with self._lock:
+            for item_id in ids:
+                self._discard((org, project, item_id))
+
+    def _discard(self, key):
+        previous = self._items.pop(key, None)
+        if not previous:
+            return
+        scope, company, _ = previous
+        companies = self._scopes.get(scope, {})
+        if company in companies:
+            companies[company].pop(key[2], None)
+            if not companies[company]:
+                del companies[company]
+
+    def is_loaded(self, scope):
+        with self._lock:
+            return scope in self._loaded
+
+    def mark_loaded(self, scope):
+        with self._lock:
+            self._loaded.add(scope)
+
+    def get_companies(self, scope):
+        """Empresas do escopo com ids, quantidade e distribuição de estados"""
+        with self._lock:
+            companies = self._scopes.get(scope, {})
+            return {
+                company: {
+                    "ids": sorted(items.keys()),
+                    "count": len(items),
+                    "states": dict(Counter(items.values()))
+                }
+                for company, items in sorted(companies.items())
+            }
+
+
+# Índice compartilhado pelo processo
+company_index = CompanyIndex()
@@ -1,68 +1,249 @@
 import os
 import re
-from openai import OpenAI
+import json
+import threading
 from datetime import datetime
-
-# Configurações do cliente OpenAI
-HF_TOKEN = os.getenv("HF_TOKEN", "")
-client = OpenAI(
-    base_url="https://router.huggingface.co/v1",
-    api_key=HF_TOKEN
+from concurrent.futures import ThreadPoolExecutor
+from controllers.ata.resumo_segmenter import dividir_resumo
+from controllers.ata.ata_cache import ata_cache, chave_ata
+from controllers.ata.template_store import template_store
+from controllers.ata.llm_backend import get_llm_backend
+from controllers.ata.token_budget import (
+    estimar_tokens, estimar_tokens_saida, dividir_em_blocos, ATA_RESUMO_MAX_TOKENS
 )
 
-TEMPLATE_PATH = "template.md"
+# Backend de geração (ATA_LLM_BACKEND / ATA_MODEL)
+llm = get_llm_backend()
+
+# Parâmetros da geração (junto com o modelo, compõem a chave do cache de ATAs);
+# max_tokens é estimado por segmento a partir do tamanho do resumo (token_budget)
+ATA_TEMPERATURE = 0.7
+
+# Gerações simultâneas ao dividir o resumo em várias ATAs (dia/empresa/requerimento)
+ATA_MAX_WORKERS = int(os.getenv("ATA_MAX_WORKERS", "4"))
+
+# Chamadas simultâneas ao modelo no processo (jobs, streaming e gerações em paralelo),
+# para respeitar o limite de requisições do router do Hugging Face
+ATA_LLM_MAX_CONCURRENCY = int(os.getenv("ATA_LLM_MAX_CONCURRENCY", "4"))
+_llm_slots = threading.BoundedSemaphore(max(1, ATA_LLM_MAX_CONCURRENCY))
 
 class AtaController:
     @staticmethod
-    def gerar_ata(resumo, template, data, requerimento, titulo):
-        """Gera uma ATA usando o modelo de IA"""
-        prompt = f"""
-Você é um agente que gera atas conforme o template abaixo. 
-Resumo do usuário: {resumo}
-Data: {data}
-Requerimento da ATA: {requerimento}
-Título: {titulo}
-Template: {template}
-Gere a ata preenchida conforme as regras do template, com tópicos e contexto descritivo.
-"""
-        completion = client.chat.completions.create(
-            model="moonshotai/Kimi-K2-Instruct",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=512,
-            temperature=0.7
+    def _montar_prompt(resumo, template, data, requerimento, titulo):
+        """Monta o prompt enviado ao modelo a partir do esqueleto pré-compilado do template"""
+        return template.montar_prompt(resumo, data, requerimento, titulo)
+
+    @staticmethod
+    def _chave_cache(resumo, template, data, requerimento, titulo, max_tokens):
+        """Chave do cache: tudo que altera a resposta do modelo"""
+        return chave_ata(
+            model=llm.model,
+            template=template.digest,
+            resumo=resumo,
+            data=data,
+            requerimento=requerimento,
+            titulo=titulo,
+            temperature=ATA_TEMPERATURE,
+            max_tokens=max_tokens
         )
-        return completion.choices[0].message.content
 
     @staticmethod
-    def processar_gerar_ata(data, requerimento, resumo):
+    def _novo_uso(max_tokens):
+        """Contagem (estimada) de tokens reportada junto com a ATA"""
+        return {"entrada": 0, "saida": 0, "max_saida": max_tokens, "blocos": 1, "cache": False}
+
+    @staticmethod
+    def _condensar_resumo(resumo, tokens_resumo, uso):
+        """Resumos acima de ATA_RESUMO_MAX_TOKENS são divididos em blocos e cada bloco
+        é condensado pelo modelo; a ATA é gerada a partir dos blocos condensados"""
+        if tokens_resumo <= ATA_RESUMO_MAX_TOKENS:
+            return resumo
+
+        blocos = dividir_em_blocos(resumo, ATA_RESUMO_MAX_TOKENS)
+        limite_bloco = max(64, ATA_RESUMO_MAX_TOKENS // len(blocos))
+
+        def condensar(bloco):
+            prompt = (
+                "Condense o trecho abaixo de um resumo de atividades em no máximo "
+                f"{limite_bloco} tokens, mantendo datas, empresas, nomes e fatos, sem inventar informações:\n{bloco}"
+            )
+            with _llm_slots:
+                texto = llm.complete(prompt, limite_bloco, ATA_TEMPERATURE)
+            return prompt, texto or ""
+
+        with ThreadPoolExecutor(max_workers=max(1, min(ATA_MAX_WORKERS, len(blocos)))) as executor:
+            resultados = list(executor.map(condensar, blocos))
+
+        uso["blocos"] = len(blocos)
+        uso["entrada"] += sum(estimar_tokens(prompt) for prompt, _ in resultados)
+        uso["saida"] += sum(estimar_tokens(texto) for _, texto in resultados)
+        return "\n".join(texto for _, texto in resultados)
+
+    @staticmethod
+    def _preparar_geracao(resumo, template, data, requerimento, titulo):
+        """Estima max_tokens pelo tamanho do resumo e monta a chave do cache"""
+        tokens_resumo = estimar_tokens(resumo)
+        max_tokens = estimar_tokens_saida(min(tokens_resumo, ATA_RESUMO_MAX_TOKENS), template.tokens)
+        chave = AtaController._chave_cache(resumo, template, data, requerimento, titulo, max_tokens)
+        return tokens_resumo, max_tokens, chave
+
+    @staticmethod
+    def _montar_prompt_orcado(resumo, tokens_resumo, template, data, requerimento, titulo, uso):
+        resumo_prompt = AtaController._condensar_resumo(resumo, tokens_resumo, uso)
+        tokens_resumo_prompt = tokens_resumo if resumo_prompt is resumo else estimar_tokens(resumo_prompt)
+        uso["entrada"] += template.tokens + tokens_resumo_prompt + estimar_tokens(f"{data}{requerimento}{titulo}")
+        return AtaController._montar_prompt(resumo_prompt, template, data, requerimento, titulo)
+
+    @staticmethod
+    def gerar_ata(resumo, template, data, requerimento, titulo, force_regenerate=False):
+        """Gera uma ATA usando o modelo de IA (reaproveita o cache para a mesma entrada).
+        
+        Retorna (ata, uso) com os tokens de entrada e saída da requisição."""
+        tokens_resumo, max_tokens, chave = AtaController._preparar_geracao(resumo, template, data, requerimento, titulo)
+        uso = AtaController._novo_uso(max_tokens)
+        if not force_regenerate:
+            ata = ata_cache.get(chave)
+            if ata is not None:
+                uso["cache"] = True
+                return ata, uso
+
+        prompt = AtaController._montar_prompt_orcado(resumo, tokens_resumo, template, data, requerimento, titulo, uso)
+        with _llm_slots:
+            ata = llm.complete(prompt, max_tokens, ATA_TEMPERATURE)
+        uso["saida"] += estimar_tokens(ata)
+        if ata:
+            ata_cache.set(chave, ata)
+        return ata, uso
+
+    @staticmethod
+    def gerar_ata_stream(resumo, template, data, requerimento, titulo, force_regenerate=False, uso=None):
+        """Gera uma ATA em modo streaming, retornando os trechos de texto conforme chegam.
+        
+        Com a ATA em cache, o texto completo é retornado em um único trecho.
+        Se informado, o dict uso é preenchido com a contagem de tokens."""
+        tokens_resumo, max_tokens, chave = AtaController._preparar_geracao(resumo, template, data, requerimento, titulo)
+        if uso is None:
+            uso = {}
+        uso.update(AtaController._novo_uso(max_tokens))
+        if not force_regenerate:
+            ata = ata_cache.get(chave)
+            if ata is not None:
+                uso["cache"] = True
+                yield ata
+                return
+
+        prompt = AtaController._montar_prompt_orcado(resumo, tokens_resumo, template, data, requerimento, titulo, uso)
+        partes = []
+        with _llm_slots:
+            for delta in llm.stream(prompt, max_tokens, ATA_TEMPERATURE):
+                partes.append(delta)
+                yield delta
+        
+        # Só entra no cache a geração que chegou até o fim
+        ata = "".join(partes)
+        uso["saida"] += estimar_tokens(ata)
+        if ata:
+            ata_cache.set(chave, ata)
+
+    @staticmethod
+    def _carregar_template(nome=None):
+        """Template em memória (recarregado apenas quando o arquivo é alterado)"""
+        return template_store.get(nome)
+
+    @staticmethod
+    def _montar_resultado(ata):
+        """Extrai os componentes da ATA gerada"""
+        return {
+            "ata": ata,
+            "titulo": AtaController._extrair_titulo_da_ata(ata),
+            "proximos": AtaController._extrair_proximos_passos_da_ata(ata),
+            "corpo": AtaController._extrair_corpo_principal_da_ata(ata)
+        }
+
+    @staticmethod
+    def processar_gerar_ata(data, requerimento, resumo, force_regenerate=False, template_nome=None):
         """Processa a solicitação de geração de ATA"""
         titulo = "Atividades do dia"
+        template = AtaController._carregar_template(template_nome)
         
         try:
-            with open(TEMPLATE_PATH, "r", encoding="utf-8") as f:
-                template = f.read()
-        except FileNotFoundError:
-            raise Exception(f"Template não encontrado: {TEMPLATE_PATH}")
-        
-        try:
-            ata = AtaController.gerar_ata(resumo, template, data, requerimento, titulo)
+            ata, uso = AtaController.gerar_ata(resumo, template, data, requerimento, titulo, force_regenerate)
         except Exception as e:
             raise Exception(f"Erro ao gerar ATA: {str(e)}")
         
         # Extrair componentes da ATA
-        titulo_extraido = AtaController._extrair_titulo_da_ata(ata)
-        proximos = AtaController._extrair_proximos_passos_da_ata(ata)
-        corpo = AtaController._extrair_corpo_principal_da_ata(ata)
+        resultado = AtaController._montar_resultado(ata)
+        resultado["tokens"] = uso
+        return resultado
+
+    @staticmethod
+    def processar_gerar_atas(data, requerimento, resumo, force_regenerate=False, template_nome=None):
+        """Divide o resumo por dia/empresa/requerimento e gera uma ATA por segmento em paralelo"""
+        template = AtaController._carregar_template(template_nome)
+        segmentos = dividir_resumo(resumo, data, requerimento)
+        
+        def gerar_segmento(segmento):
+            titulo = "Atividades do dia"
+            if segmento["empresa"]:
+                titulo = f"[{segmento['empresa']}] {titulo}"
+            resultado = dict(segmento)
+            # Cabeçalhos do resumo (mês, semana da sprint) acompanham o texto do segmento
+            resumo_segmento = f"{segmento['contexto']}\n\n{segmento['resumo']}" if segmento["contexto"] else segmento["resumo"]
+            try:
+                ata, uso = AtaController.gerar_ata(resumo_segmento, template, segmento["data"], segmento["requerimento"], titulo, force_regenerate)
+                resultado.update(AtaController._montar_resultado(ata))
+                resultado["tokens"] = uso
+            except Exception as e:
+                print(f"Error generating ATA for {segmento['data']} / {segmento['empresa']}: {str(e)}")
+                resultado["error"] = f"Erro ao gerar ATA: {str(e)}"
+            return resultado
+        
+        if len(segmentos) == 1:
+            atas = [gerar_segmento(segmentos[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, min(ATA_MAX_WORKERS, len(segmentos)))) as executor:
+                atas = list(executor.map(gerar_segmento, segmentos))
         
         return {
-            "ata": ata,
-            "titulo": titulo_extraido,
-            "proximos": proximos,
-            "corpo": corpo
+            "atas": atas,
+            "total": len(atas),
+            "erros": sum(1 for ata in atas if "error" in ata),
+            "tokens": {
+                "entrada": sum(ata["tokens"]["entrada"] for ata in atas if "tokens" in ata),
+                "saida": sum(ata["tokens"]["saida"] for ata in atas if "tokens" in ata)
+            }
         }
 
+    @staticmethod
+    def processar_gerar_ata_stream(data, requerimento, resumo, force_regenerate=False, template_nome=None):
+        """Processa a geração de ATA em streaming, no formato Server-Sent Events.
+        
+        Emite eventos "token" ({"delta": ...}) durante a geração e um evento
+        "done" com o mesmo resultado de processar_gerar_ata ao final."""
+        titulo = "Atividades do dia"
+        
+        # Comentário SSE inicial: o navegador recebe a resposta antes do primeiro token
+        yield ": gerando\n\n"
+        
+        try:
+            template = AtaController._carregar_template(template_nome)
+            partes = []
+            uso = {}
+            for delta in AtaController.gerar_ata_stream(resumo, template, data, requerimento, titulo, force_regenerate, uso):
+                partes.append(delta)
+                yield AtaController._evento_sse("token", {"delta": delta})
+            
+            resultado = AtaController._montar_resultado("".join(partes))
+            resultado["tokens"] = uso
+            yield AtaController._evento_sse("done", resultado)
+        except Exception as e:
+            print("Error streaming ATA:", str(e))
+            yield AtaController._evento_sse("error", {"error": f"Erro ao gerar ATA: {str(e)}"})
+
+    @staticmethod
+    def _evento_sse(evento, dados):
+        return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
     @staticmethod
     def _extrair_titulo_da_ata(text):
         """Extrai o título da ATA gerada"""
@@ -0,0 +1,131 @@
+import os
+import time
+import random
+import hashlib
+from abc import ABC, abstractmethod
+from openai import OpenAI
+
+# Backend de geração: "openai" (qualquer API compatível com OpenAI) ou "fake" (local, para testes de carga)
+ATA_LLM_BACKEND = os.getenv("ATA_LLM_BACKEND", "openai")
+ATA_LLM_BASE_URL = os.getenv("ATA_LLM_BASE_URL", "https://router.huggingface.co/v1")
+ATA_MODEL = os.getenv("ATA_MODEL", "moonshotai/Kimi-K2-Instruct")
+
+# Backend fake: tempo até o primeiro token (s), tokens por segundo e tamanho da resposta
+ATA_FAKE_LATENCY = float(os.getenv("ATA_FAKE_LATENCY", "0.5"))
+ATA_FAKE_TOKENS_PER_SECOND = float(os.getenv("ATA_FAKE_TOKENS_PER_SECOND", "50"))
+ATA_FAKE_OUTPUT_TOKENS = int(os.getenv("ATA_FAKE_OUTPUT_TOKENS", "300"))
+
+
+class LLMBackend(ABC):
+    """Interface dos backends de geração de texto"""
+    model = ""
+
+    @abstractmethod
+    def complete(self, prompt, max_tokens, temperature):
+        """Retorna o texto completo gerado para o prompt"""
+
+    @abstractmethod
+    def stream(self, prompt, max_tokens, temperature):
+        """Gera os trechos de texto conforme são produzidos"""
+
+
+class OpenAIBackend(LLMBackend):
+    """API de chat completions compatível com OpenAI (por padrão, o router do Hugging Face)"""
+
+    def __init__(self, base_url=ATA_LLM_BASE_URL, api_key=None, model=ATA_MODEL):
+        self.model = model
+        self.client = OpenAI(
+            base_url=base_url,
+            api_key=api_key if api_key is not None else os.getenv("ATA_LLM_API_KEY") or os.getenv("HF_TOKEN", "")
+        )
+
+    def complete(self, prompt, max_tokens, temperature):
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return completion.choices[0].message.content
+
+    def stream(self, prompt, max_tokens, temperature):
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class FakeBackend(LLMBackend):
+    """Backend local e determinístico: mesma entrada gera o mesmo texto, com latência simulada.
+
+    O texto segue as seções do template (Título, Objetivo, Resumo, Conclusão,
+    Próximos passos) para que a extração de campos também seja exercitada."""
+
+    _PALAVRAS = (
+        "reunião alinhamento fluxo integração validação cliente ajuste entrega "
+        "documentação teste homologação requisito processo análise dados sistema"
+    ).split()
+
+    def __init__(self, latency=ATA_FAKE_LATENCY, tokens_per_second=ATA_FAKE_TOKENS_PER_SECOND,
+                 output_tokens=ATA_FAKE_OUTPUT_TOKENS, model="fake"):
+        self.model = model
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+
+    def _tokens(self, prompt, max_tokens):
+        """Resposta fixa para o prompt, dividida em tokens (uma palavra por token)"""
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16], 16)
+        rng = random.Random(seed)
+        total = max(8, min(max_tokens, self.output_tokens))
+        corpo = max(1, total - 8) // 4
+
+        def frase(n):
+            return " ".join(rng.choice(self._PALAVRAS) for _ in range(n))
+
+        texto = (
+            f"Título: Atividade {seed % 100000:05d}\n\n"
+            f"Objetivo:\n{frase(corpo)}\n\n"
+            f"Resumo:\n{frase(corpo)}\n\n"
+            f"Conclusão:\n{frase(corpo)}\n\n"
+            f"Próximos passos:\n{frase(corpo)}"
+        )
+        palavras = texto.split(" ")
+        return [palavra if i == 0 else f" {palavra}" for i, palavra in enumerate(palavras)]
+
+    def _aguardar(self, tokens):
+        if self.tokens_per_second > 0:
+            time.sleep(tokens / self.tokens_per_second)
+
+    def complete(self, prompt, max_tokens, temperature):
+        tokens = self._tokens(prompt, max_tokens)
+        time.sleep(self.latency)
+        self._aguardar(len(tokens))
+        return "".join(tokens)
+
+    def stream(self, prompt, max_tokens, temperature):
+        tokens = self._tokens(prompt, max_tokens)
+        time.sleep(self.latency)
+        for token in tokens:
+            self._aguardar(1)
+            yield token
+
+
+def get_llm_backend(name=ATA_LLM_BACKEND):
+    """Cria o backend configurado em ATA_LLM_BACKEND"""
+    name = (name or "openai").strip().lower()
+    if name == "fake":
+        return FakeBackend()
+    if name == "openai":
+        return OpenAIBackend()
+    raise Exception(f"Backend de LLM desconhecido: {name}")
@@ -0,0 +1,170 @@
+import re
+from datetime import datetime
+from controllers.ata.title_parser import EXCLUDED_COMPANY_TERMS
+
+# Marcadores reconhecidos no resumo (um por linha)
+_REQUERIMENTO_RE = re.compile(r'^\s*requerimento\s*:?\s*(\d+)\s*$', re.IGNORECASE)
+_DIA_RE = re.compile(r'^\s*(?:dia|data)\s*:?\s*(\d{1,2}(?:[/-]\d{1,2}(?:[/-]\d{2,4})?)?)\s*:?\s*$', re.IGNORECASE)
+_DATA_LINHA_RE = re.compile(r'^\s*(\d{1,2}[/-]\d{1,2}[/-]\d{4})\s*:?\s*$')
+_EMPRESA_RE = re.compile(r'^\s*(?:empresa\s*:\s*([^\n]+?)|\[([^\]]+)\])\s*:?\s*$', re.IGNORECASE)
+# Número isolado logo após o marcador de dia é o requerimento daquele dia (formato do template)
+_NUMERO_RE = re.compile(r'^\s*(\d+)\s*$')
+# Cabeçalhos do resumo ("Setembro de 2025", "Sprint - Semana 1") são contexto, não segmentos
+_SPRINT_RE = re.compile(r'^\s*sprint\b.*$', re.IGNORECASE)
+_MES_ANO_RE = re.compile(r'^\s*([a-zç]+)\s+de\s+(\d{4})\s*:?\s*$', re.IGNORECASE)
+_MESES = {
+    "janeiro": 1, "fevereiro": 2, "março": 3, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12
+}
+
+# Datas e requerimentos podem vir separados por vírgula, ponto e vírgula ou espaço
+_LISTA_SEP_RE = re.compile(r'[,;\s]+')
+
+
+def _parse_data(valor):
+    """Converte AAAA-MM-DD, DD/MM/AAAA ou DD-MM-AAAA em date"""
+    for formato in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _resolver_dia(marcador, referencia):
+    """Resolve 'Dia 29' / '29/09' / '29/09/2025' usando a data do formulário como referência"""
+    partes = re.split(r'[/-]', marcador)
+    try:
+        dia = int(partes[0])
+        mes = int(partes[1]) if len(partes) > 1 else (referencia.month if referencia else None)
+        ano = int(partes[2]) if len(partes) > 2 else (referencia.year if referencia else None)
+        if ano is not None and ano < 100:
+            ano += 2000
+        if mes is None or ano is None:
+            return marcador
+        return datetime(ano, mes, dia).strftime("%d-%m-%Y")
+    except (ValueError, IndexError):
+        return marcador
+
+
+def _mes_ano(linha):
+    """date do primeiro dia para 'Setembro de 2025', ou None"""
+    match = _MES_ANO_RE.match(linha)
+    if match and match.group(1).lower() in _MESES:
+        return datetime(int(match.group(2)), _MESES[match.group(1).lower()], 1).date()
+    return None
+
+
+def dividir_resumo(resumo, data, requerimento):
+    """Divide o resumo em segmentos (dia, empresa, requerimento) de forma determinística.
+
+    Cada linha "Dia N", "Data: DD/MM/AAAA", "Requerimento: N", "Empresa: X" ou
+    "[X]" isolada inicia um novo segmento; as demais linhas são o texto do segmento.
+    Um número isolado logo após o marcador de dia é o requerimento do dia.
+    Cabeçalhos ("Setembro de 2025", "Sprint - Semana 1") e o texto antes do
+    primeiro marcador vão em "contexto" de cada segmento. Requerimentos não
+    marcados seguem as datas do formulário pela posição e, depois, a sequência
+    +1 a partir do último conhecido (regra do template). Sem marcadores,
+    retorna um único segmento."""
+    datas = [d for d in (_parse_data(v) for v in _LISTA_SEP_RE.split(data or "") if v) if d]
+    requerimentos = [r for r in _LISTA_SEP_RE.split(requerimento or "") if r]
+    referencia = datas[0] if datas else None
+    data_padrao = referencia.strftime("%d-%m-%Y") if referencia else (data or "")
+
+    segmentos = []
+    # Contexto vigente: texto antes do primeiro marcador, mês e semana da sprint mais recentes
+    contexto = {"preambulo": [], "mes": None, "sprint": None}
+    atual = {"data": None, "empresa": None, "requerimento": None, "linhas": []}
+    marcado = False
+    apos_dia = False
+
+    def texto_contexto():
+        linhas = contexto["preambulo"] + [contexto["mes"], contexto["sprint"]]
+        return "\n".join(linha.strip() for linha in linhas if linha and linha.strip())
+
+    def fechar():
+        texto = "\n".join(atual["linhas"]).strip()
+        if texto:
+            segmentos.append({
+                "data": atual["data"],
+                "empresa": atual["empresa"],
+                "requerimento": atual["requerimento"],
+                "resumo": texto,
+                "contexto": texto_contexto()
+            })
+            # Cada requerimento marcado vale para uma ATA; a próxima segue a sequência
+            atual["requerimento"] = None
+        atual["linhas"] = []
+
+    def iniciar_marcador():
+        # Texto antes do primeiro marcador é contexto geral, não um segmento
+        if not marcado:
+            contexto["preambulo"].extend(atual["linhas"])
+            atual["linhas"] = []
+        else:
+            fechar()
+
+    for linha in (resumo or "").splitlines():
+        req_match = _REQUERIMENTO_RE.match(linha)
+        dia_match = _DIA_RE.match(linha) or _DATA_LINHA_RE.match(linha)
+        empresa_match = _EMPRESA_RE.match(linha)
+        empresa = (empresa_match.group(1) or empresa_match.group(2)).strip().upper() if empresa_match else None
+        mes_ano = _mes_ano(linha)
+        numero_match = _NUMERO_RE.match(linha) if apos_dia else None
+        if linha.strip():
+            apos_dia = False
+
+        if numero_match:
+            atual["requerimento"] = numero_match.group(1)
+        elif mes_ano or _SPRINT_RE.match(linha):
+            if marcado:
+                fechar()
+            if mes_ano:
+                contexto["mes"] = linha
+                if referencia is None:
+                    referencia = mes_ano
+            else:
+                contexto["sprint"] = linha
+        elif req_match:
+            iniciar_marcador()
+            marcado = True
+            atual["requerimento"] = req_match.group(1)
+        elif dia_match:
+            iniciar_marcador()
+            marcado = True
+            atual["data"] = _resolver_dia(dia_match.group(1), referencia)
+            atual["empresa"] = None  # Empresa é marcada dentro de cada dia
+            apos_dia = True
+        elif empresa and empresa not in EXCLUDED_COMPANY_TERMS:
+            iniciar_marcador()
+            marcado = True
+            atual["empresa"] = empresa
+        else:
+            atual["linhas"].append(linha)
+    fechar()
+
+    if not segmentos:
+        segmentos = [{"data": None, "empresa": None, "requerimento": None, "resumo": (resumo or "").strip(), "contexto": ""}]
+
+    # Completar data/requerimento: datas do formulário pela posição, requerimentos acompanham as datas
+    dias = []
+    for segmento in segmentos:
+        if segmento["data"] and segmento["data"] not in dias:
+            dias.append(segmento["data"])
+    ultimo = None
+    for indice, segmento in enumerate(segmentos):
+        if not segmento["data"]:
+            segmento["data"] = datas[indice].strftime("%d-%m-%Y") if len(segmentos) == len(datas) else data_padrao
+        if not segmento["requerimento"]:
+            posicao = dias.index(segmento["data"]) if segmento["data"] in dias else indice
+            if posicao < len(requerimentos) and (ultimo is None or len(requerimentos) > 1):
+                segmento["requerimento"] = requerimentos[posicao]
+            elif ultimo is not None:
+                # Sequência do template: último requerimento conhecido + 1
+                segmento["requerimento"] = str(ultimo + 1)
+            else:
+                segmento["requerimento"] = requerimento or ""
+        if segmento["requerimento"].isdigit():
+            ultimo = int(segmento["requerimento"])
+
+    return segmentos
@@ -0,0 +1,135 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from typing import NamedTuple
+from controllers.ata.token_budget import compactar_template, estimar_tokens
+
+# Template padrão (valor "ATA" de Custom.PrintingtemplatesATA)
+TEMPLATE_PATH = "template.md"
+TEMPLATE_PADRAO = "ATA"
+# Templates nomeados: <ATA_TEMPLATES_DIR>/<nome normalizado>.md (ex.: activities_report.md)
+ATA_TEMPLATES_DIR = os.getenv("ATA_TEMPLATES_DIR", "prompt_templates")
+# Intervalo mínimo entre verificações de mtime (evita stat no disco a cada geração)
+ATA_TEMPLATE_CHECK_INTERVAL = float(os.getenv("ATA_TEMPLATE_CHECK_INTERVAL", "2"))
+
+_NOME_RE = re.compile(r'[^a-z0-9]+')
+
+
+class PromptTemplate(NamedTuple):
+    """Template carregado com o esqueleto do prompt já montado"""
+    nome: str
+    caminho: str
+    mtime: float
+    conteudo: str
+    digest: str
+    partes: tuple
+    tokens: int
+
+    def montar_prompt(self, resumo, data, requerimento, titulo):
+        """Preenche o esqueleto pré-compilado (apenas concatenação, sem formatação do template)"""
+        inicio, apos_resumo, apos_data, apos_requerimento, fim = self.partes
+        return "".join((
+            inicio, str(resumo), apos_resumo, str(data), apos_data,
+            str(requerimento), apos_requerimento, str(titulo), fim
+        ))
+
+
+def _compilar_partes(conteudo):
+    """Divide o prompt em trechos fixos ao redor dos campos variáveis; o template (compactado) entra uma única vez"""
+    return (
+        "\nVocê é um agente que gera atas conforme o template abaixo. \nResumo do usuário: ",
+        "\nData: ",
+        "\nRequerimento da ATA: ",
+        "\nTítulo: ",
+        f"\nTemplate: {conteudo}\nGere a ata preenchida conforme as regras do template, com tópicos e contexto descritivo.\n"
+    )
+
+
+def nome_arquivo_template(nome):
+    """'Activities Report' -> 'activities_report.md'"""
+    return f"{_NOME_RE.sub('_', nome.lower()).strip('_')}.md"
+
+
+class TemplateStore:
+    """Templates de ATA em memória, recarregados somente quando o arquivo muda (mtime)"""
+
+    def __init__(self, default_path=TEMPLATE_PATH, templates_dir=ATA_TEMPLATES_DIR,
+                 check_interval=ATA_TEMPLATE_CHECK_INTERVAL):
+        self.default_path = default_path
+        self.templates_dir = templates_dir
+        self.check_interval = check_interval
+        self._templates = {}
+        self._checked_at = {}
+        self._lock = threading.Lock()
+
+    def _caminho(self, nome, avisar=True):
+        if not nome or nome.strip().upper() == TEMPLATE_PADRAO:
+            return self.default_path
+        caminho = os.path.join(self.templates_dir, nome_arquivo_template(nome))
+        if os.path.exists(caminho):
+            return caminho
+        if avisar:
+            print(f"Template '{nome}' não encontrado em {self.templates_dir}, usando {self.default_path}")
+        return self.default_path
+
+    def get(self, nome=None):
+        """Retorna o PromptTemplate do nome informado (vazio ou "ATA" = template padrão)"""
+        chave = (nome or TEMPLATE_PADRAO).strip().upper()
+        template = self._templates.get(chave)
+        agora = time.monotonic()
+        if template is not None and agora - self._checked_at.get(chave, 0) < self.check_interval:
+            return template
+
+        with self._lock:
+            template = self._templates.get(chave)
+            if template is None:
+                caminho = self._caminho(nome)
+            elif chave != TEMPLATE_PADRAO and (template.caminho == self.default_path or not os.path.exists(template.caminho)):
+                # Carregado do template padrão: o arquivo próprio pode ter sido criado desde
+                # então (ou, se o arquivo próprio foi removido, volta ao padrão)
+                caminho = self._caminho(nome, avisar=template.caminho != self.default_path)
+            else:
+                caminho = template.caminho
+            try:
+                mtime = os.path.getmtime(caminho)
+            except OSError:
+                raise Exception(f"Template não encontrado: {caminho}")
+
+            if template is None or template.caminho != caminho or template.mtime != mtime:
+                template = self._carregar(nome or TEMPLATE_PADRAO, caminho, mtime)
+                self._templates[chave] = template
+            self._checked_at[chave] = agora
+        return template
+
+    def _carregar(self, nome, caminho, mtime):
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                conteudo = f.read()
+        except FileNotFoundError:
+            raise Exception(f"Template não encontrado: {caminho}")
+        partes = _compilar_partes(compactar_template(conteudo))
+        return PromptTemplate(
+            nome=nome,
+            caminho=caminho,
+            mtime=mtime,
+            conteudo=conteudo,
+            digest=hashlib.sha256(conteudo.encode("utf-8")).hexdigest(),
+            partes=partes,
+            tokens=estimar_tokens("".join(partes))
+        )
+
+    def invalidate(self, nome=None):
+        with self._lock:
+            if nome is None:
+                self._templates.clear()
+                self._checked_at.clear()
+            else:
+                chave = nome.strip().upper()
+                self._templates.pop(chave, None)
+                self._checked_at.pop(chave, None)
+
+
+# Store compartilhado pelo processo
+template_store = TemplateStore()
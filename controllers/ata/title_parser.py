@@ -0,0 +1,84 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# Termos que aparecem entre colchetes no título mas não são empresas
+EXCLUDED_COMPANY_TERMS = frozenset({'ATA', 'TASK', 'BUG', 'FEATURE', 'USER STORY'})
+
+# Padrão [ATA][EMPRESA][Nome] - empresa fica no segundo conjunto de colchetes
+_ATA_COMPANY_RE = re.compile(r'^\[ATA\]\[([^\]]+)\]', re.IGNORECASE)
+# Colchetes consecutivos no início do título (com espaços entre eles)
+_LEADING_BRACKET_RE = re.compile(r'\[([^\]]+)\]\s*')
+# Primeiro conjunto de colchetes (projeto) e o que vem logo após outro (responsável)
+_PROJECT_RE = re.compile(r'\[([^\]]+)\]')
+_RESPONSIBLE_RE = re.compile(r'\]\[([^\]]+)\]')
+# Padrão: ... - Atividade do dia DD/MM/AAAA
+_ACTIVITY_DATE_RE = re.compile(r'Atividade do dia (\d{2}/\d{2}/\d{4})')
+
+# Os títulos se repetem entre listagens e sincronizações: o ganho vem de parse_title
+# memoizado (lru_cache) e das regex pré-compiladas. As buscas continuam separadas
+# porque cada uma procura a primeira ocorrência em qualquer ponto do título
+TITLE_PARSER_CACHE_SIZE = 8192
+
+
+class TitleInfo(NamedTuple):
+    """Informações extraídas do título de um work item"""
+    company: Optional[str]
+    project: str
+    responsible: str
+    activity_date: str
+    is_totvs: bool
+
+    @property
+    def normalized_company(self):
+        """Empresa em maiúsculas, ou None se for um termo que não é empresa"""
+        if self.company and self.company not in EXCLUDED_COMPANY_TERMS:
+            return self.company
+        return None
+
+    def project_info(self):
+        """Formato usado em projectInfo na API de detalhes da ATA"""
+        return {
+            "project": self.project,
+            "responsible": self.responsible,
+            "activityDate": self.activity_date,
+            "isTOTVS": self.is_totvs
+        }
+
+
+def _extract_company(title):
+    match = _ATA_COMPANY_RE.match(title)
+    if match:
+        return match.group(1).strip().upper()
+
+    # Fallback: primeiro conjunto de colchetes do início que não seja termo excluído
+    text = title.strip()
+    pos = 0
+    while True:
+        match = _LEADING_BRACKET_RE.match(text, pos)
+        if not match:
+            return None
+        captured_text = match.group(1).strip().upper()
+        if captured_text not in EXCLUDED_COMPANY_TERMS:
+            return captured_text
+        pos = match.end()
+
+
+@lru_cache(maxsize=TITLE_PARSER_CACHE_SIZE)
+def parse_title(title):
+    """Extrai empresa, projeto, responsável, data da atividade e flags do título (memoizado)"""
+    if not title:
+        return TitleInfo(None, "", "", "", False)
+
+    # Padrão: [PROJETO][RESPONSAVEL] Descrição - Atividade do dia DD/MM/AAAA
+    project_match = _PROJECT_RE.search(title)
+    responsible_match = _RESPONSIBLE_RE.search(title)
+    date_match = _ACTIVITY_DATE_RE.search(title)
+
+    return TitleInfo(
+        company=_extract_company(title),
+        project=project_match.group(1) if project_match else "",
+        responsible=responsible_match.group(1) if responsible_match else "",
+        activity_date=date_match.group(1) if date_match else "",
+        is_totvs="TOTVS" in title.upper()
+    )
@@ -0,0 +1,124 @@
+import os
+import re
+import math
+import threading
+
+# Caminho local de um tokenizer.json do modelo em uso (opcional). Sem ele, os
+# tamanhos são estimativas por caracteres (~4 por token); nada é baixado durante
+# as requisições
+ATA_TOKENIZER = os.getenv("ATA_TOKENIZER", "")
+
+# Orçamento de entrada: template (após compactação) e resumo enviado em uma chamada.
+# Os limites valem sobre a estimativa: texto em português costuma ter menos de 4
+# caracteres por token, então o teto do resumo fica abaixo do desejado (~3000)
+ATA_TEMPLATE_MAX_TOKENS = int(os.getenv("ATA_TEMPLATE_MAX_TOKENS", "2000"))
+ATA_RESUMO_MAX_TOKENS = int(os.getenv("ATA_RESUMO_MAX_TOKENS", "2200"))
+
+# Saída estimada: base + proporção do resumo, limitada ao intervalo [mín, máx];
+# o mínimo nunca fica abaixo do tamanho do template (a ATA reproduz todas as seções)
+ATA_OUTPUT_BASE_TOKENS = int(os.getenv("ATA_OUTPUT_BASE_TOKENS", "200"))
+ATA_OUTPUT_RATIO = float(os.getenv("ATA_OUTPUT_RATIO", "1.2"))
+ATA_MIN_OUTPUT_TOKENS = int(os.getenv("ATA_MIN_OUTPUT_TOKENS", "1024"))
+ATA_MAX_OUTPUT_TOKENS = int(os.getenv("ATA_MAX_OUTPUT_TOKENS", "2048"))
+
+# Sem tokenizer disponível: aproximação de caracteres por token
+_CHARS_POR_TOKEN = 4
+
+_ESPACOS_RE = re.compile(r'[ \t]+')
+_LINHAS_VAZIAS_RE = re.compile(r'\n\s*\n+')
+_SEPARADOR_RE = re.compile(r'^\s*[-=_*]{4,}\s*$', re.MULTILINE)
+
+_tokenizer = None
+_tokenizer_carregado = False
+_tokenizer_lock = threading.Lock()
+
+
+def _get_tokenizer():
+    """Carrega o tokenizer local uma única vez; sem ATA_TOKENIZER (ou em caso de falha)
+    usa a aproximação por caracteres"""
+    global _tokenizer, _tokenizer_carregado
+    if _tokenizer_carregado:
+        return _tokenizer
+    with _tokenizer_lock:
+        if not _tokenizer_carregado:
+            try:
+                if ATA_TOKENIZER:
+                    if not os.path.isfile(ATA_TOKENIZER):
+                        raise Exception("arquivo não encontrado")
+                    from tokenizers import Tokenizer
+                    _tokenizer = Tokenizer.from_file(ATA_TOKENIZER)
+            except Exception as e:
+                print(f"Tokenizer '{ATA_TOKENIZER}' indisponível, usando estimativa por caracteres: {str(e)}")
+                _tokenizer = None
+            _tokenizer_carregado = True
+    return _tokenizer
+
+
+def estimar_tokens(texto):
+    """Quantidade de tokens do texto (exata com ATA_TOKENIZER; senão, estimada por caracteres)"""
+    if not texto:
+        return 0
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return math.ceil(len(texto) / _CHARS_POR_TOKEN)
+    return len(tokenizer.encode(texto, add_special_tokens=False).ids)
+
+
+def truncar_tokens_estimados(texto, limite):
+    """Mantém apenas os primeiros `limite` tokens (estimados, sem ATA_TOKENIZER) do texto"""
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return texto[:limite * _CHARS_POR_TOKEN]
+    encoding = tokenizer.encode(texto, add_special_tokens=False)
+    if len(encoding.ids) <= limite:
+        return texto
+    return texto[:encoding.offsets[limite - 1][1]] if limite > 0 else ""
+
+
+def compactar_template(conteudo, limite=ATA_TEMPLATE_MAX_TOKENS):
+    """Remove espaços repetidos, linhas vazias em sequência e separadores decorativos;
+    acima do limite, o final do template é descartado"""
+    texto = _SEPARADOR_RE.sub("", conteudo)
+    texto = _ESPACOS_RE.sub(" ", texto)
+    texto = "\n".join(linha.strip() for linha in texto.splitlines())
+    texto = _LINHAS_VAZIAS_RE.sub("\n\n", texto).strip()
+
+    if estimar_tokens(texto) > limite:
+        print(f"Template com mais de {limite} tokens após compactação, o final será descartado")
+        texto = truncar_tokens_estimados(texto, limite)
+    return texto
+
+
+def estimar_tokens_saida(tokens_resumo, tokens_template=0):
+    """max_tokens da geração proporcional ao tamanho do resumo, com piso no tamanho do template"""
+    minimo = max(ATA_MIN_OUTPUT_TOKENS, tokens_template)
+    estimativa = ATA_OUTPUT_BASE_TOKENS + int(tokens_resumo * ATA_OUTPUT_RATIO)
+    return max(minimo, min(ATA_MAX_OUTPUT_TOKENS, estimativa))
+
+
+def dividir_em_blocos(texto, limite=ATA_RESUMO_MAX_TOKENS):
+    """Divide o texto em blocos de até `limite` tokens, quebrando em linhas
+    (linhas maiores que o limite são cortadas por tokens)"""
+    blocos = []
+    atual = []
+    tokens_atual = 0
+    for linha in texto.splitlines():
+        tokens_linha = estimar_tokens(linha) + 1
+        while tokens_linha > limite:
+            parte = truncar_tokens_estimados(linha, limite)
+            if not parte:
+                break
+            if atual:
+                blocos.append("\n".join(atual))
+                atual, tokens_atual = [], 0
+            blocos.append(parte)
+            linha = linha[len(parte):]
+            tokens_linha = estimar_tokens(linha) + 1
+        if tokens_atual + tokens_linha > limite and atual:
+            blocos.append("\n".join(atual))
+            atual, tokens_atual = [], 0
+        atual.append(linha)
+        tokens_atual += tokens_linha
+    if atual and "\n".join(atual).strip():
+        blocos.append("\n".join(atual))
+    return blocos
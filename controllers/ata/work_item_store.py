@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+# Banco local (SQLite em modo WAL) com os work items já buscados no Azure DevOps
+WORK_ITEM_STORE_PATH = os.getenv("WORK_ITEM_STORE_PATH", os.path.join("data", "work_items.db"))
+
+# O store é um cache do Azure DevOps: ao mudar o schema as tabelas são recriadas
+SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_items (
+    org TEXT NOT NULL,
+    project TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    iteration_path TEXT,
+    sync_user TEXT,
+    state TEXT,
+    work_item_type TEXT,
+    priority INTEGER,
+    title TEXT,
+    company TEXT,
+    changed_date TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (org, project, id)
+);
+CREATE INDEX IF NOT EXISTS idx_work_items_iteration ON work_items (org, project, iteration_path, sync_user, changed_date);
+CREATE INDEX IF NOT EXISTS idx_work_items_state ON work_items (org, project, state);
+CREATE INDEX IF NOT EXISTS idx_work_items_company ON work_items (org, project, company);
+CREATE INDEX IF NOT EXISTS idx_work_items_changed ON work_items (org, project, changed_date);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    org TEXT NOT NULL,
+    project TEXT NOT NULL,
+    iteration_path TEXT NOT NULL,
+    sync_user TEXT NOT NULL,
+    watermark TEXT,
+    synced_at REAL NOT NULL,
+    full_synced_at REAL NOT NULL,
+    PRIMARY KEY (org, project, iteration_path, sync_user)
+);
+"""
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _normalize_changed_date(value):
+    """Normaliza System.ChangedDate para ordenação lexicográfica (frações variam no Azure DevOps)"""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).strftime("%Y-%m-%dT%H:%M:%S.%f")
+    except (AttributeError, ValueError):
+        return ""
+
+
+class WorkItemStore:
+    """Armazenamento local e persistente dos work items, indexado por sprint, estado, empresa e data.
+
+    sync_user é o usuário cuja WIQL trouxe o item: a lista de "meus work items"
+    segue o resultado da WIQL, sem comparar o nome exibido em System.AssignedTo."""
+
+    def __init__(self, path=WORK_ITEM_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._conn.executescript("DROP TABLE IF EXISTS work_items; DROP TABLE IF EXISTS sync_state;")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def upsert_items(self, org, project, sync_user, items):
+        """Insere ou atualiza work items (formato do controller) retornados pela WIQL de sync_user"""
+        rows = []
+        for item in items:
+            fields = item.get("fields", {})
+            rows.append((
+                org, project, item["id"],
+                fields.get("System.IterationPath", ""),
+                sync_user,
+                fields.get("System.State", ""),
+                fields.get("System.WorkItemType", ""),
+                fields.get("Microsoft.VSTS.Common.Priority"),
+                fields.get("System.Title", ""),
+                item.get("company"),
+                _normalize_changed_date(fields.get("System.ChangedDate")),
+                json.dumps(item)
+            ))
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT OR REPLACE INTO work_items
+                (org, project, id, iteration_path, sync_user, state, work_item_type, priority, title, company, changed_date, data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+
+    def delete_items(self, org, project, iteration_path, ids):
+        """Remove work items que saíram da sprint (movidos, reatribuídos ou excluídos)"""
+        if not ids:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM work_items WHERE org = ? AND project = ? AND iteration_path = ? AND id = ?",
+                [(org, project, iteration_path, item_id) for item_id in ids]
+            )
+
+    def get_items(self, org, project, iteration_path, sync_user, company=None):
+        """Work items do usuário na sprint, ordenados por ChangedDate DESC (como a WIQL)"""
+        query = """
+            SELECT data FROM work_items
+            WHERE org = ? AND project = ? AND iteration_path = ? AND sync_user = ?
+        """
+        params = [org, project, iteration_path, sync_user]
+        if company:
+            query += " AND company = ?"
+            params.append(company.upper())
+        query += " ORDER BY changed_date DESC, id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def query_items(self, org, project, iteration_path, sync_user, company=None, state=None,
+                    work_item_type=None, priority=None, text=None, after=None, limit=None):
+        """Consulta filtrada e paginada (cursor) dos work items do usuário na sprint.
+        
+        after é o par (changed_date, id) do último item da página anterior.
+        Retorna (itens, total que atende aos filtros, (changed_date, id) do último item)."""
+        where = "org = ? AND project = ? AND iteration_path = ? AND sync_user = ?"
+        params = [org, project, iteration_path, sync_user]
+        if company:
+            where += " AND company = ?"
+            params.append(company.upper())
+        if state:
+            where += " AND state = ? COLLATE NOCASE"
+            params.append(state)
+        if work_item_type:
+            where += " AND work_item_type = ? COLLATE NOCASE"
+            params.append(work_item_type)
+        if priority is not None:
+            where += " AND priority = ?"
+            params.append(priority)
+        if text:
+            where += " AND title LIKE ? ESCAPE '\\'"
+            escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+
+        page_where = where
+        page_params = list(params)
+        if after:
+            page_where += " AND (changed_date < ? OR (changed_date = ? AND id < ?))"
+            page_params.extend([after[0], after[0], after[1]])
+
+        query = f"SELECT data, changed_date, id FROM work_items WHERE {page_where} ORDER BY changed_date DESC, id DESC"
+        if limit:
+            query += " LIMIT ?"
+            page_params.append(limit)
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM work_items WHERE {where}", params).fetchone()[0]
+            rows = self._conn.execute(query, page_params).fetchall()
+
+        last = (rows[-1][1], rows[-1][2]) if rows else None
+        return [json.loads(row[0]) for row in rows], total, last
+
+    def get_item_ids(self, org, project, iteration_path, sync_user):
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT id FROM work_items
+                WHERE org = ? AND project = ? AND iteration_path = ? AND sync_user = ?
+            """, (org, project, iteration_path, sync_user)).fetchall()
+        return {row[0] for row in rows}
+
+    def get_companies(self, org, project, iteration_path, sync_user):
+        """Empresas distintas dos work items do usuário na sprint"""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT DISTINCT company FROM work_items
+                WHERE org = ? AND project = ? AND iteration_path = ? AND sync_user = ? AND company IS NOT NULL
+                ORDER BY company
+            """, (org, project, iteration_path, sync_user)).fetchall()
+        return [row[0] for row in rows]
+
+    def get_sync_state(self, org, project, iteration_path, sync_user):
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT watermark, synced_at, full_synced_at FROM sync_state
+                WHERE org = ? AND project = ? AND iteration_path = ? AND sync_user = ?
+            """, (org, project, iteration_path, sync_user)).fetchone()
+        if not row:
+            return None
+        return {"watermark": row[0], "synced_at": row[1], "full_synced_at": row[2]}
+
+    def set_sync_state(self, org, project, iteration_path, sync_user, watermark, full=False):
+        now = time.time()
+        with self._lock, self._conn:
+            if full:
+                self._conn.execute("""
+                    INSERT OR REPLACE INTO sync_state
+                    (org, project, iteration_path, sync_user, watermark, synced_at, full_synced_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (org, project, iteration_path, sync_user, watermark, now, now))
+            else:
+                self._conn.execute("""
+                    UPDATE sync_state SET watermark = ?, synced_at = ?
+                    WHERE org = ? AND project = ? AND iteration_path = ? AND sync_user = ?
+                """, (watermark, now, org, project, iteration_path, sync_user))
+
+    def clear_sync_state(self, org, project, iteration_path=None, sync_user=None):
+        """Força nova sincronização completa (os itens locais são substituídos na próxima busca)"""
+        query = "DELETE FROM sync_state WHERE org = ? AND project = ?"
+        params = [org, project]
+        if iteration_path:
+            query += " AND iteration_path = ?"
+            params.append(iteration_path)
+        if sync_user:
+            query += " AND sync_user = ?"
+            params.append(sync_user)
+        with self._lock, self._conn:
+            return self._conn.execute(query, params).rowcount
+
+    def mark_stale(self, org, project, sync_user=None):
+        """Marca as sprints como desatualizadas para que a próxima leitura sincronize antes de responder"""
+        query = "UPDATE sync_state SET synced_at = 0 WHERE org = ? AND project = ?"
+        params = [org, project]
+        if sync_user:
+            query += " AND sync_user = ?"
+            params.append(sync_user)
+        with self._lock, self._conn:
+            self._conn.execute(query, params)
+
+
+def get_work_item_store(path=WORK_ITEM_STORE_PATH):
+    """Retorna o store compartilhado do processo para o arquivo informado"""
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = WorkItemStore(path)
+                _stores[path] = store
+    return store
@@ -0,0 +1,204 @@
+import os
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from controllers.ata.work_item_store import get_work_item_store
+from controllers.ata.company_index import company_index
+
+# Intervalo máximo entre sincronizações completas (ex.: para capturar itens excluídos)
+WORK_ITEM_SYNC_TTL = int(os.getenv("WORK_ITEM_SYNC_TTL", "3600"))
+# Até esta idade o store local responde sem consultar o Azure DevOps
+WORK_ITEM_STORE_FRESH_SECONDS = int(os.getenv("WORK_ITEM_STORE_FRESH_SECONDS", "30"))
+# Até esta idade o store local responde e a sincronização roda em segundo plano
+WORK_ITEM_STORE_STALE_SECONDS = int(os.getenv("WORK_ITEM_STORE_STALE_SECONDS", "300"))
+
+_locks = {}
+_locks_guard = threading.Lock()
+_background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="work-item-sync")
+_inflight = set()
+_inflight_lock = threading.Lock()
+
+
+def _parse_changed_date(value):
+    """Converte System.ChangedDate (ISO 8601 com 'Z') em datetime para comparação"""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _max_changed_date(items, current=None):
+    """Retorna a maior System.ChangedDate (string original) entre os itens e o watermark atual"""
+    watermark = current
+    watermark_dt = _parse_changed_date(current) if current else None
+    for item in items:
+        value = item.get("fields", {}).get("System.ChangedDate")
+        value_dt = _parse_changed_date(value)
+        if value_dt and (watermark_dt is None or value_dt > watermark_dt):
+            watermark, watermark_dt = value, value_dt
+    return watermark
+
+
+class WorkItemSyncEngine:
+    """Sincronização incremental dos work items de um usuário em uma sprint.
+
+    Os itens ficam no WorkItemStore (SQLite) junto com o watermark (maior
+    System.ChangedDate). Leituras recentes são respondidas localmente; as demais
+    baixam apenas os itens alterados desde o watermark. A lista de IDs atual
+    (somente referências) é usada para detectar remoções."""
+
+    def __init__(self, controller, store=None):
+        self.controller = controller
+        self.store = store or get_work_item_store()
+        self.last_sync_stats = {}
+
+    def _key(self, sprint_path):
+        c = self.controller
+        return (c.org, c.project, sprint_path, c.user_name)
+
+    def _lock_for(self, key):
+        with _locks_guard:
+            return _locks.setdefault(key, threading.Lock())
+
+    def invalidate(self, sprint_path=None):
+        """Força sincronização completa de uma sprint (ou de todas) do usuário"""
+        c = self.controller
+        return self.store.clear_sync_state(c.org, c.project, sprint_path, c.user_name)
+
+    def mark_stale(self):
+        """Após escritas no Azure DevOps, a próxima leitura sincroniza antes de responder"""
+        c = self.controller
+        self.store.mark_stale(c.org, c.project, c.user_name)
+
+    def local_items(self, sprint_path, company=None):
+        """Work items do snapshot local, sem consultar o Azure DevOps"""
+        return self.store.get_items(*self._key(sprint_path), company=company)
+
+    def sync(self, sprint_path, force_full=False):
+        """Retorna os work items da sprint, atualizando o store local quando necessário"""
+        items = self.refresh(sprint_path, force_full)
+        return self.local_items(sprint_path) if items is None else items
+
+    def refresh(self, sprint_path, force_full=False):
+        """Atualiza o store se necessário.
+        
+        Retorna os itens quando houve sincronização ou None quando o store local
+        já está atualizado (o chamador decide se precisa carregá-los)."""
+        key = self._key(sprint_path)
+
+        if not force_full:
+            state = self.store.get_sync_state(*key)
+            mode = self._read_mode(state)
+            if mode == "local":
+                self.last_sync_stats = {"mode": "local", "changed": 0, "removed": 0}
+                return None
+            if mode == "background":
+                self._schedule_background(key, sprint_path)
+                self.last_sync_stats = {"mode": "local", "changed": 0, "removed": 0, "refreshing": True}
+                return None
+
+        with self._lock_for(key):
+            state = None if force_full else self.store.get_sync_state(*key)
+            mode = self._read_mode(state)
+            if mode in ("local", "background"):
+                # Outra requisição sincronizou enquanto esperávamos o lock
+                self.last_sync_stats = {"mode": "local", "changed": 0, "removed": 0}
+                return None
+            if mode == "full":
+                return self._full_sync(key, sprint_path)
+            return self._incremental_sync(key, sprint_path, state)
+
+    def companies(self, sprint_path):
+        """Empresas da sprint a partir do índice (carregado do store após reinícios)"""
+        key = self._key(sprint_path)
+        self.refresh(sprint_path)
+        if not company_index.is_loaded(key):
+            company_index.update(key[0], key[1], key[3], self.local_items(sprint_path))
+            company_index.mark_loaded(key)
+        return company_index.get_companies(key)
+
+    def _read_mode(self, state):
+        now = time.time()
+        if state is None or now - state["full_synced_at"] > WORK_ITEM_SYNC_TTL:
+            return "full"
+        age = now - state["synced_at"]
+        if age < WORK_ITEM_STORE_FRESH_SECONDS:
+            return "local"
+        if age < WORK_ITEM_STORE_STALE_SECONDS:
+            return "background"
+        return "incremental"
+
+    def _schedule_background(self, key, sprint_path):
+        with _inflight_lock:
+            if key in _inflight:
+                return
+            _inflight.add(key)
+
+        # Engine próprio para não misturar o estado (erros/estatísticas) da requisição atual
+        engine = WorkItemSyncEngine(self.controller.__class__(), self.store)
+
+        def run():
+            try:
+                with engine._lock_for(key):
+                    state = engine.store.get_sync_state(*key)
+                    mode = engine._read_mode(state)
+                    if mode == "full":
+                        engine._full_sync(key, sprint_path)
+                    elif mode != "local":
+                        engine._incremental_sync(key, sprint_path, state)
+            except Exception as e:
+                print(f"Erro na sincronização em segundo plano de {sprint_path}: {str(e)}")
+            finally:
+                with _inflight_lock:
+                    _inflight.discard(key)
+
+        _background.submit(run)
+
+    def _full_sync(self, key, sprint_path):
+        c = self.controller
+        current_ids = c._query_work_item_ids(sprint_path)
+        items = c._get_work_items_details_direct(current_ids) if current_ids else []
+
+        removed = self.store.get_item_ids(*key) - set(current_ids)
+        self.store.delete_items(c.org, c.project, sprint_path, removed)
+        company_index.remove(c.org, c.project, removed)
+        self.store.upsert_items(c.org, c.project, c.user_name, items)
+
+        # Falhas parciais não contam como sincronização completa
+        if not c.last_fetch_errors:
+            self.store.set_sync_state(*key, _max_changed_date(items), full=True)
+        else:
+            self.store.clear_sync_state(*key)
+
+        self.last_sync_stats = {"mode": "full", "changed": len(items), "removed": len(removed)}
+        return items
+
+    def _incremental_sync(self, key, sprint_path, state):
+        c = self.controller
+        snapshot_ids = self.store.get_item_ids(*key)
+
+        # Duas WIQL que retornam apenas IDs: itens alterados desde o watermark e membros atuais
+        changed_ids = c._query_work_item_ids(sprint_path, changed_since=state["watermark"]) if state["watermark"] else []
+        current_ids = c._query_work_item_ids(sprint_path)
+        current_set = set(current_ids)
+
+        # Buscar campos apenas dos itens alterados ou que ainda não estão no store
+        to_fetch = [item_id for item_id in current_ids if item_id not in snapshot_ids]
+        to_fetch.extend(item_id for item_id in changed_ids if item_id in snapshot_ids)
+        fetched = c._get_work_items_details_direct(to_fetch) if to_fetch else []
+        if c.last_fetch_errors:
+            c.last_fetch_errors = []
+            return self._full_sync(key, sprint_path)
+
+        removed = snapshot_ids - current_set
+        self.store.delete_items(c.org, c.project, sprint_path, removed)
+        company_index.remove(c.org, c.project, removed)
+        self.store.upsert_items(c.org, c.project, c.user_name, fetched)
+        self.store.set_sync_state(*key, _max_changed_date(fetched, state["watermark"]))
+
+        self.last_sync_stats = {"mode": "incremental", "changed": len(fetched), "removed": len(removed)}
+        if fetched or removed:
+            print(f"Sync incremental {sprint_path}: {len(fetched)} alterado(s), {len(removed)} removido(s)")
+
+        return self.local_items(sprint_path)
@@ -0,0 +1,84 @@
+import os
+import base64
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Configurações do pool de conexões com o Azure DevOps
+AZURE_DEVOPS_POOL_SIZE = int(os.getenv("AZURE_DEVOPS_POOL_SIZE", "10"))
+AZURE_DEVOPS_CONNECT_TIMEOUT = float(os.getenv("AZURE_DEVOPS_CONNECT_TIMEOUT", "5"))
+AZURE_DEVOPS_READ_TIMEOUT = float(os.getenv("AZURE_DEVOPS_READ_TIMEOUT", "30"))
+AZURE_DEVOPS_MAX_RETRIES = int(os.getenv("AZURE_DEVOPS_MAX_RETRIES", "3"))
+AZURE_DEVOPS_BACKOFF_FACTOR = float(os.getenv("AZURE_DEVOPS_BACKOFF_FACTOR", "0.5"))
+
+# Status que indicam limitação de taxa/indisponibilidade temporária do Azure DevOps
+RETRY_STATUS_CODES = (429, 503)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class AzureDevOpsClient:
+    """Cliente HTTP com conexões keep-alive reutilizadas para uma organização do Azure DevOps"""
+
+    def __init__(self, org, token, pool_size=None, timeout=None, max_retries=None, backoff_factor=None):
+        self.org = org
+        self.base_url = f"https://dev.azure.com/{org}"
+        self.pool_size = pool_size or AZURE_DEVOPS_POOL_SIZE
+        self.timeout = timeout or (AZURE_DEVOPS_CONNECT_TIMEOUT, AZURE_DEVOPS_READ_TIMEOUT)
+
+        retries = AZURE_DEVOPS_MAX_RETRIES if max_retries is None else max_retries
+        backoff = AZURE_DEVOPS_BACKOFF_FACTOR if backoff_factor is None else backoff_factor
+
+        # 429/503 significam que a requisição não foi processada, então é seguro
+        # repetir inclusive POST/PATCH. Erros de leitura não são repetidos.
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(["GET", "HEAD", "POST", "PATCH", "PUT", "DELETE"]),
+            backoff_factor=backoff,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+
+        # O header de autenticação é codificado uma única vez por sessão
+        auth_string = base64.b64encode(f':{token}'.encode()).decode()
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Basic {auth_string}",
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        })
+
+    def request(self, method, url, **kwargs):
+        """Executa uma requisição reutilizando o pool de conexões da organização"""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+
+def get_azure_devops_client(org, token):
+    """Retorna o cliente compartilhado (um por organização/token) do processo"""
+    key = (org, token)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = AzureDevOpsClient(org, token)
+                _clients[key] = client
+    return client
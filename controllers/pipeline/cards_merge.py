@@ -0,0 +1,110 @@
+from difflib import SequenceMatcher
+
+
+def _alteracoes(base, versao, lado):
+    """Trechos de base alterados em versao: (início, fim, novas linhas, lado)"""
+    return [
+        (i1, i2, versao[j1:j2], lado)
+        for tag, i1, i2, j1, j2 in SequenceMatcher(None, base, versao, autojunk=False).get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def _aplicar(base, inicio, fim, alteracoes):
+    """Aplica alterações de um mesmo lado sobre base[inicio:fim]"""
+    resultado = []
+    pos = inicio
+    for i1, i2, linhas, _ in alteracoes:
+        resultado.extend(base[pos:i1])
+        resultado.extend(linhas)
+        pos = i2
+    resultado.extend(base[pos:fim])
+    return resultado
+
+
+def _sobrepostas(nossos, deles_itens):
+    """Indica se os dois lados alteram alguma mesma linha da base (inserções não ocupam linhas)"""
+    return any(a[0] < b[1] and b[0] < a[1] for a in nossos for b in deles_itens)
+
+
+def _combinar(nossos, deles_itens):
+    """Junta alterações dos dois lados que não mexem nas mesmas linhas da base.
+
+    Inserções no mesmo ponto viram a união: as nossas primeiro, depois as deles
+    que ainda não foram inseridas ali."""
+    inseridas = {}
+    for i1, i2, linhas, _ in nossos:
+        if i1 == i2:
+            inseridas.setdefault(i1, []).extend(linhas)
+    combinadas = list(nossos)
+    for i1, i2, linhas, lado in deles_itens:
+        if i1 == i2 and i1 in inseridas:
+            linhas = [linha for linha in linhas if linha not in inseridas[i1]]
+        combinadas.append((i1, i2, linhas, lado))
+    # Inserções antes da substituição que começa no mesmo ponto; nosso lado antes do deles
+    return sorted(combinadas, key=lambda item: (item[0], item[0] != item[1], item[3] != "nosso"))
+
+
+def merge_linhas(base, nosso, deles):
+    """Merge de três vias por linhas (cada linha do cards.txt é um card).
+
+    Alterações em linhas diferentes são combinadas, e inserções dos dois lados
+    no mesmo ponto (ex.: cards novos no fim) entram todas, sem repetir linhas.
+    Só é conflito quando os dois lados alteram de forma diferente as mesmas
+    linhas da base. Retorna (linhas, conflitos), onde
+    conflitos é uma lista de {"base", "nosso", "deles"}."""
+    if nosso == deles or base == deles:
+        return list(nosso), []
+    if base == nosso:
+        return list(deles), []
+
+    alteracoes = sorted(
+        _alteracoes(base, nosso, "nosso") + _alteracoes(base, deles, "deles"),
+        key=lambda alteracao: (alteracao[0], alteracao[1])
+    )
+
+    # Agrupar alterações que tocam o mesmo trecho da base
+    grupos = []
+    for alteracao in alteracoes:
+        if grupos:
+            inicio, fim, itens = grupos[-1]
+            insercao = alteracao[0] == alteracao[1] or inicio == fim
+            if alteracao[0] < fim or (alteracao[0] == fim and insercao):
+                grupos[-1] = (inicio, max(fim, alteracao[1]), itens + [alteracao])
+                continue
+        grupos.append((alteracao[0], alteracao[1], [alteracao]))
+
+    resultado = []
+    conflitos = []
+    pos = 0
+    for inicio, fim, itens in grupos:
+        resultado.extend(base[pos:inicio])
+        nossos = [item for item in itens if item[3] == "nosso"]
+        deles_itens = [item for item in itens if item[3] == "deles"]
+        versao_nossa = _aplicar(base, inicio, fim, nossos)
+        versao_deles = _aplicar(base, inicio, fim, deles_itens)
+        if not deles_itens or versao_nossa == versao_deles:
+            resultado.extend(versao_nossa)
+        elif not nossos:
+            resultado.extend(versao_deles)
+        elif not _sobrepostas(nossos, deles_itens):
+            resultado.extend(_aplicar(base, inicio, fim, _combinar(nossos, deles_itens)))
+        else:
+            conflitos.append({
+                "base": base[inicio:fim],
+                "nosso": versao_nossa,
+                "deles": versao_deles
+            })
+            resultado.extend(versao_nossa)
+        pos = fim
+    resultado.extend(base[pos:])
+    return resultado, conflitos
+
+
+def merge_conteudo(base, nosso, deles):
+    """merge_linhas sobre textos; preserva a quebra de linha final do nosso conteúdo"""
+    linhas, conflitos = merge_linhas(base.splitlines(), nosso.splitlines(), deles.splitlines())
+    texto = "\n".join(linhas)
+    if nosso.endswith("\n") and texto:
+        texto += "\n"
+    return texto, conflitos
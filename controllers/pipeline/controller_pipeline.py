@@ -1,6 +1,12 @@
 import os
 import base64
-import requests
+import hashlib
+from controllers.azure_devops.azure_devops_client import get_azure_devops_client
+from controllers.common.ttl_cache import TTLCache
+from controllers.pipeline.pipeline_watcher import PipelineStatusHub
+from controllers.pipeline.cards_merge import merge_conteudo
+from controllers.pipeline.save_batcher import SaveBatcher
+from controllers.pipeline.pipeline_orchestrator import PipelineOrchestrator
 
 # Configurações do Azure DevOps
 AZURE_DEVOPS_TOKEN = os.getenv("AZURE_DEVOPS_TOKEN", "")
@@ -8,67 +14,121 @@ AZURE_DEVOPS_ORG = os.getenv("AZURE_DEVOPS_ORG", "koniasamples")
 AZURE_DEVOPS_PROJECT = os.getenv("AZURE_DEVOPS_PROJECT", "POCS")
 AZURE_DEVOPS_REPO = os.getenv("AZURE_DEVOPS_REPO", "AutomacaoCards")
 PIPELINE_ID = os.getenv("PIPELINE_ID", "556")
+CARDS_BRANCH = "helen.santos.v2"
+CARDS_PATH = "/cards.txt"
+
+# Conteúdo do cards.txt por commit (objectId): o conteúdo de um commit nunca muda
+_cards_cache = TTLCache(ttl=86400, maxsize=16)
+
+# Salvamentos seguidos dentro da janela são enviados em um único commit
+PIPELINE_SAVE_DEBOUNCE = float(os.getenv("PIPELINE_SAVE_DEBOUNCE", "1.5"))
+PIPELINE_SAVE_MAX_DELAY = float(os.getenv("PIPELINE_SAVE_MAX_DELAY", "5"))
+# Novas tentativas quando outro cliente atualiza a branch entre a leitura e o push
+PIPELINE_SAVE_MAX_RETRIES = int(os.getenv("PIPELINE_SAVE_MAX_RETRIES", "3"))
+
+
+def _hash_conteudo(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
 class PipelineController:
+    @staticmethod
+    def _client():
+        """Cliente HTTP compartilhado (pool keep-alive) da organização configurada"""
+        return get_azure_devops_client(AZURE_DEVOPS_ORG, AZURE_DEVOPS_TOKEN)
+
+    @staticmethod
+    def _get_branch_object_id():
+        """objectId (commit) atual da branch dos cards; consulta leve usada para revalidar o cache"""
+        api_url = f"https://dev.azure.com/{AZURE_DEVOPS_ORG}/{AZURE_DEVOPS_PROJECT}/_apis/git/repositories/{AZURE_DEVOPS_REPO}/refs"
+        params = {"filter": f"heads/{CARDS_BRANCH}", "api-version": "7.0"}
+        response = PipelineController._client().get(api_url, params=params)
+        
+        if response.status_code != 200:
+            raise Exception(f"Erro ao buscar branch: {response.status_code} - {response.text}")
+        
+        refs = response.json().get("value", [])
+        # O filtro é por prefixo: garantir a branch exata
+        for ref in refs:
+            if ref.get("name") == f"refs/heads/{CARDS_BRANCH}":
+                return ref["objectId"]
+        raise Exception(f"Branch {CARDS_BRANCH} não encontrada")
+
+    @staticmethod
+    def _decode_content(response):
+        """Decodifica o cards.txt tratando conteúdo UTF-8 mal decodificado"""
+        # Solução robusta para problemas de encoding UTF-8
+        try:
+            # Primeira tentativa: usar response.content (bytes) e decodificar como UTF-8
+            content = response.content.decode('utf-8')
+            
+            # Se ainda houver problemas de encoding (caracteres como Ã), tentar correção
+            if any(char in content for char in ['Ã§', 'Ã£', 'Ã¡', 'Ã©', 'Ã­', 'Ã³', 'Ãº', 'Ã']):
+                # O conteúdo foi mal decodificado, provavelmente como latin-1
+                # Recodificar: latin-1 -> bytes -> utf-8
+                content_bytes = content.encode('latin-1')
+                content = content_bytes.decode('utf-8')
+                
+        except (UnicodeDecodeError, UnicodeEncodeError):
+            # Fallback: usar response.text com encoding explícito
+            response.encoding = 'utf-8'
+            content = response.text
+        return content
+
+    @staticmethod
+    def _get_file_at(object_id):
+        """Conteúdo do cards.txt em um commit; retorna (conteúdo, veio do cache)"""
+        content = _cards_cache.get(object_id)
+        if content is not None:
+            return content, True
+        
+        # URL da API para obter conteúdo do arquivo
+        api_url = f"https://dev.azure.com/{AZURE_DEVOPS_ORG}/{AZURE_DEVOPS_PROJECT}/_apis/git/repositories/{AZURE_DEVOPS_REPO}/items"
+        
+        # Parâmetros para obter o arquivo cards.txt exatamente no commit consultado
+        params = {
+            "path": CARDS_PATH,
+            "version": object_id,
+            "versionType": "commit",
+            "api-version": "7.0",
+            "$format": "text"
+        }
+        
+        response = PipelineController._client().get(api_url, params=params)
+        
+        if response.status_code == 200:
+            content = PipelineController._decode_content(response)
+        elif response.status_code == 404:
+            content = ""  # Arquivo não existe ainda
+        else:
+            # Retornar informações detalhadas do erro para debug
+            raise Exception(f"Erro {response.status_code} da API do Azure DevOps: {response.text}")
+        
+        _cards_cache.set(object_id, content)
+        return content, False
+
     @staticmethod
     def get_pipeline_file():
-        """Obtém o conteúdo atual do arquivo cards.txt"""
+        """Obtém o conteúdo atual do arquivo cards.txt.
+        
+        O arquivo só é baixado novamente quando o commit da branch muda."""
         if not AZURE_DEVOPS_TOKEN:
             raise Exception("Token do Azure DevOps não configurado")
         
         try:
-            # URL da API para obter conteúdo do arquivo
-            api_url = f"https://dev.azure.com/{AZURE_DEVOPS_ORG}/{AZURE_DEVOPS_PROJECT}/_apis/git/repositories/{AZURE_DEVOPS_REPO}/items"
-            
-            # Headers da requisição
-            auth_string = base64.b64encode(f':{AZURE_DEVOPS_TOKEN}'.encode()).decode()
-            headers = {
-                "Authorization": f"Basic {auth_string}",
-                "Accept": "application/json"
-            }
-            
-            # Parâmetros para obter o arquivo cards.txt da branch helen.santos.v2
-            params = {
-                "path": "/cards.txt",
-                "version": "helen.santos.v2",
-                "versionType": "branch",
-                "api-version": "7.0",
-                "$format": "text"
-            }
-            
-            response = requests.get(api_url, headers=headers, params=params)
-            
-            if response.status_code == 200:
-                # Solução robusta para problemas de encoding UTF-8
-                try:
-                    # Primeira tentativa: usar response.content (bytes) e decodificar como UTF-8
-                    content = response.content.decode('utf-8')
-                    
-                    # Se ainda houver problemas de encoding (caracteres como Ã), tentar correção
-                    if any(char in content for char in ['Ã§', 'Ã£', 'Ã¡', 'Ã©', 'Ã­', 'Ã³', 'Ãº', 'Ã']):
-                        # O conteúdo foi mal decodificado, provavelmente como latin-1
-                        # Recodificar: latin-1 -> bytes -> utf-8
-                        content_bytes = content.encode('latin-1')
-                        content = content_bytes.decode('utf-8')
-                        
-                except (UnicodeDecodeError, UnicodeEncodeError):
-                    # Fallback: usar response.text com encoding explícito
-                    response.encoding = 'utf-8'
-                    content = response.text
-                
-                return {"content": content}
-            elif response.status_code == 404:
-                return {"content": ""}  # Arquivo não existe ainda
-            else:
-                # Retornar informações detalhadas do erro para debug
-                raise Exception(f"Erro {response.status_code} da API do Azure DevOps: {response.text}")
+            object_id = PipelineController._get_branch_object_id()
+            content, cached = PipelineController._get_file_at(object_id)
+            return {"content": content, "objectId": object_id, "cached": cached}
                 
         except Exception as e:
             raise Exception(f"Erro interno: {str(e)}")
 
     @staticmethod
-    def save_pipeline_file(content):
-        """Salva o conteúdo do arquivo cards.txt no repositório Azure DevOps"""
+    def save_pipeline_file(content, base_object_id=None):
+        """Salva o conteúdo do arquivo cards.txt no repositório Azure DevOps.
+        
+        base_object_id é o commit em que o conteúdo foi carregado; se a branch
+        tiver avançado, as alterações são combinadas (merge de três vias por linha).
+        Salvamentos seguidos são agrupados em um único commit."""
         if not AZURE_DEVOPS_TOKEN:
             raise Exception("Token do Azure DevOps não configurado")
         
@@ -76,73 +136,126 @@ class PipelineController:
             raise Exception("Conteúdo não pode estar vazio")
         
         try:
-            # Azure DevOps Git API requires push operations, not direct file updates
-            auth_string = base64.b64encode(f':{AZURE_DEVOPS_TOKEN}'.encode()).decode()
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Basic {auth_string}"
-            }
-            
+            return _save_batcher.submit(content, base_object_id)
+        except Exception as e:
+            raise Exception(f"Erro interno: {str(e)}")
+
+    @staticmethod
+    def _save_pipeline_files_now(pedidos):
+        """Envia em um commit os salvamentos agrupados, com concorrência otimista.
+        
+        Cada pedido (content, base_object_id) é combinado, na ordem de chegada,
+        sobre o conteúdo atual da branch (merge de três vias a partir da sua
+        base); pedidos que conflitam recebem a exceção no lugar do resultado.
+        Envios sem alteração são ignorados e o merge é refeito quando o
+        oldObjectId fica desatualizado."""
+        for tentativa in range(PIPELINE_SAVE_MAX_RETRIES + 1):
             # First, get the current commit SHA of the branch
-            branch_api = f"https://dev.azure.com/{AZURE_DEVOPS_ORG}/{AZURE_DEVOPS_PROJECT}/_apis/git/repositories/{AZURE_DEVOPS_REPO}/refs"
-            params = {"filter": "heads/helen.santos.v2", "api-version": "7.0"}
-            branch_response = requests.get(branch_api, headers=headers, params=params)
+            old_object_id = PipelineController._get_branch_object_id()
+            current, _ = PipelineController._get_file_at(old_object_id)
             
-            if branch_response.status_code != 200:
-                raise Exception(f"Erro ao buscar branch: {branch_response.status_code} - {branch_response.text}")
-                
-            branch_data = branch_response.json()
-            if not branch_data.get("value"):
-                raise Exception("Branch helen.santos.v2 não encontrada")
-                
-            old_object_id = branch_data["value"][0]["objectId"]
+            to_push = current
+            aplicados = []
+            resultados = []
+            for content, base_object_id in pedidos:
+                # Sem base informada, o conteúdo é tratado como editado sobre a versão atual
+                base = current
+                if base_object_id and base_object_id != old_object_id:
+                    base, _ = PipelineController._get_file_at(base_object_id)
+                combinado, conflitos = merge_conteudo(base, content, to_push)
+                if conflitos:
+                    linhas = "; ".join(" | ".join(conflito["deles"]) or "(removido)" for conflito in conflitos[:3])
+                    resultados.append(Exception(f"Conflito com alterações feitas por outro usuário no cards.txt ({len(conflitos)} trecho(s)): {linhas}. Recarregue o arquivo"))
+                    aplicados.append(None)
+                    continue
+                to_push = combinado
+                resultados.append(None)
+                aplicados.append(content)
             
-            # Create push operation to update the file
-            push_api = f"https://dev.azure.com/{AZURE_DEVOPS_ORG}/{AZURE_DEVOPS_PROJECT}/_apis/git/repositories/{AZURE_DEVOPS_REPO}/pushes"
-            push_params = {"api-version": "7.0"}
+            if not any(content is not None for content in aplicados):
+                return resultados
             
-            # Encode content to base64
-            content_b64 = base64.b64encode(content.encode('utf-8')).decode('utf-8')
-            
-            push_payload = {
-                "refUpdates": [
-                    {
-                        "name": "refs/heads/helen.santos.v2",
-                        "oldObjectId": old_object_id
-                    }
-                ],
-                "commits": [
-                    {
-                        "comment": "Atualizar cards.txt via painel web",
-                        "changes": [
-                            {
-                                "changeType": "edit",
-                                "item": {
-                                    "path": "/cards.txt"
-                                },
-                                "newContent": {
-                                    "content": content_b64,
-                                    "contentType": "base64encoded"
-                                }
-                            }
-                        ]
+            if _hash_conteudo(to_push) == _hash_conteudo(current):
+                return [
+                    resultado or {
+                        "success": True,
+                        "message": "Nenhuma alteração para salvar",
+                        "objectId": old_object_id,
+                        "skipped": True
                     }
+                    for resultado in resultados
                 ]
-            }
             
-            response = requests.post(push_api, json=push_payload, headers=headers, params=push_params)
+            response = PipelineController._push_file(old_object_id, to_push)
             
             if response.status_code in [200, 201]:
-                return {"success": True, "message": "Arquivo salvo com sucesso"}
-            else:
-                raise Exception(f"Erro da API: {response.status_code} - {response.text}")
-                
-        except Exception as e:
-            raise Exception(f"Erro interno: {str(e)}")
+                # O conteúdo salvo passa a ser o cache do novo commit da branch
+                ref_updates = response.json().get("refUpdates", [])
+                new_object_id = ref_updates[0].get("newObjectId") if ref_updates else None
+                if new_object_id:
+                    _cards_cache.set(new_object_id, to_push)
+                for indice, content in enumerate(aplicados):
+                    if content is None:
+                        continue
+                    result = {"success": True, "message": "Arquivo salvo com sucesso", "objectId": new_object_id}
+                    if to_push != content:
+                        # Conteúdo combinado com alterações de outro usuário
+                        result["merged"] = True
+                        result["content"] = to_push
+                    resultados[indice] = result
+                return resultados
+            
+            # oldObjectId desatualizado: outro push entrou entre a leitura e o envio
+            if response.status_code == 409 or "TF401028" in response.text:
+                print(f"Conflito ao salvar cards.txt (tentativa {tentativa + 1}), refazendo merge")
+                pedidos = [(content, base_object_id or old_object_id) for content, base_object_id in pedidos]
+                continue
+            
+            raise Exception(f"Erro da API: {response.status_code} - {response.text}")
+        
+        raise Exception("A branch foi alterada repetidamente durante o salvamento, tente novamente")
 
     @staticmethod
-    def run_pipeline():
-        """Executa a pipeline do Azure DevOps"""
+    def _push_file(old_object_id, content):
+        # Azure DevOps Git API requires push operations, not direct file updates
+        push_api = f"https://dev.azure.com/{AZURE_DEVOPS_ORG}/{AZURE_DEVOPS_PROJECT}/_apis/git/repositories/{AZURE_DEVOPS_REPO}/pushes"
+        push_params = {"api-version": "7.0"}
+        
+        # Encode content to base64
+        content_b64 = base64.b64encode(content.encode('utf-8')).decode('utf-8')
+        
+        push_payload = {
+            "refUpdates": [
+                {
+                    "name": f"refs/heads/{CARDS_BRANCH}",
+                    "oldObjectId": old_object_id
+                }
+            ],
+            "commits": [
+                {
+                    "comment": "Atualizar cards.txt via painel web",
+                    "changes": [
+                        {
+                            "changeType": "edit",
+                            "item": {
+                                "path": CARDS_PATH
+                            },
+                            "newContent": {
+                                "content": content_b64,
+                                "contentType": "base64encoded"
+                            }
+                        }
+                    ]
+                }
+            ]
+        }
+        
+        return PipelineController._client().post(push_api, json=push_payload, params=push_params)
+
+    @staticmethod
+    def run_pipeline(branch=None, parameters=None):
+        """Executa a pipeline do Azure DevOps na branch informada (padrão: branch dos cards),
+        opcionalmente com templateParameters"""
         if not AZURE_DEVOPS_TOKEN:
             raise Exception("Token do Azure DevOps não configurado")
         
@@ -150,29 +263,28 @@ class PipelineController:
             # URL da API do Azure DevOps para executar pipeline
             api_url = f"https://dev.azure.com/{AZURE_DEVOPS_ORG}/{AZURE_DEVOPS_PROJECT}/_apis/pipelines/{PIPELINE_ID}/runs"
             
-            # Headers da requisição
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Basic {base64.b64encode(f':{AZURE_DEVOPS_TOKEN}'.encode()).decode()}"
-            }
-            
             # Parâmetros da API (incluindo api-version obrigatório)
             params = {
                 "api-version": "7.0"
             }
             
-            # Payload para executar a pipeline na branch helen.santos.v2
+            # Payload para executar a pipeline na branch escolhida
+            ref_name = branch or CARDS_BRANCH
+            if not ref_name.startswith("refs/"):
+                ref_name = f"refs/heads/{ref_name}"
             payload = {
                 "resources": {
                     "repositories": {
                         "self": {
-                            "refName": "refs/heads/helen.santos.v2"
+                            "refName": ref_name
                         }
                     }
                 }
             }
+            if parameters:
+                payload["templateParameters"] = parameters
             
-            response = requests.post(api_url, json=payload, headers=headers, params=params)
+            response = PipelineController._client().post(api_url, json=payload, params=params)
             
             if response.status_code == 200:
                 build_data = response.json()
@@ -198,18 +310,12 @@ class PipelineController:
             # URL da API do Azure DevOps para consultar status da pipeline
             api_url = f"https://dev.azure.com/{AZURE_DEVOPS_ORG}/{AZURE_DEVOPS_PROJECT}/_apis/build/builds/{build_id}"
             
-            # Headers da requisição
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Basic {base64.b64encode(f':{AZURE_DEVOPS_TOKEN}'.encode()).decode()}"
-            }
-            
             # Parâmetros da API
             params = {
                 "api-version": "7.0"
             }
             
-            response = requests.get(api_url, headers=headers, params=params)
+            response = PipelineController._client().get(api_url, params=params)
             
             if response.status_code == 200:
                 build_data = response.json()
@@ -249,4 +355,14 @@ class PipelineController:
                 raise Exception(f"Erro ao consultar status: {response.text}")
                 
         except Exception as e:
-            raise Exception(str(e))
\ No newline at end of file
+            raise Exception(str(e))
+
+
+# Salvamentos do cards.txt agrupados por debounce
+_save_batcher = SaveBatcher(PipelineController._save_pipeline_files_now, PIPELINE_SAVE_DEBOUNCE, PIPELINE_SAVE_MAX_DELAY)
+
+# Uma consulta ao Azure DevOps por build, compartilhada por todas as abas (SSE)
+pipeline_status_hub = PipelineStatusHub(PipelineController.pipeline_status)
+
+# Lotes de execuções da pipeline (várias branches/parâmetros) acompanhados pelo hub acima
+pipeline_orchestrator = PipelineOrchestrator(PipelineController.run_pipeline, pipeline_status_hub)
@@ -0,0 +1,166 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Execuções disparadas em paralelo ao iniciar um lote
+PIPELINE_BATCH_CONCURRENCY = int(os.getenv("PIPELINE_BATCH_CONCURRENCY", "4"))
+# Execuções permitidas por lote
+PIPELINE_BATCH_MAX_RUNS = int(os.getenv("PIPELINE_BATCH_MAX_RUNS", "20"))
+# Tempo que um lote concluído permanece no registro
+PIPELINE_BATCH_TTL = int(os.getenv("PIPELINE_BATCH_TTL", "86400"))
+
+_RESULTADOS_SUCESSO = ("sucesso", "parcialmente bem-sucedida")
+
+
+class PipelineOrchestrator:
+    """Dispara lotes de execuções da pipeline (várias branches/parâmetros) e acompanha o progresso.
+
+    O status de cada build vem do PipelineStatusHub, então abas acompanhando a
+    mesma build por SSE e o orquestrador compartilham uma única consulta."""
+
+    def __init__(self, run_pipeline, status_hub, concurrency=PIPELINE_BATCH_CONCURRENCY):
+        self.run_pipeline = run_pipeline
+        self.status_hub = status_hub
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="pipeline-batch")
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def start_batch(self, runs):
+        """Registra e dispara as execuções; runs é uma lista de {"branch", "parameters"}.
+
+        Entrada inválida lança ValueError (antes de disparar qualquer execução)."""
+        if not isinstance(runs, list) or not runs:
+            raise ValueError("Informe ao menos uma execução")
+        if len(runs) > PIPELINE_BATCH_MAX_RUNS:
+            raise ValueError(f"Máximo de {PIPELINE_BATCH_MAX_RUNS} execuções por lote")
+        for index, run in enumerate(runs):
+            if not isinstance(run, dict) or not isinstance(run.get("branch"), str) or not run["branch"]:
+                raise ValueError(f"Execução {index} inválida: esperado {{branch, parameters}} com branch preenchida")
+            if not isinstance(run.get("parameters") or {}, dict):
+                raise ValueError(f"Execução {index} inválida: parameters deve ser um objeto")
+
+        batch = {
+            "id": uuid.uuid4().hex,
+            "created_at": time.time(),
+            "runs": [
+                {
+                    "index": index,
+                    "branch": run.get("branch"),
+                    "parameters": run.get("parameters") or {},
+                    "state": "triggering",
+                    "buildId": None,
+                    "buildUrl": None,
+                    "status": None,
+                    "result": None,
+                    "error": None
+                }
+                for index, run in enumerate(runs)
+            ]
+        }
+        with self._lock:
+            self._limpar_expirados()
+            self._batches[batch["id"]] = batch
+
+        for run in batch["runs"]:
+            self._executor.submit(self._disparar, run)
+        return self.get_batch(batch["id"])
+
+    def _disparar(self, run):
+        try:
+            result = self.run_pipeline(run["branch"], run["parameters"])
+        except Exception as e:
+            print(f"Erro ao disparar pipeline na branch {run['branch']}: {str(e)}")
+            with self._lock:
+                run["state"] = "error"
+                run["error"] = str(e)
+            return
+
+        build_id = result.get("buildId") if isinstance(result, dict) else None
+        if build_id is None:
+            # Sem build não há o que acompanhar
+            print(f"Pipeline na branch {run['branch']} não retornou o id da build: {result}")
+            with self._lock:
+                run["state"] = "failed"
+                run["error"] = (result.get("error") if isinstance(result, dict) else None) or "Execução não retornou o id da build"
+            return
+
+        with self._lock:
+            run["state"] = "queued"
+            run["buildId"] = build_id
+            run["buildUrl"] = result.get("buildUrl")
+        # Acompanhamento fora do pool de disparo para não bloquear os próximos lotes
+        threading.Thread(target=self._acompanhar, args=(run,), daemon=True).start()
+
+    def _acompanhar(self, run):
+        build_id = run["buildId"]
+        subscriber = self.status_hub.subscribe(build_id)
+        try:
+            while True:
+                evento, dados = subscriber.get()
+                with self._lock:
+                    if evento == "status":
+                        run["status"] = dados.get("status")
+                        run["result"] = dados.get("result")
+                        run["buildUrl"] = dados.get("buildUrl") or run["buildUrl"]
+                        if dados.get("isCompleted"):
+                            run["state"] = "succeeded" if run["result"] in _RESULTADOS_SUCESSO else "failed"
+                        else:
+                            run["state"] = "running" if dados.get("status") == "executando" else "queued"
+                    elif evento == "error":
+                        run["state"] = "error"
+                        run["error"] = dados.get("error")
+                    elif evento == "end" and run["state"] not in ("succeeded", "failed", "error"):
+                        run["state"] = "error"
+                        run["error"] = "Acompanhamento encerrado antes da conclusão"
+                    finished = run["state"] in ("succeeded", "failed", "error")
+                if finished:
+                    break
+        finally:
+            self.status_hub.unsubscribe(build_id, subscriber)
+
+    def get_batch(self, batch_id):
+        """Cópia do lote com o progresso agregado, ou None se não existir/expirou"""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                return None
+            runs = [dict(run) for run in batch["runs"]]
+
+        contagem = {}
+        for run in runs:
+            contagem[run["state"]] = contagem.get(run["state"], 0) + 1
+        concluidas = sum(contagem.get(state, 0) for state in ("succeeded", "failed", "error"))
+        total = len(runs)
+
+        if concluidas < total:
+            status = "running"
+        elif contagem.get("succeeded", 0) == total:
+            status = "succeeded"
+        else:
+            status = "failed"
+
+        return {
+            "id": batch["id"],
+            "created_at": batch["created_at"],
+            "status": status,
+            "progress": {
+                "total": total,
+                "completed": concluidas,
+                "percent": round(concluidas * 100 / total) if total else 100,
+                "states": contagem
+            },
+            "runs": runs
+        }
+
+    def list_batches(self):
+        with self._lock:
+            self._limpar_expirados()
+            ids = sorted(self._batches, key=lambda batch_id: self._batches[batch_id]["created_at"], reverse=True)
+        return [batch for batch in (self.get_batch(batch_id) for batch_id in ids) if batch]
+
+    def _limpar_expirados(self):
+        limite = time.time() - PIPELINE_BATCH_TTL
+        for batch_id in [batch_id for batch_id, batch in self._batches.items() if batch["created_at"] < limite]:
+            del self._batches[batch_id]
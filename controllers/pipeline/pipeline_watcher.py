@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import queue
+import threading
+
+# Intervalo de consulta ao Azure DevOps: começa no mínimo e cresce enquanto o status não muda
+PIPELINE_WATCH_MIN_INTERVAL = float(os.getenv("PIPELINE_WATCH_MIN_INTERVAL", "3"))
+PIPELINE_WATCH_MAX_INTERVAL = float(os.getenv("PIPELINE_WATCH_MAX_INTERVAL", "30"))
+PIPELINE_WATCH_BACKOFF = float(os.getenv("PIPELINE_WATCH_BACKOFF", "1.5"))
+# Sem inscritos por esse tempo, a consulta da build é encerrada
+PIPELINE_WATCH_IDLE_TIMEOUT = float(os.getenv("PIPELINE_WATCH_IDLE_TIMEOUT", "30"))
+# Tempo máximo acompanhando uma mesma build
+PIPELINE_WATCH_MAX_SECONDS = float(os.getenv("PIPELINE_WATCH_MAX_SECONDS", "3600"))
+# Erros consecutivos do Azure DevOps antes de desistir
+PIPELINE_WATCH_MAX_ERRORS = int(os.getenv("PIPELINE_WATCH_MAX_ERRORS", "5"))
+
+
+def evento_sse(evento, dados):
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+class _BuildWatcher:
+    """Consulta o status de uma build em uma única thread e distribui para os inscritos"""
+
+    def __init__(self, hub, build_id, fetch_status):
+        self.hub = hub
+        self.build_id = build_id
+        self.fetch_status = fetch_status
+        self.subscribers = set()
+        self.last_event = None
+        self.finished = False
+        self.idle_since = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name=f"pipeline-watch-{build_id}", daemon=True)
+
+    def _publish(self, evento, dados):
+        self.last_event = (evento, dados)
+        for subscriber in list(self.subscribers):
+            subscriber.put(self.last_event)
+
+    def _run(self):
+        started = time.monotonic()
+        interval = PIPELINE_WATCH_MIN_INTERVAL
+        errors = 0
+        try:
+            while True:
+                try:
+                    status = self.fetch_status(self.build_id)
+                    errors = 0
+                    if self.last_event is None or self.last_event[1] != status:
+                        interval = PIPELINE_WATCH_MIN_INTERVAL
+                        self._publish("status", status)
+                    else:
+                        interval = min(interval * PIPELINE_WATCH_BACKOFF, PIPELINE_WATCH_MAX_INTERVAL)
+                    if status.get("isCompleted"):
+                        break
+                except Exception as e:
+                    errors += 1
+                    print(f"Erro ao consultar status da build {self.build_id}: {str(e)}")
+                    if errors >= PIPELINE_WATCH_MAX_ERRORS:
+                        self._publish("error", {"error": str(e), "buildId": self.build_id})
+                        break
+                    interval = min(interval * PIPELINE_WATCH_BACKOFF, PIPELINE_WATCH_MAX_INTERVAL)
+
+                if time.monotonic() - started > PIPELINE_WATCH_MAX_SECONDS:
+                    self._publish("error", {"error": "Tempo máximo de acompanhamento excedido", "buildId": self.build_id})
+                    break
+                if self.hub._should_stop(self):
+                    break
+                time.sleep(interval)
+        finally:
+            self.hub._finish(self)
+
+
+class PipelineStatusHub:
+    """Um watcher por build, compartilhado por todos os navegadores que acompanham a mesma build"""
+
+    def __init__(self, fetch_status):
+        self.fetch_status = fetch_status
+        self._watchers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, build_id):
+        """Retorna uma fila que recebe (evento, dados); o último status conhecido chega imediatamente"""
+        subscriber = queue.Queue()
+        with self._lock:
+            watcher = self._watchers.get(build_id)
+            if watcher is None:
+                watcher = _BuildWatcher(self, build_id, self.fetch_status)
+                self._watchers[build_id] = watcher
+                watcher.thread.start()
+            watcher.subscribers.add(subscriber)
+            if watcher.last_event is not None:
+                subscriber.put(watcher.last_event)
+        return subscriber
+
+    def unsubscribe(self, build_id, subscriber):
+        with self._lock:
+            watcher = self._watchers.get(build_id)
+            if watcher is not None:
+                watcher.subscribers.discard(subscriber)
+                if not watcher.subscribers:
+                    watcher.idle_since = time.monotonic()
+
+    def latest(self, build_id):
+        """Último status publicado para a build (None se não houver watcher ativo)"""
+        with self._lock:
+            watcher = self._watchers.get(build_id)
+            if watcher is not None and watcher.last_event and watcher.last_event[0] == "status":
+                return watcher.last_event[1]
+        return None
+
+    def _should_stop(self, watcher):
+        with self._lock:
+            return not watcher.subscribers and time.monotonic() - watcher.idle_since > PIPELINE_WATCH_IDLE_TIMEOUT
+
+    def _finish(self, watcher):
+        with self._lock:
+            watcher.finished = True
+            if self._watchers.get(watcher.build_id) is watcher:
+                del self._watchers[watcher.build_id]
+            subscribers = list(watcher.subscribers)
+        for subscriber in subscribers:
+            subscriber.put(("end", {"buildId": watcher.build_id}))
+
+    def stream(self, build_id, keepalive=15):
+        """Gerador de eventos SSE para um inscrito; termina quando a build é concluída"""
+        subscriber = self.subscribe(build_id)
+        try:
+            yield ": acompanhando\n\n"
+            while True:
+                try:
+                    evento, dados = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if evento == "end":
+                    break
+                yield evento_sse(evento, dados)
+                if evento == "error" or dados.get("isCompleted"):
+                    break
+        finally:
+            self.unsubscribe(build_id, subscriber)
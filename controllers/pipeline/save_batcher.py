@@ -0,0 +1,77 @@
+import time
+import threading
+
+
+class _Lote:
+    def __init__(self, agora, imediato):
+        # (content, base_object_id) de cada chamada, na ordem de chegada
+        self.pedidos = []
+        self.imediato = imediato
+        self.primeiro = agora
+        self.prazo = agora
+        self.pronto = threading.Event()
+        self.resultados = None
+        self.erro = None
+
+
+class SaveBatcher:
+    """Agrupa salvamentos seguidos em um único envio (debounce).
+
+    Cada chamada a submit aguarda o envio do lote em que entrou. flush recebe
+    a lista de pedidos (content, base_object_id) e retorna, na mesma ordem, o
+    resultado de cada um (dict) ou a exceção que o recusou. Sem envio em
+    andamento o lote sai imediatamente; durante um envio, as chamadas seguintes
+    são agrupadas por até `debounce` segundos sem novas chamadas, ou no máximo
+    `max_delay` segundos após a primeira."""
+
+    def __init__(self, flush, debounce, max_delay):
+        self.flush = flush
+        self.debounce = debounce
+        self.max_delay = max(debounce, max_delay)
+        self._lote = None
+        self._enviando = 0
+        self._lock = threading.Lock()
+        # Um envio por vez: lotes seguintes partem do commit gerado pelo anterior
+        self._flush_lock = threading.Lock()
+
+    def submit(self, content, base_object_id=None):
+        agora = time.monotonic()
+        with self._lock:
+            lote = self._lote
+            if lote is None:
+                lote = _Lote(agora, imediato=not self._enviando)
+                self._lote = lote
+                threading.Thread(target=self._aguardar_e_enviar, args=(lote,), daemon=True).start()
+            indice = len(lote.pedidos)
+            lote.pedidos.append((content, base_object_id))
+            if not lote.imediato:
+                lote.prazo = min(agora + self.debounce, lote.primeiro + self.max_delay)
+
+        lote.pronto.wait()
+        if lote.erro is not None:
+            raise lote.erro
+        resultado = lote.resultados[indice]
+        if isinstance(resultado, Exception):
+            raise resultado
+        return dict(resultado, coalesced=len(lote.pedidos))
+
+    def _aguardar_e_enviar(self, lote):
+        while True:
+            with self._lock:
+                restante = lote.prazo - time.monotonic()
+                if restante <= 0:
+                    # Novas chamadas a partir daqui entram no próximo lote
+                    self._lote = None
+                    self._enviando += 1
+                    break
+            time.sleep(restante)
+
+        try:
+            with self._flush_lock:
+                lote.resultados = self.flush(list(lote.pedidos))
+        except Exception as e:
+            lote.erro = e
+        finally:
+            with self._lock:
+                self._enviando -= 1
+            lote.pronto.set()
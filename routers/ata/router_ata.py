@@ -1,19 +1,70 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, url_for
 from controllers.ata.controller_ata import AtaController
+from controllers.ata.ata_jobs import ata_jobs, FilaCheiaError
 
 ata_bp = Blueprint('ata', __name__)
 
+def _force_regenerate():
+    """Flag do formulário para ignorar o cache e chamar o modelo novamente"""
+    return request.form.get("force_regenerate", "").lower() in ("1", "true", "on", "yes")
+
+def _enfileirar(func):
+    """Enfileira func com os campos do formulário e retorna 202 com o id do job (429 com a fila cheia)"""
+    data = request.form.get("data")
+    requerimento = request.form.get("requerimento")
+    resumo = request.form.get("resumo")
+    
+    job = ata_jobs.submit(func, data, requerimento, resumo, _force_regenerate(), request.form.get("template"))
+    return jsonify({
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": url_for("ata.gerar_ata_status_route", job_id=job["id"])
+    }), 202
+
 @ata_bp.route("/gerar_ata", methods=["POST"])
 def gerar_ata_route():
-    """Endpoint para gerar ATA"""
+    """Endpoint para gerar ATA: enfileira a geração e retorna o id do job (202)"""
     try:
-        data = request.form.get("data")
-        requerimento = request.form.get("requerimento")
-        resumo = request.form.get("resumo")
-        
-        result = AtaController.processar_gerar_ata(data, requerimento, resumo)
-        return jsonify(result)
+        return _enfileirar(AtaController.processar_gerar_ata)
         
+    except FilaCheiaError as e:
+        return jsonify({"error": str(e), "queue": ata_jobs.stats()}), 429, {"Retry-After": "5"}
     except Exception as e:
         print("Error generating ATA:", str(e))
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@ata_bp.route("/gerar_ata/<job_id>", methods=["GET"])
+def gerar_ata_status_route(job_id):
+    """Status do job de geração; com status "done", result traz ata, titulo, proximos e corpo
+    (ou, para /gerar_atas, a lista de atas e o total de tokens)"""
+    job = ata_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado ou expirado"}), 404
+    return jsonify(job)
+
+@ata_bp.route("/gerar_atas", methods=["POST"])
+def gerar_atas_route():
+    """Endpoint para gerar uma ATA por dia/empresa/requerimento do resumo: enfileira a
+    geração (feita em paralelo no job) e retorna o id do job (202)"""
+    try:
+        return _enfileirar(AtaController.processar_gerar_atas)
+        
+    except FilaCheiaError as e:
+        return jsonify({"error": str(e), "queue": ata_jobs.stats()}), 429, {"Retry-After": "5"}
+    except Exception as e:
+        print("Error generating ATAs:", str(e))
+        return jsonify({"error": str(e)}), 500
+
+@ata_bp.route("/gerar_ata/stream", methods=["POST"])
+def gerar_ata_stream_route():
+    """Endpoint para gerar ATA com streaming (Server-Sent Events)"""
+    data = request.form.get("data")
+    requerimento = request.form.get("requerimento")
+    resumo = request.form.get("resumo")
+    
+    events = AtaController.processar_gerar_ata_stream(data, requerimento, resumo, _force_regenerate(), request.form.get("template"))
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,55 +1,38 @@
 from flask import Blueprint, request, jsonify
 from controllers.ata.azure_boards_controller import AzureBoardsController
+from controllers.ata.ata_write_queue import get_ata_write_queue
+from controllers.ata.ata_prefetcher import ata_prefetcher
 
 boards_bp = Blueprint('boards', __name__)
 
+def _save_queued(org, work_item_id, ata_data):
+    return AzureBoardsController().save_ata_details(work_item_id, ata_data)
+
+def _write_queue():
+    return get_ata_write_queue(_save_queued)
+
+@boards_bp.record_once
+def _start_write_queue(state):
+    """Edições que ficaram no diário (ex.: antes de um reinício) voltam a ser enviadas ao subir a aplicação"""
+    _write_queue()
+
 @boards_bp.route("/api/companies", methods=["GET"])
 def get_companies():
     """Busca todas as empresas disponíveis baseadas nos títulos das ATAs"""
     try:
         boards_controller = AzureBoardsController()
         
-        # Verificar se foi especificada uma sprint específica
+        # Verificar se foi especificada uma sprint específica (senão, sprint atual)
         sprint_id = request.args.get('sprint_id')
         
-        if sprint_id:
-            # Buscar work items da sprint específica
-            work_items = boards_controller.get_my_work_items_in_sprint(sprint_id)
-            print(f"DEBUG: Found {len(work_items)} work items for sprint {sprint_id}")
-        else:
-            # Buscar work items da sprint atual
-            work_items = boards_controller.get_my_work_items_in_sprint()
-            print(f"DEBUG: Found {len(work_items)} work items for current sprint")
-        
-        # Extrair empresas únicas
-        companies = set()
-        excluded_terms = {'ATA', 'TASK', 'BUG', 'FEATURE', 'USER STORY'}  # Termos que não são empresas
-        
-        for item in work_items:
-            # Verificar se o item tem company já processado
-            company = item.get("company")
-            if company:
-                # Normalizar case e filtrar termos inválidos
-                company_upper = company.upper()
-                if company_upper not in excluded_terms:
-                    companies.add(company_upper)
-                    print(f"DEBUG: Found company '{company_upper}' from item {item.get('id')}")
-            else:
-                # Se não tem company, tentar extrair do título
-                title = item.get("fields", {}).get("System.Title", "")
-                if title:
-                    extracted_company = boards_controller.extract_company_from_title(title)
-                    if extracted_company:
-                        company_upper = extracted_company.upper()
-                        if company_upper not in excluded_terms:
-                            companies.add(company_upper)
-                            print(f"DEBUG: Extracted company '{company_upper}' from title '{title}'")
-        
-        # Retornar lista ordenada
-        companies_list = sorted(list(companies))
-        print(f"DEBUG: Final companies list: {companies_list}")
-        
-        return jsonify({"companies": companies_list})
+        # Índice de empresas mantido a cada busca de work items (sem refazer a busca)
+        companies = boards_controller.get_companies(sprint_id)
+        
+        return jsonify({
+            "companies": list(companies.keys()),
+            "counts": {company: info["count"] for company, info in companies.items()},
+            "states": {company: info["states"] for company, info in companies.items()}
+        })
     except Exception as e:
         print(f"ERROR in get_companies: {str(e)}")
         return jsonify({"error": str(e), "companies": []}), 500
@@ -74,61 +57,100 @@ def get_sprints():
     except Exception as e:
         return jsonify({"error": str(e), "sprints": []}), 500
 
+@boards_bp.route("/api/boards/sprints/cache/invalidate", methods=["POST"])
+def invalidate_sprints_cache():
+    """Descarta o cache de sprints/iterações (ex.: após criar ou alterar uma sprint)"""
+    try:
+        boards_controller = AzureBoardsController()
+        removed = boards_controller.invalidate_sprint_cache()
+        return jsonify({"success": True, "removed": removed})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @boards_bp.route("/api/boards/my-work-items", methods=["GET"])
 def get_my_work_items():
-    """Busca os work items (cards) do usuário na sprint ativa - rota alternativa"""
+    """Busca os work items (cards) do usuário na sprint ativa - rota alternativa.
+    
+    Filtros opcionais: company, state, type, priority, q (texto no título).
+    Paginação: limit + cursor (next_cursor da resposta anterior).
+    Projeção: fields=System.Title,System.State,..."""
     try:
         # Verificar se foi passado um sprint_id específico
         sprint_id = request.args.get('sprint_id')
-        # Verificar se foi passado um filtro por empresa
-        company_filter = request.args.get('company')
+        # refresh=full descarta o snapshot local e baixa todos os work items novamente
+        force_refresh = request.args.get('refresh') == 'full'
+        
+        filters = {
+            "company": request.args.get('company'),
+            "state": request.args.get('state'),
+            "type": request.args.get('type'),
+            "priority": request.args.get('priority', type=int),
+            "q": request.args.get('q')
+        }
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', type=int)
+        fields_param = request.args.get('fields')
+        fields = [f.strip() for f in fields_param.split(',') if f.strip()] if fields_param else None
         
         boards_controller = AzureBoardsController()
+        result = boards_controller.query_my_work_items(sprint_id, filters, cursor, limit, fields, force_refresh)
         
-        if sprint_id:
-            # Buscar work items de uma sprint específica
-            work_items = boards_controller.get_my_work_items_in_sprint(sprint_id, company_filter)
-            # Buscar informações da sprint específica
-            all_sprints = boards_controller.get_all_sprints()
-            selected_sprint = next((s for s in all_sprints if s.get("id") == sprint_id), None)
-            
-            return jsonify({
-                "sprint": {
-                    "id": selected_sprint.get("id") if selected_sprint else sprint_id,
-                    "name": selected_sprint.get("name") if selected_sprint else f"Sprint {sprint_id}",
-                    "path": selected_sprint.get("path") if selected_sprint else "",
-                    "startDate": selected_sprint.get("attributes", {}).get("startDate") if selected_sprint else "",
-                    "endDate": selected_sprint.get("attributes", {}).get("finishDate") if selected_sprint else ""
-                },
-                "work_items": work_items,
-                "total_items": len(work_items),
-                "message": f"Encontrados {len(work_items)} work items na sprint selecionada"
-            })
+        sprint = result["sprint"]
+        if sprint or sprint_id:
+            sprint_info = {
+                "id": sprint.get("id") if sprint else sprint_id,
+                "name": sprint.get("name") if sprint else f"Sprint {sprint_id}",
+                "path": sprint.get("path") if sprint else "",
+                "startDate": sprint.get("attributes", {}).get("startDate") if sprint else "",
+                "endDate": sprint.get("attributes", {}).get("finishDate") if sprint else ""
+            }
+        else:
+            sprint_info = None
+        
+        work_items = result["work_items"]
+        # Detalhes dos primeiros cards carregados em segundo plano: abrir o modal vem do cache
+        ata_prefetcher.schedule(boards_controller, [item["id"] for item in work_items])
+        
+        if not sprint_info:
+            message = "Nenhuma sprint ativa encontrada"
+        elif filters["company"]:
+            message = f"Encontrados {result['total_items']} work items filtrados por empresa: {filters['company']}"
+        elif sprint_id:
+            message = f"Encontrados {result['total_items']} work items na sprint selecionada"
         else:
-            # Comportamento padrão - sprint atual
-            if company_filter:
-                # Se temos filtro de empresa, buscar com filtro
-                work_items = boards_controller.get_my_work_items_in_sprint(None, company_filter)
-                current_sprint = boards_controller.get_current_sprint()
-                return jsonify({
-                    "sprint": {
-                        "id": current_sprint.get("id") if current_sprint else None,
-                        "name": current_sprint.get("name") if current_sprint else "",
-                        "path": current_sprint.get("path") if current_sprint else "",
-                        "startDate": current_sprint.get("attributes", {}).get("startDate") if current_sprint else "",
-                        "endDate": current_sprint.get("attributes", {}).get("finishDate") if current_sprint else ""
-                    },
-                    "work_items": work_items,
-                    "total_items": len(work_items),
-                    "message": f"Encontrados {len(work_items)} work items filtrados por empresa: {company_filter}"
-                })
-            else:
-                # Sem filtro - usar método original
-                result = boards_controller.get_sprint_and_work_items()
-                return jsonify(result)
+            message = f"Encontrados {result['total_items']} work items na sprint ativa"
+        
+        response = {
+            "sprint": sprint_info,
+            "work_items": work_items,
+            "total_items": result["total_items"],
+            "next_cursor": result["next_cursor"],
+            "message": message,
+            "sync": boards_controller.sync_engine.last_sync_stats
+        }
+        if boards_controller.last_fetch_errors:
+            response["fetch_errors"] = boards_controller.last_fetch_errors
+        return jsonify(response)
     except Exception as e:
         return jsonify({"error": str(e), "work_items": []}), 500
 
+@boards_bp.route("/api/boards/work-items/fields", methods=["GET"])
+def get_work_items_fields():
+    """Busca sob demanda os campos completos (ou os informados) de work items da lista"""
+    try:
+        ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()]
+        if not ids:
+            return jsonify({"error": "ids is required"}), 400
+        
+        fields_param = request.args.get('fields')
+        fields = [f.strip() for f in fields_param.split(',') if f.strip()] if fields_param else None
+        
+        boards_controller = AzureBoardsController()
+        result = boards_controller.get_work_items_fields(ids, fields)
+        return jsonify({"work_items": result})
+    except Exception as e:
+        return jsonify({"error": str(e), "work_items": {}}), 500
+
 @boards_bp.route("/api/sprint-info", methods=["GET"])
 def get_sprint_info():
     """Busca informações da sprint ativa"""
@@ -152,11 +174,15 @@ def get_sprint_info():
 
 @boards_bp.route("/api/ata/<work_item_id>/details", methods=["GET"])
 def get_ata_details(work_item_id):
-    """Busca detalhes completos de uma ATA específica"""
+    """Busca detalhes de uma ATA específica.
+    
+    allFields=1 inclui todos os campos do work item; refresh=1 ignora o cache."""
     try:
         print(f"API REQUEST: Getting ATA details for work_item_id = {work_item_id}")
+        include_all_fields = request.args.get('allFields') in ('1', 'true')
+        refresh = request.args.get('refresh') in ('1', 'true')
         boards_controller = AzureBoardsController()
-        ata_details = boards_controller.get_ata_details(work_item_id)
+        ata_details = boards_controller.get_ata_details(work_item_id, include_all_fields, refresh)
         print(f"API RESPONSE: Retrieved ATA details for {work_item_id}")
         print(f"  - Title: {ata_details.get('title', 'Not found')}")
         print(f"  - Comments: {ata_details.get('comments', 'Not found')[:50]}...")
@@ -165,6 +191,16 @@ def get_ata_details(work_item_id):
         print(f"API ERROR: Failed to get ATA details for {work_item_id}: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@boards_bp.route("/api/ata/<work_item_id>/relations", methods=["GET"])
+def get_ata_relations(work_item_id):
+    """Relações e links de uma ATA (fora dos detalhes, buscados sob demanda)"""
+    try:
+        boards_controller = AzureBoardsController()
+        return jsonify(boards_controller.get_ata_relations(work_item_id))
+    except Exception as e:
+        print(f"API ERROR: Failed to get ATA relations for {work_item_id}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @boards_bp.route("/api/ata/<work_item_id>/status", methods=["PUT"])
 def update_ata_status(work_item_id):
     """Atualiza apenas o status de uma ATA específica"""
@@ -189,17 +225,93 @@ def update_ata_status(work_item_id):
 
 @boards_bp.route("/api/ata/<work_item_id>/save", methods=["POST"])
 def save_ata_details(work_item_id):
-    """Salva detalhes atualizados de uma ATA específica"""
+    """Salva detalhes atualizados de uma ATA específica (junto com rascunhos ainda pendentes)"""
     try:
         print(f"API REQUEST: Saving ATA details for work_item_id = {work_item_id}")
         ata_data = request.get_json()
         print(f"  - Data received: {list(ata_data.keys()) if ata_data else 'None'}")
         
         boards_controller = AzureBoardsController()
-        result = boards_controller.save_ata_details(work_item_id, ata_data)
+        queue = _write_queue()
+        queue.enqueue(boards_controller.org, work_item_id, ata_data or {})
+        result = queue.commit(boards_controller.org, work_item_id)
+        if result.get("conflict"):
+            # ATA alterada por outra pessoa: as edições ficam no diário até serem descartadas
+            return jsonify(result), 409
+        if result.get("error"):
+            raise Exception(result["error"])
         
         print(f"API RESPONSE: Successfully saved ATA {work_item_id}")
         return jsonify(result)
     except Exception as e:
         print(f"API ERROR: Failed to save ATA details for {work_item_id}: {str(e)}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@boards_bp.route("/api/ata/<work_item_id>/draft", methods=["POST"])
+def save_ata_draft(work_item_id):
+    """Registra edições (autosave) na fila de gravação; o envio ao Azure DevOps é feito em segundo plano"""
+    try:
+        ata_data = request.get_json(silent=True) or {}
+        boards_controller = AzureBoardsController()
+        status = _write_queue().enqueue(boards_controller.org, work_item_id, ata_data)
+        return jsonify(status), 202
+    except Exception as e:
+        print(f"API ERROR: Failed to queue ATA draft for {work_item_id}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@boards_bp.route("/api/ata/<work_item_id>/draft", methods=["DELETE"])
+def discard_ata_draft(work_item_id):
+    """Descarta as edições da ATA que ainda não foram enviadas ao Azure DevOps (Cancelar)"""
+    try:
+        boards_controller = AzureBoardsController()
+        removed = _write_queue().discard(boards_controller.org, work_item_id)
+        return jsonify({"success": True, "discarded": removed, "id": int(work_item_id)})
+    except Exception as e:
+        print(f"API ERROR: Failed to discard ATA draft for {work_item_id}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@boards_bp.route("/api/ata/<work_item_id>/commit", methods=["POST"])
+def commit_ata_draft(work_item_id):
+    """Envia imediatamente as edições pendentes da ATA"""
+    try:
+        boards_controller = AzureBoardsController()
+        result = _write_queue().commit(boards_controller.org, work_item_id)
+        if result.get("conflict"):
+            return jsonify(result), 409
+        if result.get("error"):
+            raise Exception(result["error"])
+        return jsonify(result)
+    except Exception as e:
+        print(f"API ERROR: Failed to commit ATA {work_item_id}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@boards_bp.route("/api/ata/<work_item_id>/save-status", methods=["GET"])
+def get_ata_save_status(work_item_id):
+    """Situação da gravação das edições da ATA (pending, flushing, saved, conflict, failed, idle)"""
+    try:
+        boards_controller = AzureBoardsController()
+        return jsonify(_write_queue().status(boards_controller.org, work_item_id))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@boards_bp.route("/api/ata/bulk", methods=["POST"])
+def save_ata_details_bulk():
+    """Salva várias ATAs de uma vez (endpoint $batch do Azure DevOps).
+    
+    Corpo: {"items": [{"id": 123, "rev": 7, "changes": {"status": "Done", "comments": "..."}}, ...]}
+    ("rev" é opcional: revisão carregada pelo usuário, recusada como conflito se mudou)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get("items")
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Informe items: [{id, changes}]"}), 400
+        
+        print(f"API REQUEST: Bulk saving {len(items)} ATA(s)")
+        boards_controller = AzureBoardsController()
+        result = boards_controller.save_ata_details_bulk(items)
+        
+        print(f"API RESPONSE: Bulk save finished ({result['succeeded']}/{result['total']} succeeded)")
+        return jsonify(result)
+    except Exception as e:
+        print(f"API ERROR: Failed to bulk save ATAs: {str(e)}")
+        return jsonify({"error": str(e)}), 500
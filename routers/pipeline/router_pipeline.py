@@ -1,5 +1,5 @@
-from flask import Blueprint, request, jsonify
-from controllers.pipeline.controller_pipeline import PipelineController
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from controllers.pipeline.controller_pipeline import PipelineController, pipeline_status_hub, pipeline_orchestrator
 
 pipeline_bp = Blueprint('pipeline', __name__)
 
@@ -18,8 +18,9 @@ def save_pipeline_file():
     try:
         data = request.get_json()
         content = data.get("content", "")
+        base_object_id = data.get("baseObjectId")
         
-        result = PipelineController.save_pipeline_file(content)
+        result = PipelineController.save_pipeline_file(content, base_object_id)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -28,7 +29,8 @@ def save_pipeline_file():
 def run_pipeline():
     """Executa a pipeline do Azure DevOps"""
     try:
-        result = PipelineController.run_pipeline()
+        data = request.get_json(silent=True) or {}
+        result = PipelineController.run_pipeline(data.get("branch"), data.get("parameters"))
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -37,7 +39,52 @@ def run_pipeline():
 def pipeline_status(build_id):
     """Consulta o status atual de uma pipeline em execução"""
     try:
-        result = PipelineController.pipeline_status(build_id)
+        # Build já acompanhada por SSE: usar o último status em vez de consultar de novo
+        result = pipeline_status_hub.latest(build_id) or PipelineController.pipeline_status(build_id)
         return jsonify(result)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@pipeline_bp.route("/pipeline_status/<int:build_id>/stream", methods=["GET"])
+def pipeline_status_stream(build_id):
+    """Status da pipeline via Server-Sent Events (uma consulta ao Azure DevOps por build para todos os inscritos)"""
+    return Response(
+        stream_with_context(pipeline_status_hub.stream(build_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@pipeline_bp.route("/pipeline_batches", methods=["POST"])
+def start_pipeline_batch():
+    """Dispara um lote de execuções em paralelo.
+    
+    Corpo: {"runs": [{"branch": "...", "parameters": {...}}, ...]}
+    ou {"branches": ["...", ...], "parameters": {...}} (mesmos parâmetros para todas)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        runs = data.get("runs")
+        if runs is None:
+            branches = data.get("branches")
+            if not isinstance(branches, list):
+                return jsonify({"error": "Informe runs: [{branch, parameters}] ou branches: [...]"}), 400
+            runs = [{"branch": branch, "parameters": data.get("parameters")} for branch in branches]
+        
+        result = pipeline_orchestrator.start_batch(runs)
+        return jsonify(result), 202
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@pipeline_bp.route("/pipeline_batches", methods=["GET"])
+def list_pipeline_batches():
+    """Lotes registrados, do mais recente para o mais antigo"""
+    return jsonify({"batches": pipeline_orchestrator.list_batches()})
+
+@pipeline_bp.route("/pipeline_batches/<batch_id>", methods=["GET"])
+def get_pipeline_batch(batch_id):
+    """Progresso agregado e status de cada execução do lote"""
+    batch = pipeline_orchestrator.get_batch(batch_id)
+    if batch is None:
+        return jsonify({"error": "Lote não encontrado"}), 404
+    return jsonify(batch)
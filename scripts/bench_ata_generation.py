@@ -0,0 +1,42 @@
+"""Benchmark de vazão da geração de ATAs com o backend local (fake).
+
+Exercita o pipeline completo (template, prompt, cache ignorado, semáforo de
+chamadas ao modelo, fila de jobs e extração de campos) sem acessar a rede.
+Latência e velocidade do backend vêm de ATA_FAKE_LATENCY e
+ATA_FAKE_TOKENS_PER_SECOND.
+
+Uso: python scripts/bench_ata_generation.py [quantidade de jobs]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["ATA_LLM_BACKEND"] = "fake"
+os.environ.setdefault("ATA_FAKE_LATENCY", "0.2")
+os.environ.setdefault("ATA_FAKE_TOKENS_PER_SECOND", "500")
+
+from controllers.ata.controller_ata import AtaController, ATA_LLM_MAX_CONCURRENCY
+from controllers.ata.ata_jobs import AtaJobQueue
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    fila = AtaJobQueue(max_pending=total)
+
+    start = time.perf_counter()
+    jobs = [
+        fila.submit(AtaController.processar_gerar_ata, "2025-09-29", "1", f"Resumo de teste {i}", True)
+        for i in range(total)
+    ]
+    while any(fila.get(job["id"])["status"] in ("queued", "running") for job in jobs):
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    erros = sum(1 for job in jobs if fila.get(job["id"])["status"] == "error")
+    print(f"{total} jobs em {elapsed:.2f}s ({total / elapsed:.1f} ATAs/s, "
+          f"{fila.max_workers} workers, {ATA_LLM_MAX_CONCURRENCY} chamadas simultâneas, {erros} erros)")
+
+
+if __name__ == "__main__":
+    main()
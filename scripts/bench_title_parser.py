@@ -0,0 +1,111 @@
+"""Microbenchmark do parser de títulos de work items.
+
+Compara as funções antigas (regex sem compilar, uma busca por informação) com
+controllers/ata/title_parser.parse_title em um corpus sintético de títulos.
+
+Uso: python scripts/bench_title_parser.py [quantidade de títulos]
+"""
+import os
+import re
+import sys
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controllers.ata.title_parser import parse_title, EXCLUDED_COMPANY_TERMS
+
+
+def legacy_extract_company_from_title(title):
+    """Implementação original de AzureBoardsController.extract_company_from_title"""
+    if not title:
+        return None
+    match = re.search(r'^\[ATA\]\[([^\]]+)\]', title, re.IGNORECASE)
+    if match:
+        return match.group(1).strip().upper()
+    pattern = r'^\[([^\]]+)\]'
+    title_clean = title.strip()
+    while True:
+        match = re.match(pattern, title_clean)
+        if not match:
+            break
+        captured_text = match.group(1).strip().upper()
+        if captured_text not in EXCLUDED_COMPANY_TERMS:
+            return captured_text
+        title_clean = title_clean[match.end():].strip()
+    return None
+
+
+def legacy_extract_project_info_from_title(title):
+    """Implementação original de AzureBoardsController._extract_project_info_from_title"""
+    project_match = re.search(r'\[([^\]]+)\]', title)
+    responsible_match = re.search(r'\]\[([^\]]+)\]', title)
+    date_match = re.search(r'Atividade do dia (\d{2}/\d{2}/\d{4})', title)
+    return {
+        "project": project_match.group(1) if project_match else "",
+        "responsible": responsible_match.group(1) if responsible_match else "",
+        "activityDate": date_match.group(1) if date_match else "",
+        "isTOTVS": "TOTVS" in title.upper()
+    }
+
+
+def legacy_parse(title):
+    """Custo antigo por item: empresa na listagem + projectInfo nos detalhes"""
+    return legacy_extract_company_from_title(title), legacy_extract_project_info_from_title(title)
+
+
+def new_parse(title):
+    info = parse_title(title)
+    return info.company, info.project_info()
+
+
+def build_corpus(size, unique_ratio, seed=42):
+    """Gera títulos no formato das ATAs, com uma fração de títulos repetidos"""
+    rng = random.Random(seed)
+    companies = ["ECAD", "TOTVS", "KONIA", "ata", "Bug", "Acme Corp", "  XPTO  "]
+    people = ["Helen", "Joao", "Maria", "Ana Paula"]
+    prefixes = ["[ATA]", "[TASK]", "[ata] ", "", "[FEATURE][USER STORY]"]
+    unique = []
+    for i in range(max(1, int(size * unique_ratio))):
+        prefix = rng.choice(prefixes)
+        company = rng.choice(companies)
+        person = rng.choice(people)
+        day = rng.randint(1, 28)
+        suffix = f" - Atividade do dia {day:02d}/0{rng.randint(1, 9)}/2025" if rng.random() < 0.8 else ""
+        title = f"{prefix}[{company}][{person}] Construção do fluxo {i}{suffix}"
+        if rng.random() < 0.05:
+            title = f"Título sem empresa {i}"
+        unique.append(title)
+    return [unique[rng.randrange(len(unique))] for _ in range(size)] if unique_ratio < 1 else unique
+
+
+def bench(label, func, corpus):
+    start = time.perf_counter()
+    for title in corpus:
+        func(title)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed * 1000:9.1f} ms  ({elapsed / len(corpus) * 1e6:6.2f} us/título)")
+    return elapsed
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    for unique_ratio, description in ((1.0, "títulos únicos"), (0.05, "5% únicos (cargas repetidas)")):
+        corpus = build_corpus(size, unique_ratio)
+
+        # Garantir que o parser novo produz exatamente o mesmo resultado
+        for title in set(corpus):
+            assert new_parse(title) == legacy_parse(title), title
+
+        print(f"{len(corpus)} títulos - {description}")
+        parse_title.cache_clear()
+        legacy = bench("legado", legacy_parse, corpus)
+        parse_title.cache_clear()
+        cold = bench("parse_title (cache vazio)", new_parse, corpus)
+        warm = bench("parse_title (cache quente)", new_parse, corpus)
+        print(f"  speedup: {legacy / cold:.1f}x (cache vazio), {legacy / warm:.1f}x (cache quente)\n")
+
+
+if __name__ == "__main__":
+    main()
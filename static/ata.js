@@ -12,14 +12,12 @@ document.getElementById('ataForm').onsubmit = async function(e) {
     
     let data;
     try {
-        const res = await fetch('/gerar_ata', { method: 'POST', body: fd });
-        data = await res.json();
-        if (!res.ok) {
-            const err = data && data.error ? data.error : `HTTP ${res.status}`;
-            showError(err);
-            form.querySelector('button[type="submit"]').disabled = false;
-            return;
-        }
+        // Mostrar o texto conforme o modelo gera (streaming)
+        data = await gerarAtaStream(fd, texto => {
+            const ataTextEl = document.getElementById('ataText');
+            if (ataTextEl) ataTextEl.textContent = texto;
+            if (ataResultEl) ataResultEl.style.display = 'block';
+        });
     } catch (err) {
         showError(err.message || String(err));
         form.querySelector('button[type="submit"]').disabled = false;
@@ -42,6 +40,48 @@ document.getElementById('ataForm').onsubmit = async function(e) {
     form.querySelector('button[type="submit"]').disabled = false;
 };
 
+// Gera a ATA via /gerar_ata/stream (Server-Sent Events sobre POST).
+// onDelta recebe o texto acumulado a cada trecho; retorna o resultado final (ata, titulo, proximos, corpo).
+async function gerarAtaStream(formData, onDelta) {
+    const res = await fetch('/gerar_ata/stream', { method: 'POST', body: formData });
+    if (!res.ok || !res.body) {
+        throw new Error(`HTTP ${res.status}: ${res.statusText}`);
+    }
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let texto = '';
+    let resultado = null;
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let idx;
+        while ((idx = buffer.indexOf('\n\n')) >= 0) {
+            const bloco = buffer.slice(0, idx);
+            buffer = buffer.slice(idx + 2);
+            let evento = 'message';
+            let dados = '';
+            bloco.split('\n').forEach(linha => {
+                if (linha.startsWith('event:')) evento = linha.slice(6).trim();
+                else if (linha.startsWith('data:')) dados += linha.slice(5).trim();
+            });
+            if (!dados) continue; // comentários / keep-alive
+            const payload = JSON.parse(dados);
+            if (evento === 'token') {
+                texto += payload.delta;
+                if (onDelta) onDelta(texto);
+            } else if (evento === 'done') {
+                resultado = payload;
+            } else if (evento === 'error') {
+                throw new Error(payload.error);
+            }
+        }
+    }
+    if (!resultado) throw new Error('Geração da ATA interrompida');
+    return resultado;
+}
+
     function limparTexto(str) {
         return (str || '').replace(/\r/g, '').trim();
     }
@@ -6,6 +6,12 @@
 let allWorkItems = [];
 let currentSprint = null;
 let currentEditingCard = null;
+// Autosave: edições vão para a fila de gravação do servidor após uma pausa na digitação
+const AUTOSAVE_DELAY_MS = 1500;
+const SAVE_STATUS_POLL_MS = 1500;
+let autosaveTimer = null;
+let saveStatusTimer = null;
+let draftRequest = null;
 
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', function() {
@@ -145,21 +151,18 @@ async function handleATASubmit(e) {
         
         console.log('DEBUG: About to send request');
         
-        const response = await fetch('/gerar_ata', {
-            method: 'POST',
-            body: formData
+        // Streaming: exibir o texto da ATA conforme é gerado (gerarAtaStream em ata.js)
+        const ataText = document.getElementById('ataText');
+        const data = await gerarAtaStream(formData, texto => {
+            const resultPlaceholder = document.getElementById('resultPlaceholder');
+            const resultLoading = document.getElementById('resultLoading');
+            const ataResult = document.getElementById('ataResult');
+            if (resultPlaceholder) resultPlaceholder.style.display = 'none';
+            if (resultLoading) resultLoading.style.display = 'none';
+            if (ataResult) ataResult.style.display = 'block';
+            if (ataText) ataText.textContent = texto;
         });
         
-        if (!response.ok) {
-            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-        }
-        
-        const data = await response.json();
-        
-        if (data.error) {
-            throw new Error(data.error);
-        }
-        
         console.log('DEBUG: ATA Response data:', data);
         
         // Mostrar resultado imediatamente (sem delay)
@@ -245,6 +248,15 @@ function copyAta() {
    CARDS MANAGEMENT FUNCTIONALITY
    ============================================ */
 
+// Apenas ATAs e somente os campos renderizados nos cards/formulário (filtro e projeção no servidor)
+const WORK_ITEMS_QUERY = 'type=ATA&fields=' + [
+    'System.Title',
+    'System.State',
+    'System.Description',
+    'System.WorkItemType',
+    'Microsoft.VSTS.Common.Priority'
+].join(',');
+
 function initializeCardsManagement() {
     loadWorkItems();
     setupCardsEventListeners();
@@ -277,19 +289,21 @@ function setupCardsEventListeners() {
     // Back to list button
     const backToListBtn = document.getElementById('backToListBtn');
     if (backToListBtn) {
-        backToListBtn.addEventListener('click', showCardsList);
+        backToListBtn.addEventListener('click', discardEditsAndShowList);
     }
     
     // Cancel edit button
     const cancelEditBtn = document.getElementById('cancelEditBtn');
     if (cancelEditBtn) {
-        cancelEditBtn.addEventListener('click', showCardsList);
+        cancelEditBtn.addEventListener('click', discardEditsAndShowList);
     }
     
     // Card edit form
     const cardEditForm = document.getElementById('cardEditForm');
     if (cardEditForm) {
         cardEditForm.addEventListener('submit', handleCardSave);
+        cardEditForm.addEventListener('input', scheduleAutosave);
+        cardEditForm.addEventListener('change', scheduleAutosave);
     }
 }
 
@@ -424,7 +438,7 @@ async function loadWorkItemsForSprint(sprintId) {
         if (errorMessage) errorMessage.style.display = 'none';
         if (sprintInfo) sprintInfo.style.display = 'none';
 
-        const response = await fetch(`/api/boards/my-work-items?sprint_id=${sprintId}`);
+        const response = await fetch(`/api/boards/my-work-items?sprint_id=${sprintId}&${WORK_ITEMS_QUERY}`);
         
         if (!response.ok) {
             throw new Error(`HTTP ${response.status}: ${response.statusText}`);
@@ -505,7 +519,7 @@ async function loadWorkItems() {
         if (errorMessage) errorMessage.style.display = 'none';
         if (sprintInfo) sprintInfo.style.display = 'none';
 
-        const response = await fetch('/api/boards/my-work-items');
+        const response = await fetch(`/api/boards/my-work-items?${WORK_ITEMS_QUERY}`);
         
         if (!response.ok) {
             throw new Error(`HTTP ${response.status}: ${response.statusText}`);
@@ -889,15 +903,19 @@ async function handleStatusChange(event) {
     try {
         showToast('Atualizando status...', 'info');
         
-        const response = await fetch(`/api/ata/${workItemId}/status`, {
-            method: 'PUT',
+        // Mesmo caminho dos salvamentos em lote: só envia se o status mudou e recusa se o card foi alterado por outra pessoa
+        const response = await fetch('/api/ata/bulk', {
+            method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ status: newStatus })
+            body: JSON.stringify({
+                items: [{ id: workItemId, rev: currentEditingCard.rev, changes: { status: newStatus } }]
+            })
         });
         
-        const result = await response.json();
+        const data = await response.json().catch(() => null);
+        const result = (data && data.results && data.results[0]) || { error: (data && data.error) || 'Erro ao atualizar status' };
         
         if (result.success) {
             showToast(`Status atualizado para ${newStatus}`, 'success');
@@ -905,6 +923,7 @@ async function handleStatusChange(event) {
             // Update the card in the cards list
             if (currentEditingCard) {
                 currentEditingCard.fields['System.State'] = newStatus;
+                if (result.rev) currentEditingCard.rev = result.rev;
             }
             
             // Refresh the cards display
@@ -985,6 +1004,11 @@ async function loadSavedATAData(cardId) {
         if (response.ok) {
             const ataData = await response.json();
             
+            // Revisão carregada: o servidor recusa o salvamento se a ATA mudar depois disso
+            if (currentEditingCard && currentEditingCard.id === cardId) {
+                currentEditingCard.rev = ataData.rev;
+            }
+            
             // Populate ATA fields with saved data
             if (ataData.template) document.getElementById('templateType').value = ataData.template;
             if (ataData.title) document.getElementById('ataTitle').value = ataData.title;
@@ -1162,21 +1186,18 @@ function showCardsList() {
     cardsListView.style.display = 'flex';
     cardEditView.style.display = 'none';
     
+    // Autosave agendado deixa de valer ao sair do editor
+    cancelAutosave();
+    updateSaveStatus('idle');
+    
     // Limpar os campos do formulário ATA quando voltar para a lista
     clearATAFormFields();
     
     currentEditingCard = null;
 }
 
-async function handleCardSave(e) {
-    e.preventDefault();
-    
-    if (!currentEditingCard) {
-        showToast('Nenhum card selecionado para edição', 'error');
-        return;
-    }
-    
-    const formData = new FormData(e.target);
+function collectATAData(form) {
+    const formData = new FormData(form);
     
     // Collect Next Steps data
     const nextSteps = [];
@@ -1196,7 +1217,7 @@ async function handleCardSave(e) {
         }
     }
     
-    const ataData = {
+    return {
         card_id: currentEditingCard.id,
         template: formData.get('templateType') || 'ATA',
         title: formData.get('ata_title') || '',
@@ -1206,14 +1227,106 @@ async function handleCardSave(e) {
         meetingStave: formData.get('meeting_stave') || '',
         meetingSubject: formData.get('meeting_subject') || '',
         comments: formData.get('comments') || '',
-        nextSteps: nextSteps
+        nextSteps: nextSteps,
+        rev: currentEditingCard.rev
     };
+}
+
+function scheduleAutosave() {
+    if (!currentEditingCard) return;
+    clearTimeout(autosaveTimer);
+    autosaveTimer = setTimeout(sendDraft, AUTOSAVE_DELAY_MS);
+}
+
+function cancelAutosave() {
+    clearTimeout(autosaveTimer);
+    clearTimeout(saveStatusTimer);
+    autosaveTimer = null;
+    saveStatusTimer = null;
+}
+
+async function sendDraft() {
+    autosaveTimer = null;
+    const form = document.getElementById('cardEditForm');
+    if (!currentEditingCard || !form) return;
+    
+    const cardId = currentEditingCard.id;
+    try {
+        draftRequest = fetch(`/api/ata/${cardId}/draft`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(collectATAData(form))
+        });
+        const response = await draftRequest;
+        if (!response.ok) throw new Error('Erro ao registrar rascunho');
+        handleSaveStatus(cardId, await response.json());
+    } catch (error) {
+        console.error('Erro no autosave da ATA:', error);
+        updateSaveStatus('failed');
+    }
+}
+
+async function pollSaveStatus(cardId) {
+    saveStatusTimer = null;
+    if (!currentEditingCard || currentEditingCard.id !== cardId) return;
+    try {
+        const response = await fetch(`/api/ata/${cardId}/save-status`);
+        if (response.ok) handleSaveStatus(cardId, await response.json());
+    } catch (error) {
+        console.error('Erro ao consultar gravação da ATA:', error);
+    }
+}
+
+function handleSaveStatus(cardId, status) {
+    if (!currentEditingCard || currentEditingCard.id !== cardId) return;
+    
+    const result = status.result || (status.lastResult && status.lastResult.result);
+    if (status.state === 'saved' && result && result.rev) currentEditingCard.rev = result.rev;
+    if (status.state === 'conflict' && result) showToast(result.error, 'error');
+    updateSaveStatus(status.state, status.lastError);
+    
+    // Continua acompanhando enquanto a gravação não termina
+    clearTimeout(saveStatusTimer);
+    if (status.state === 'pending' || status.state === 'flushing') {
+        saveStatusTimer = setTimeout(() => pollSaveStatus(cardId), SAVE_STATUS_POLL_MS);
+    }
+}
+
+function updateSaveStatus(state, error) {
+    const element = document.getElementById('ataSaveStatus');
+    if (!element) return;
+    
+    const labels = {
+        pending: 'Alterações pendentes...',
+        flushing: 'Salvando...',
+        saved: 'Salvo no Azure DevOps',
+        conflict: 'Conflito: ATA alterada por outra pessoa',
+        failed: 'Falha ao salvar',
+        idle: ''
+    };
+    element.textContent = labels[state] || '';
+    element.title = error || '';
+    element.className = `save-status save-status-${state}`;
+}
+
+async function handleCardSave(e) {
+    e.preventDefault();
+    
+    if (!currentEditingCard) {
+        showToast('Nenhum card selecionado para edição', 'error');
+        return;
+    }
+    
+    // O salvamento explícito já leva o rascunho pendente
+    cancelAutosave();
+    const ataData = collectATAData(e.target);
     
     try {
         console.log('Saving ATA data:', ataData);
         
         // TODO: Implement API call to save ATA data
         // For now, simulate the save
+        updateSaveStatus('flushing');
         const response = await fetch(`/api/ata/${currentEditingCard.id}/save`, {
             method: 'POST',
             headers: {
@@ -1222,19 +1335,44 @@ async function handleCardSave(e) {
             body: JSON.stringify(ataData)
         });
         
+        // Conflito (409) e erros também trazem o motivo no corpo
+        const result = await response.json().catch(() => null);
+        if (result && result.conflict) {
+            updateSaveStatus('conflict');
+            showToast(result.error, 'error');
+            return;
+        }
+        
         if (response.ok) {
+            if (result && result.rev) currentEditingCard.rev = result.rev;
             showToast('Informações da ATA salvas com sucesso!', 'success');
             showCardsList();
         } else {
-            throw new Error('Erro ao salvar no servidor');
+            throw new Error((result && result.error) || 'Erro ao salvar no servidor');
         }
         
     } catch (error) {
         console.error('Erro ao salvar informações da ATA:', error);
-        // For now, just show success message since the API might not be implemented yet
-        showToast('Informações da ATA salvas localmente!', 'success');
-        showCardsList();
+        // As edições continuam na fila do servidor e o editor fica aberto para nova tentativa
+        updateSaveStatus('failed', error.message);
+        showToast(`Erro ao salvar informações da ATA: ${error.message}`, 'error');
+    }
+}
+
+async function discardEditsAndShowList() {
+    // Cancelar/voltar descarta também os rascunhos já enviados e ainda não gravados
+    if (currentEditingCard) {
+        const cardId = currentEditingCard.id;
+        cancelAutosave();
+        try {
+            // Um rascunho em envio precisa chegar antes do descarte
+            if (draftRequest) await draftRequest.catch(() => null);
+            await fetch(`/api/ata/${cardId}/draft`, { method: 'DELETE' });
+        } catch (error) {
+            console.error('Erro ao descartar rascunho da ATA:', error);
+        }
     }
+    showCardsList();
 }
 
 /* ============================================
@@ -2,6 +2,10 @@
 // PIPELINE CARDS - JAVASCRIPT
 // ============================================
 
+// Commit (objectId) da branch em que o conteúdo do editor foi carregado/salvo,
+// usado pelo servidor para combinar alterações feitas por outros usuários
+let cardsBaseObjectId = null;
+
 // Load current pipeline file content
 async function loadPipelineFile() {
     const btn = event.target;
@@ -18,6 +22,7 @@ async function loadPipelineFile() {
         
         if (response.ok) {
             document.getElementById('cards-content').value = data.content || '';
+            cardsBaseObjectId = data.objectId || null;
             showSuccess('Arquivo carregado com sucesso!');
             updateStatus('loaded', 'Arquivo carregado do repositório', { 
                 content: data.content ? `${data.content.split('\n').length} linhas` : 'Arquivo vazio' 
@@ -62,14 +67,23 @@ async function savePipelineFile() {
         const response = await fetch('/save_pipeline_file', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ content })
+            body: JSON.stringify({ content, baseObjectId: cardsBaseObjectId })
         });
         
         const data = await response.json();
         
         if (response.ok) {
-            showSuccess('Arquivo salvo com sucesso no repositório!');
-            updateStatus('saved', 'Arquivo salvo com sucesso', data);
+            if (data.objectId) cardsBaseObjectId = data.objectId;
+            if (data.merged && typeof data.content === 'string') {
+                // O servidor combinou nossas alterações com as de outro usuário
+                document.getElementById('cards-content').value = data.content;
+                showSuccess('Arquivo salvo e combinado com alterações de outro usuário!');
+            } else if (data.skipped) {
+                showSuccess('Nenhuma alteração para salvar.');
+            } else {
+                showSuccess('Arquivo salvo com sucesso no repositório!');
+            }
+            updateStatus('saved', data.message || 'Arquivo salvo com sucesso', data);
         } else {
             showError(data.error || 'Erro ao salvar arquivo');
             updateStatus('error', 'Erro ao salvar arquivo', { error: data.error });
@@ -124,8 +138,68 @@ async function runPipeline() {
     }
 }
 
-// Start polling pipeline status
+// Acompanhar o status da pipeline via Server-Sent Events (o servidor consulta o Azure DevOps
+// uma única vez por build e distribui para todas as abas). Sem suporte a SSE, usa polling.
 function startPipelinePolling(buildId) {
+    if (!window.EventSource) {
+        startPipelineStatusPolling(buildId);
+        return;
+    }
+    
+    const source = new EventSource(`/pipeline_status/${buildId}/stream`);
+    let received = false;
+    
+    source.addEventListener('status', (event) => {
+        received = true;
+        const data = JSON.parse(event.data);
+        if (handlePipelineStatus(data)) {
+            source.close();
+        }
+    });
+    
+    source.addEventListener('error', (event) => {
+        // Evento "error" enviado pelo servidor (com dados) ou falha da conexão
+        if (event.data) {
+            source.close();
+            const data = JSON.parse(event.data);
+            finishPipelineRun();
+            showError(data.error || 'Erro ao consultar status da pipeline');
+            updateStatus('error', 'Erro ao consultar status da pipeline', data);
+        } else if (!received || source.readyState === EventSource.CLOSED) {
+            source.close();
+            startPipelineStatusPolling(buildId);
+        }
+    });
+}
+
+function finishPipelineRun() {
+    const btn = document.getElementById('runPipelineBtn');
+    btn.disabled = false;
+    btn.innerHTML = '<i class="fa fa-play"></i> Executar Pipeline';
+}
+
+// Atualiza a interface com o status recebido; retorna true quando a pipeline terminou
+function handlePipelineStatus(data) {
+    if (data.isCompleted) {
+        finishPipelineRun();
+        
+        if (data.result === 'sucesso') {
+            showSuccess('Pipeline concluída com sucesso!');
+            updateStatus('success', 'Pipeline concluída com sucesso', data);
+        } else {
+            showError(`Pipeline falhou: ${data.result}`);
+            updateStatus('error', `Pipeline falhou: ${data.result}`, data);
+        }
+        return true;
+    }
+    
+    // Pipeline ainda executando
+    updateStatus('polling', `Pipeline ${data.status}...`, data);
+    return false;
+}
+
+// Polling do status da pipeline (fallback quando SSE não está disponível)
+function startPipelineStatusPolling(buildId) {
     let pollCount = 0;
     const maxPolls = 120; // 10 minutos máximo (5s * 120)
     
@@ -137,28 +211,8 @@ function startPipelinePolling(buildId) {
             const data = await response.json();
             
             if (response.ok) {
-                const status = data.status;
-                const result = data.result;
-                const isCompleted = data.isCompleted;
-                
-                // Atualizar status na interface
-                if (isCompleted) {
+                if (handlePipelineStatus(data)) {
                     clearInterval(pollInterval);
-                    
-                    const btn = document.getElementById('runPipelineBtn');
-                    btn.disabled = false;
-                    btn.innerHTML = '<i class="fa fa-play"></i> Executar Pipeline';
-                    
-                    if (result === 'sucesso') {
-                        showSuccess('Pipeline concluída com sucesso!');
-                        updateStatus('success', 'Pipeline concluída com sucesso', data);
-                    } else {
-                        showError(`Pipeline falhou: ${result}`);
-                        updateStatus('error', `Pipeline falhou: ${result}`, data);
-                    }
-                } else {
-                    // Pipeline ainda executando
-                    updateStatus('polling', `Pipeline ${status}...`, data);
                 }
             } else {
                 console.warn('Erro ao consultar status:', data.error);
@@ -170,9 +224,7 @@ function startPipelinePolling(buildId) {
         // Parar polling se exceder limite de tempo
         if (pollCount >= maxPolls) {
             clearInterval(pollInterval);
-            const btn = document.getElementById('runPipelineBtn');
-            btn.disabled = false;
-            btn.innerHTML = '<i class="fa fa-play"></i> Executar Pipeline';
+            finishPipelineRun();
             
             showError('Timeout: Pipeline demorou mais que o esperado');
             updateStatus('error', 'Timeout na consulta do status da pipeline');